@@ -1,5 +1,24 @@
 import math
-from collections import defaultdict, Counter
+import heapq
+import itertools
+import json
+import mmap
+import os
+import random
+import shutil
+import sys
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
 
 # =====================================================================
 # 1. BASE DE DADOS (Documentos da Atividade 08)
@@ -23,111 +42,662 @@ N = len(documentos) # Total de documentos (5)
 # =====================================================================
 # 2. PRÉ-PROCESSAMENTO (Filtrando palavras fora do vocabulário)
 # =====================================================================
-docs_tokenizados = {}
-for doc_id, texto in documentos.items():
+def tokenizar(texto, vocab=vocabulario_permitido):
     # Removendo pontuação simples para evitar sujeira
     texto_limpo = texto.replace(',', '').replace('.', '')
     tokens = texto_limpo.lower().split()
-    # Filtra mantendo APENAS as palavras que estão no vocabulário oficial
-    tokens_filtrados = [t for t in tokens if t in vocabulario_permitido]
-    docs_tokenizados[doc_id] = tokens_filtrados
+    # Filtra mantendo APENAS as palavras que estão no vocabulário oficial (vocab=None -> todas)
+    return [t for t in tokens if vocab is None or t in vocab]
 
-# =====================================================================
-# 3. PONDERAÇÃO TF (Term Frequency: 1 + log10(f_ij))
-# =====================================================================
-tf = defaultdict(dict)
-for doc_id, tokens in docs_tokenizados.items():
-    frequencias = Counter(tokens)
-    for termo in vocabulario:
-        f_ij = frequencias[termo]
-        if f_ij > 0:
-            tf[doc_id][termo] = 1 + math.log10(f_ij)
-        else:
-            tf[doc_id][termo] = 0.0
+docs_tokenizados = {doc_id: tokenizar(texto) for doc_id, texto in documentos.items()}
 
 # =====================================================================
-# 4. PONDERAÇÃO IDF (Inverse Document Frequency: log10(N / n_i))
+# 3. ÍNDICE INVERTIDO (TF = 1 + log10(f_ij), IDF = log10(N / n_i))
 # =====================================================================
-idf = {}
-for termo in vocabulario:
-    n_i = sum(1 for tokens in docs_tokenizados.values() if termo in tokens)
-    idf[termo] = math.log10(N / n_i) if n_i > 0 else 0.0
+# Em vez de um vetor denso (documento x vocabulário), cada termo guarda a sua
+# lista de postings: (documento, tf) só dos documentos onde ele aparece.
+# As normas dos documentos são calculadas uma vez na construção, e a consulta
+# percorre apenas os postings dos termos da consulta (só os documentos tocados
+# recebem pontuação). O ranking top-k sai de um heap.
+class IndiceInvertido:
+    def __init__(self, vocab=None):
+        self.vocab = vocab          # None -> aceita qualquer termo
+        self.doc_ids = []           # número interno -> id do documento
+        self.termos = {}            # termo -> número do termo
+        self.postings = []          # número do termo -> [(número do doc, tf)]
+        self.idf = []
+        self.normas = []
+        self._arrays = None
+        self._matriz = None
 
-# =====================================================================
-# 5. PONDERAÇÃO TF-IDF E NORMAS DOS VETORES
-# =====================================================================
-tfidf_docs = defaultdict(dict)
-normas_docs = {}
-
-for doc_id in documentos.keys():
-    soma_quadrados = 0
-    for termo in vocabulario:
-        peso = tf[doc_id][termo] * idf[termo]
-        tfidf_docs[doc_id][termo] = peso
-        soma_quadrados += peso ** 2
-    # Norma = raiz quadrada da soma dos quadrados dos pesos
-    normas_docs[doc_id] = math.sqrt(soma_quadrados)
+    def adicionar(self, doc_id, tokens):
+        d = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        for termo, f_ij in Counter(tokens).items():
+            t = self.termos.get(termo)
+            if t is None:
+                t = self.termos[termo] = len(self.postings)
+                self.postings.append([])
+            self.postings[t].append((d, 1 + math.log10(f_ij)))
+        self._arrays = self._matriz = None
+
+    def construir(self):
+        """IDF de cada termo e norma TF-IDF de cada documento (uma passada pelos postings)"""
+        N = len(self.doc_ids)
+        self.idf = [math.log10(N / len(p)) for p in self.postings]
+        soma_quadrados = [0.0] * N
+        for p, idf in zip(self.postings, self.idf):
+            for d, tf in p:
+                soma_quadrados[d] += (tf * idf) ** 2
+        self.normas = [math.sqrt(s) for s in soma_quadrados]
+        return self
+
+    def pesos_consulta(self, consulta_str):
+        """{número do termo: peso TF-IDF} da consulta e a sua norma"""
+        freq = Counter(t for t in tokenizar(consulta_str, self.vocab) if t in self.termos)
+        pesos = {}
+        for termo, f_iq in freq.items():
+            t = self.termos[termo]
+            peso = (1 + math.log10(f_iq)) * self.idf[t]
+            if peso:
+                pesos[t] = peso
+        return pesos, math.sqrt(sum(w * w for w in pesos.values()))
+
+    def consultar(self, consulta_str, k=None):
+        """[(doc_id, similaridade)] por cosseno, decrescente, só sim > 0 (top-k se k)"""
+        pesos, norma_q = self.pesos_consulta(consulta_str)
+        if norma_q == 0:
+            return []
+        acumulado = {}
+        for t, w_q in pesos.items():
+            w = w_q * self.idf[t]
+            for d, tf in self.postings[t]:
+                acumulado[d] = acumulado.get(d, 0.0) + tf * w
+        normas = self.normas
+        sims = ((d, s / (normas[d] * norma_q)) for d, s in acumulado.items() if normas[d] > 0 and s > 0)
+        # empate: ordem de inserção dos documentos, como no sorted() estável
+        ordem = lambda x: (x[1], -x[0])
+        top = heapq.nlargest(k, sims, key=ordem) if k else sorted(sims, key=ordem, reverse=True)
+        return [(self.doc_ids[d], s) for d, s in top]
+
+    # ---- caminho em lote (NumPy / SciPy) ----
+    def _postings_arrays(self):
+        # postings concatenados: docs/pesos do termo t em inicio[t]:inicio[t+1]
+        if self._arrays is None:
+            inicio = np.zeros(len(self.postings) + 1, dtype=np.int64)
+            inicio[1:] = np.cumsum([len(p) for p in self.postings])
+            docs = np.fromiter((d for p in self.postings for d, _ in p), dtype=np.int64, count=inicio[-1])
+            tf = np.fromiter((w for p in self.postings for _, w in p), dtype=np.float64, count=inicio[-1])
+            pesos = tf * np.repeat(np.asarray(self.idf), np.diff(inicio))
+            normas = np.asarray(self.normas)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                pesos = np.where(normas[docs] > 0, pesos / normas[docs], 0.0)
+            self._arrays = (inicio, docs, pesos)
+        return self._arrays
+
+    def _matriz_termos(self):
+        # matriz esparsa termos x documentos com os pesos TF-IDF já normalizados
+        if self._matriz is None:
+            inicio, docs, pesos = self._postings_arrays()
+            self._matriz = sp.csr_matrix((pesos, docs, inicio), shape=(len(self.postings), len(self.doc_ids)))
+        return self._matriz
+
+    def consultar_lote(self, consultas, k=10):
+        """consultar() para uma lista de consultas: produto esparso Q x (termos x docs)"""
+        if np is None:
+            return [self.consultar(c, k) for c in consultas]
+        linhas, colunas, valores = [], [], []
+        for i, c in enumerate(consultas):
+            pesos, norma_q = self.pesos_consulta(c)
+            for t, w in pesos.items():
+                linhas.append(i)
+                colunas.append(t)
+                valores.append(w / norma_q)
+        if sp is not None:
+            Q = sp.csr_matrix((valores, (linhas, colunas)), shape=(len(consultas), len(self.postings)))
+            S = (Q @ self._matriz_termos()).tocsr()
+            S.sort_indices()
+            resultado = []
+            for i in range(len(consultas)):
+                a, b = S.indptr[i], S.indptr[i + 1]
+                resultado.append(self._top(S.indices[a:b], S.data[a:b], k))
+            return resultado
+        # sem SciPy: acumula os postings de cada consulta com bincount só nos documentos tocados
+        inicio, docs, pesos = self._postings_arrays()
+        resultado = [[] for _ in consultas]
+        por_consulta = {}
+        for i, t, w in zip(linhas, colunas, valores):
+            por_consulta.setdefault(i, []).append((t, w))
+        for i, termos in por_consulta.items():
+            d = np.concatenate([docs[inicio[t]:inicio[t + 1]] for t, _ in termos])
+            w = np.concatenate([pesos[inicio[t]:inicio[t + 1]] * w_q for t, w_q in termos])
+            tocados, inv = np.unique(d, return_inverse=True)
+            resultado[i] = self._top(tocados, np.bincount(inv, weights=w), k)
+        return resultado
+
+    def _top(self, docs, sims, k):
+        mascara = sims > 1e-12
+        docs, sims = docs[mascara], sims[mascara]
+        if k and len(sims) > k:
+            sel = np.argpartition(-sims, k - 1)[:k]
+            docs, sims = docs[sel], sims[sel]
+        ordem = np.lexsort((docs, -sims))
+        return [(self.doc_ids[d], float(s)) for d, s in zip(docs[ordem], sims[ordem])]
+
+
+def indice_em_memoria(documentos_tokens, vocab=vocabulario_permitido):
+    """IndiceInvertido montado do zero (caminho sem numpy)"""
+    indice = IndiceInvertido(vocab)
+    for doc_id, tokens in documentos_tokens.items():
+        indice.adicionar(doc_id, tokens)
+    indice.construir()
+    return indice
 
 # =====================================================================
-# 6. EXECUÇÃO DA CONSULTA E RANQUEAMENTO
+# 4. EXECUÇÃO DA CONSULTA E RANQUEAMENTO
 # =====================================================================
-def executar_consulta(consulta_str):
+def executar_consulta(indice, consulta_str, k=None):
     print(f"\n{'='*50}")
     print(f"BUSCA: '{consulta_str}'")
     print(f"{'='*50}")
-    
-    # Filtra a consulta para usar apenas termos do vocabulário
-    tokens_consulta = [t for t in consulta_str.lower().split() if t in vocabulario_permitido]
-    freq_consulta = Counter(tokens_consulta)
-    
-    # TF-IDF da Consulta (assumindo a mesma fórmula para Q)
-    tfidf_q = {}
-    soma_quad_q = 0
-    for termo in vocabulario:
-        f_iq = freq_consulta[termo]
-        tf_q = (1 + math.log10(f_iq)) if f_iq > 0 else 0.0
-        
-        peso_q = tf_q * idf[termo]
-        tfidf_q[termo] = peso_q
-        soma_quad_q += peso_q ** 2
-        
-    norma_q = math.sqrt(soma_quad_q)
-    
-    if norma_q == 0:
+
+    ranking = indice.consultar(consulta_str, k)
+    if not ranking:
         print("Nenhum documento relevante encontrado.")
         return
 
-    # Similaridade do Cosseno
-    resultados = {}
-    for doc_id in documentos.keys():
-        produto_interno = sum(tfidf_docs[doc_id][t] * tfidf_q[t] for t in vocabulario)
-        
-        if normas_docs[doc_id] > 0:
-            sim = produto_interno / (normas_docs[doc_id] * norma_q)
-        else:
-            sim = 0.0
-            
-        if sim > 0:
-            resultados[doc_id] = sim
-
-    # Ranqueamento
-    ranking = sorted(resultados.items(), key=lambda x: x[1], reverse=True)
-    
     print("Documentos ranqueados por relevância (Cosseno):")
     for pos, (doc_id, score) in enumerate(ranking, 1):
         print(f"{pos}º -> {doc_id} (Similaridade: {score:.4f})")
 
+# =====================================================================
+# 5. ÍNDICE EM DISCO (persistente, atualizável, aberto por mmap)
+# =====================================================================
+# Layout do diretório:
+#   indice.json            geração atual e vocabulário
+#   seg_<g>/               segmento base imutável (arrays .npy abertos com mmap)
+#     termos.bin/.npy      dicionário: termos ordenados (utf-8) + offsets -> busca binária
+#     post_*.npy           postings por termo: inicio[t]:inicio[t+1] em docs/tf
+#     fwd_*.npy            índice direto por documento (para remover)
+#     df.npy, A/B/C.npy    df por termo e estatísticas de norma por documento
+#     ids.bin/.npy, ordem  ids dos documentos + permutação ordenada (busca binária)
+#   diario_<g>.jsonl       adições/remoções feitas depois do segmento (reaplicadas ao abrir)
+#
+# Norma incremental: com L = log10(N) e idf_t = L - log10(df_t),
+#   norma² = L²·A - 2L·B + C,  A = Σ tf²,  B = Σ tf²·log10(df_t),  C = Σ tf²·log10(df_t)²
+# A não muda; quando o df de um termo muda, só B e C dos documentos que o contêm
+# são corrigidos, e a mudança de N entra pelo L na hora da consulta.
+class _Dicionario:
+    """strings ordenadas num blob + offsets, busca binária sem montar dict"""
+
+    def __init__(self, blob, offs):
+        self.blob = blob
+        self.offs = offs
+
+    def __len__(self):
+        return len(self.offs) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offs[i]:self.offs[i + 1]]).decode('utf-8')
+
+    def chave(self, i):
+        return bytes(self.blob[self.offs[i]:self.offs[i + 1]])
+
+    def buscar(self, s, ordem=None):
+        alvo = s.encode('utf-8')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            meio = (lo + hi) // 2
+            if self.chave(ordem[meio] if ordem is not None else meio) < alvo:
+                lo = meio + 1
+            else:
+                hi = meio
+        if lo < len(self):
+            i = ordem[lo] if ordem is not None else lo
+            if self.chave(i) == alvo:
+                return int(i)
+        return -1
+
+
+def _blob(strings):
+    dados = [s.encode('utf-8') for s in strings]
+    offs = np.zeros(len(dados) + 1, dtype=np.int64)
+    offs[1:] = np.cumsum([len(b) for b in dados])
+    return b''.join(dados), offs
+
+
+INDICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "indice_ri")
+
+
+class IndiceEmDisco:
+    LIMITE_DIARIO = 10000   # operações no diário antes de compactar sozinho
+
+    def __init__(self, diretorio):
+        if np is None:
+            raise ImportError("IndiceEmDisco precisa de numpy")
+        self.diretorio = diretorio
+        with open(os.path.join(diretorio, "indice.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.geracao = meta["geracao"]
+        self.vocab = set(meta["vocab"]) if meta["vocab"] is not None else None
+        seg = os.path.join(diretorio, f"seg_{self.geracao}")
+        ld = lambda nome: np.load(os.path.join(seg, nome + ".npy"), mmap_mode='r')
+        self._arquivos = []
+
+        def blob(nome):
+            fh = open(os.path.join(seg, nome + ".bin"), "rb")
+            self._arquivos.append(fh)
+            if os.fstat(fh.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.termos = _Dicionario(blob("termos"), ld("termos"))
+        self.ids = _Dicionario(blob("ids"), ld("ids"))
+        self.ids_ordem = ld("ids_ordem")
+        self.post_inicio, self.post_docs, self.post_tf = ld("post_inicio"), ld("post_docs"), ld("post_tf")
+        self.fwd_inicio, self.fwd_termos, self.fwd_tf = ld("fwd_inicio"), ld("fwd_termos"), ld("fwd_tf")
+        self.df_base = ld("df")
+        self.A, self.B, self.C = ld("A"), ld("B"), ld("C")
+        self.N_base = len(self.ids)
+        # estado em memória desde o segmento (reconstruído a partir do diário)
+        self.N = self.N_base
+        self.removidos = set()
+        self.df_extra = {}          # termo -> variação do df
+        self.delta_ids = []         # documentos novos: número = N_base + j
+        self.delta_num = {}         # id -> número (documentos novos)
+        self.delta_fwd = []         # [{termo: tf}]
+        self.delta_post = {}        # termo -> [(número, tf)]
+        self.dA, self.dB, self.dC = [], [], []
+        self._BC_copiado = False
+        self.ops_diario = 0
+        caminho = self._caminho_diario()
+        if os.path.exists(caminho):
+            with open(caminho, "r", encoding="utf-8") as f:
+                for linha in f:
+                    if linha.strip():
+                        op = json.loads(linha)
+                        if op["op"] == "add":
+                            self._adicionar(op["id"], op["tokens"])
+                        else:
+                            self._remover(op["id"])
+                        self.ops_diario += 1
+        self._diario = open(caminho, "a", encoding="utf-8")
+
+    # ---- criação / compactação ----
+    @classmethod
+    def criar(cls, diretorio, documentos_tokens=(), vocab=None):
+        """novo índice a partir de [(doc_id, tokens)]"""
+        os.makedirs(diretorio, exist_ok=True)
+        docs = [(doc_id, _pesos_tf(tokens)) for doc_id, tokens in documentos_tokens]
+        cls._escrever_segmento(diretorio, 1, docs)
+        cls._escrever_meta(diretorio, 1, vocab)
+        return cls(diretorio)
+
+    @classmethod
+    def abrir(cls, diretorio, vocab=None):
+        if not os.path.exists(os.path.join(diretorio, "indice.json")):
+            return cls.criar(diretorio, (), vocab)
+        return cls(diretorio)
+
+    @staticmethod
+    def _escrever_meta(diretorio, geracao, vocab):
+        tmp = os.path.join(diretorio, "indice.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"geracao": geracao, "vocab": sorted(vocab) if vocab is not None else None}, f)
+        os.replace(tmp, os.path.join(diretorio, "indice.json"))
+
+    @staticmethod
+    def _escrever_segmento(diretorio, geracao, docs):
+        # docs: [(doc_id, {termo: tf})] só documentos vivos
+        seg = os.path.join(diretorio, f"seg_{geracao}")
+        os.makedirs(seg, exist_ok=True)
+        lista_termos = sorted({t for _, pesos in docs for t in pesos})
+        num = {t: i for i, t in enumerate(lista_termos)}
+        fwd_inicio = np.zeros(len(docs) + 1, dtype=np.int64)
+        fwd_inicio[1:] = np.cumsum([len(p) for _, p in docs])
+        fwd_termos = np.fromiter((num[t] for _, p in docs for t in p), dtype=np.int32, count=fwd_inicio[-1])
+        fwd_tf = np.fromiter((w for _, p in docs for w in p.values()), dtype=np.float64, count=fwd_inicio[-1])
+        fwd_docs = np.repeat(np.arange(len(docs), dtype=np.int32), np.diff(fwd_inicio))
+        # postings = índice direto ordenado por termo (estável: documentos em ordem crescente)
+        ordem = np.argsort(fwd_termos, kind='stable')
+        df = np.bincount(fwd_termos, minlength=len(lista_termos)).astype(np.int64)
+        post_inicio = np.zeros(len(lista_termos) + 1, dtype=np.int64)
+        post_inicio[1:] = np.cumsum(df)
+        tf2 = fwd_tf ** 2
+        log_df = np.log10(np.maximum(df, 1))[fwd_termos]
+        arrays = {
+            "post_inicio": post_inicio, "post_docs": fwd_docs[ordem], "post_tf": fwd_tf[ordem],
+            "fwd_inicio": fwd_inicio, "fwd_termos": fwd_termos, "fwd_tf": fwd_tf, "df": df,
+            "A": np.bincount(fwd_docs, tf2, minlength=len(docs)),
+            "B": np.bincount(fwd_docs, tf2 * log_df, minlength=len(docs)),
+            "C": np.bincount(fwd_docs, tf2 * log_df ** 2, minlength=len(docs)),
+        }
+        for nome, strings in (("termos", lista_termos), ("ids", [d for d, _ in docs])):
+            dados, offs = _blob(strings)
+            with open(os.path.join(seg, nome + ".bin"), "wb") as f:
+                f.write(dados)
+            arrays[nome] = offs
+        arrays["ids_ordem"] = np.array(sorted(range(len(docs)), key=lambda i: docs[i][0].encode('utf-8')), dtype=np.int64)
+        for nome, a in arrays.items():
+            np.save(os.path.join(seg, nome + ".npy"), a)
+
+    def _caminho_diario(self, geracao=None):
+        return os.path.join(self.diretorio, f"diario_{self.geracao if geracao is None else geracao}.jsonl")
+
+    def documentos(self):
+        """(doc_id, {termo: tf}) de todos os documentos vivos"""
+        lista_termos = [self.termos[t] for t in range(len(self.termos))]
+        inicio = self.fwd_inicio.tolist()
+        fwd_termos = self.fwd_termos.tolist()
+        fwd_tf = self.fwd_tf.tolist()
+        for d in range(self.N_base):
+            if d not in self.removidos:
+                a, b = inicio[d], inicio[d + 1]
+                yield self.ids[d], {lista_termos[t]: w for t, w in zip(fwd_termos[a:b], fwd_tf[a:b])}
+        for j, doc_id in enumerate(self.delta_ids):
+            if self.N_base + j not in self.removidos:
+                yield doc_id, self.delta_fwd[j]
+
+    def compactar(self):
+        """novo segmento com base + diário, troca atômica pelo indice.json"""
+        nova = self.geracao + 1
+        self._escrever_segmento(self.diretorio, nova, list(self.documentos()))
+        self._escrever_meta(self.diretorio, nova, self.vocab)
+        antiga = self.geracao
+        self.fechar()
+        shutil.rmtree(os.path.join(self.diretorio, f"seg_{antiga}"), ignore_errors=True)
+        if os.path.exists(self._caminho_diario(antiga)):
+            os.remove(self._caminho_diario(antiga))
+        self.__init__(self.diretorio)
+
+    def fechar(self):
+        self._diario.close()
+        self.termos = self.ids = None
+        for fh in self._arquivos:
+            fh.close()
+
+    # ---- atualização ----
+    def _df(self, termo):
+        t = self.termos.buscar(termo)
+        return (int(self.df_base[t]) if t >= 0 else 0) + self.df_extra.get(termo, 0)
+
+    def _ajustar_df(self, termo, n_antigo, n_novo):
+        # B/C dos documentos que contêm o termo, para o df passar de n_antigo a n_novo
+        if n_antigo <= 0 or n_novo <= 0:
+            return
+        l0, l1 = math.log10(n_antigo), math.log10(n_novo)
+        t = self.termos.buscar(termo)
+        if t >= 0:
+            if not self._BC_copiado:
+                self.B, self.C = np.array(self.B), np.array(self.C)
+                self._BC_copiado = True
+            a, b = self.post_inicio[t], self.post_inicio[t + 1]
+            docs = self.post_docs[a:b]
+            tf2 = self.post_tf[a:b] ** 2
+            self.B[docs] += tf2 * (l1 - l0)
+            self.C[docs] += tf2 * (l1 * l1 - l0 * l0)
+        for d, tf in self.delta_post.get(termo, ()):
+            j = d - self.N_base
+            self.dB[j] += tf * tf * (l1 - l0)
+            self.dC[j] += tf * tf * (l1 * l1 - l0 * l0)
+
+    def _numero(self, doc_id):
+        d = self.delta_num.get(doc_id)
+        if d is None:
+            d = self.ids.buscar(doc_id, self.ids_ordem)
+        return d if d >= 0 and d not in self.removidos else -1
+
+    def _adicionar(self, doc_id, tokens):
+        if self._numero(doc_id) >= 0:
+            raise ValueError(f"documento {doc_id} já existe")
+        d = self.N_base + len(self.delta_ids)
+        pesos = {t: 1 + math.log10(f) for t, f in Counter(tokens).items()}
+        A = B = C = 0.0
+        for termo, tf in pesos.items():
+            n = self._df(termo)
+            self._ajustar_df(termo, n, n + 1)
+            self.df_extra[termo] = self.df_extra.get(termo, 0) + 1
+            self.delta_post.setdefault(termo, []).append((d, tf))
+            l = math.log10(n + 1)
+            A += tf * tf
+            B += tf * tf * l
+            C += tf * tf * l * l
+        self.delta_ids.append(doc_id)
+        self.delta_num[doc_id] = d
+        self.delta_fwd.append(pesos)
+        self.dA.append(A)
+        self.dB.append(B)
+        self.dC.append(C)
+        self.N += 1
+
+    def _remover(self, doc_id):
+        d = self._numero(doc_id)
+        if d < 0:
+            raise KeyError(doc_id)
+        self.removidos.add(d)
+        if d < self.N_base:
+            a, b = self.fwd_inicio[d], self.fwd_inicio[d + 1]
+            termos = [self.termos[int(t)] for t in self.fwd_termos[a:b]]
+        else:
+            termos = list(self.delta_fwd[d - self.N_base])
+        for termo in termos:
+            n = self._df(termo)
+            self._ajustar_df(termo, n, n - 1)
+            self.df_extra[termo] = self.df_extra.get(termo, 0) - 1
+        self.N -= 1
+
+    def _registrar(self, op):
+        self._diario.write(json.dumps(op, ensure_ascii=False) + "\n")
+        self._diario.flush()
+        self.ops_diario += 1
+        if self.ops_diario >= self.LIMITE_DIARIO:
+            self.compactar()
+
+    def adicionar(self, doc_id, tokens):
+        self._adicionar(doc_id, tokens)
+        self._registrar({"op": "add", "id": doc_id, "tokens": list(tokens)})
+
+    def remover(self, doc_id):
+        self._remover(doc_id)
+        self._registrar({"op": "del", "id": doc_id})
+
+    # ---- consulta ----
+    def consultar(self, consulta_str, k=None):
+        """mesmo resultado de IndiceInvertido.consultar() sobre os documentos vivos"""
+        if self.N <= 0:
+            return []
+        L = math.log10(self.N)
+        docs, pesos, soma_quad_q = [], [], 0.0
+        for termo, f_iq in Counter(tokenizar(consulta_str, self.vocab)).items():
+            n = self._df(termo)
+            if n <= 0:
+                continue
+            idf = L - math.log10(n)
+            w_q = (1 + math.log10(f_iq)) * idf
+            if not w_q:
+                continue
+            soma_quad_q += w_q * w_q
+            t = self.termos.buscar(termo)
+            if t >= 0:
+                a, b = self.post_inicio[t], self.post_inicio[t + 1]
+                docs.append(self.post_docs[a:b])
+                pesos.append(self.post_tf[a:b] * (w_q * idf))
+            delta = self.delta_post.get(termo)
+            if delta:
+                docs.append(np.array([d for d, _ in delta], dtype=np.int64))
+                pesos.append(np.array([tf for _, tf in delta]) * (w_q * idf))
+        if not docs:
+            return []
+        tocados, inv = np.unique(np.concatenate(docs), return_inverse=True)
+        acumulado = np.bincount(inv, weights=np.concatenate(pesos))
+        if self.removidos:
+            vivo = ~np.isin(tocados, np.fromiter(self.removidos, dtype=np.int64))
+            tocados, acumulado = tocados[vivo], acumulado[vivo]
+        base = tocados < self.N_base
+        A = np.empty(len(tocados))
+        B = np.empty(len(tocados))
+        C = np.empty(len(tocados))
+        A[base], B[base], C[base] = self.A[tocados[base]], self.B[tocados[base]], self.C[tocados[base]]
+        j = tocados[~base] - self.N_base
+        A[~base], B[~base], C[~base] = np.take(self.dA, j), np.take(self.dB, j), np.take(self.dC, j)
+        normas = np.sqrt(np.maximum(L * L * A - 2 * L * B + C, 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sims = np.where(normas > 1e-12, acumulado / (normas * math.sqrt(soma_quad_q)), 0.0)
+        mascara = sims > 1e-12
+        tocados, sims = tocados[mascara], sims[mascara]
+        if k and len(sims) > k:
+            sel = np.argpartition(-sims, k - 1)[:k]
+            tocados, sims = tocados[sel], sims[sel]
+        ordem = np.lexsort((tocados, -sims))
+        return [(self.ids[d] if d < self.N_base else self.delta_ids[d - self.N_base], float(s))
+                for d, s in zip(tocados[ordem].tolist(), sims[ordem].tolist())]
+
+
+def _pesos_tf(tokens):
+    return {t: 1 + math.log10(f) for t, f in Counter(tokens).items()}
+
+
+def abrir_ou_atualizar(diretorio, documentos_tokens, vocab=vocabulario_permitido):
+    """
+    Abre o índice salvo em disco e aplica só a diferença para documentos_tokens
+    ({doc_id: tokens}): documentos novos são adicionados, alterados são trocados
+    e os que sumiram são removidos (tudo pelo diário). Recria do zero apenas
+    quando o índice não existe ou foi gerado com outro vocabulário.
+    """
+    vocab_meta = sorted(vocab) if vocab is not None else None
+    try:
+        with open(os.path.join(diretorio, "indice.json"), "r", encoding="utf-8") as f:
+            obsoleto = json.load(f).get("vocab") != vocab_meta
+    except (OSError, ValueError):
+        obsoleto = True
+    if obsoleto:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        return IndiceEmDisco.criar(diretorio, documentos_tokens.items(), vocab)
+
+    indice = IndiceEmDisco(diretorio)
+    salvos = dict(indice.documentos())
+    for doc_id in salvos.keys() - documentos_tokens.keys():
+        indice.remover(doc_id)
+    for doc_id, tokens in documentos_tokens.items():
+        pesos = salvos.get(doc_id)
+        if pesos is not None:
+            novos = _pesos_tf(tokens)
+            if pesos.keys() == novos.keys() and all(math.isclose(pesos[t], w) for t, w in novos.items()):
+                continue
+            indice.remover(doc_id)
+        indice.adicionar(doc_id, tokens)
+    return indice
+
+
+# =====================================================================
+# 6. BENCHMARK (corpus sintético, python exercicioRI.py --bench|--disco [n_docs])
+# =====================================================================
+def benchmark(n_docs=100000, n_termos=20000, tam_doc=80, n_consultas=1000, k=10, semente=0):
+    rnd = random.Random(semente)
+    # frequência dos termos com cauda longa (Zipf), como em texto real
+    termos = [f"t{i}" for i in range(n_termos)]
+    acumulado_zipf = list(itertools.accumulate(1.0 / (i + 1) for i in range(n_termos)))
+
+    t0 = time.perf_counter()
+    ind = IndiceInvertido()
+    for d in range(n_docs):
+        ind.adicionar(f"D{d}", rnd.choices(termos, cum_weights=acumulado_zipf, k=tam_doc))
+    ind.construir()
+    t_indice = time.perf_counter() - t0
+    consultas = [" ".join(rnd.choices(termos[50:5000], k=3)) for _ in range(n_consultas)]
+
+    t0 = time.perf_counter()
+    um_a_um = [ind.consultar(c, k) for c in consultas]
+    t_consulta = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lote = ind.consultar_lote(consultas, k)
+    t_lote_1 = time.perf_counter() - t0      # inclui montar os arrays/matriz
+    t0 = time.perf_counter()
+    lote = ind.consultar_lote(consultas, k)
+    t_lote = time.perf_counter() - t0
+
+    iguais = all([d for d, _ in a] == [d for d, _ in b] for a, b in zip(um_a_um, lote))
+    print(f"Corpus: {n_docs} documentos, {len(ind.termos)} termos, {sum(len(p) for p in ind.postings)} postings")
+    print(f"Indexação: {t_indice:.2f} s")
+    print(f"Consulta (heap, postings): {1e3 * t_consulta / n_consultas:.3f} ms/consulta")
+    print(f"Lote ({'SciPy' if sp is not None else 'NumPy'}): {1e3 * t_lote / n_consultas:.3f} ms/consulta "
+          f"({t_lote_1:.2f} s na primeira chamada)")
+    print(f"Top-{k} idêntico nos dois caminhos: {iguais}")
+
+
+def benchmark_disco(n_docs=100000, n_termos=20000, tam_doc=80, n_consultas=200, n_updates=1000, k=10, semente=0):
+    import tempfile
+    rnd = random.Random(semente)
+    termos = [f"t{i}" for i in range(n_termos)]
+    acumulado_zipf = list(itertools.accumulate(1.0 / (i + 1) for i in range(n_termos)))
+    gerar = lambda: rnd.choices(termos, cum_weights=acumulado_zipf, k=tam_doc)
+    consultas = [" ".join(rnd.choices(termos[50:5000], k=3)) for _ in range(n_consultas)]
+
+    def medir(ind):
+        t0 = time.perf_counter()
+        res = [ind.consultar(c, k) for c in consultas]
+        return res, 1e3 * (time.perf_counter() - t0) / n_consultas
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        t0 = time.perf_counter()
+        IndiceEmDisco.criar(diretorio, ((f"D{d}", gerar()) for d in range(n_docs))).fechar()
+        print(f"Criação do índice em disco ({n_docs} documentos): {time.perf_counter() - t0:.2f} s")
+
+        t0 = time.perf_counter()
+        ind = IndiceEmDisco.abrir(diretorio)
+        print(f"Abertura (mmap): {1e3 * (time.perf_counter() - t0):.1f} ms")
+        _, ms = medir(ind)
+        print(f"Consulta: {ms:.3f} ms/consulta")
+
+        remover = iter(rnd.sample(range(n_docs), n_updates // 10 + 1))
+        t0 = time.perf_counter()
+        for j in range(n_updates):
+            ind.adicionar(f"N{j}", gerar())
+            if j % 5 == 0:
+                ind.remover(f"D{next(remover)}" if j % 10 else f"N{j}")
+        print(f"Atualização: {1e3 * (time.perf_counter() - t0) / n_updates:.2f} ms/documento")
+        res_diario, ms = medir(ind)
+        print(f"Consulta com {ind.ops_diario} operações no diário: {ms:.3f} ms/consulta")
+
+        t0 = time.perf_counter()
+        ind.compactar()
+        print(f"Compactação: {time.perf_counter() - t0:.2f} s")
+        res_compacto, ms = medir(ind)
+        print(f"Consulta depois de compactar: {ms:.3f} ms/consulta")
+        iguais = all([d for d, _ in a] == [d for d, _ in b] for a, b in zip(res_diario, res_compacto))
+        print(f"Top-{k} idêntico (incremental x recalculado): {iguais}")
+        ind.fechar()
+
 # =====================================================================
 # 7. DEMONSTRANDO AS TRÊS BUSCAS DIFERENTES (Exigência do Professor)
 # =====================================================================
 if __name__ == "__main__":
+    if "--bench" in sys.argv or "--disco" in sys.argv:
+        args = [a for a in sys.argv[1:] if not a.startswith("--")]
+        n_docs = int(args[0]) if args else 100000
+        if "--bench" in sys.argv:
+            benchmark(n_docs)
+        if "--disco" in sys.argv:
+            benchmark_disco(n_docs)
+        sys.exit()
+
     print("VOCABULÁRIO UTILIZADO:", vocabulario)
+
+    # índice persistente ao lado do script: só a diferença em relação aos documentos é reindexada
+    if np is not None:
+        indice = abrir_ou_atualizar(INDICE_DIR, docs_tokenizados)
+    else:
+        indice = indice_em_memoria(docs_tokenizados)
     
     # Busca 1: A busca exata que estava no enunciado teórico da Atv 08
-    executar_consulta("logan ororo x-men")
+    executar_consulta(indice, "logan ororo x-men")
     
     # Busca 2: Buscando pelos membros cósmicos
-    executar_consulta("groot rocket guardiões")
+    executar_consulta(indice, "groot rocket guardiões")
     
     # Busca 3: Buscando pelos heróis da Terra
-    executar_consulta("stark parker vingadores")
\ No newline at end of file
+    executar_consulta(indice, "stark parker vingadores")
+
+    if np is not None:
+        indice.fechar()
\ No newline at end of file
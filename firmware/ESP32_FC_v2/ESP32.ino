@@ -615,9 +615,31 @@ void handleParamSet(const uint8_t* p) {
     sendParam((uint16_t)i);                                // ack p/ o GCS
 }
 
+// Hash da tabela (CRC32 de nome + valor float, na ordem dos índices), respondido
+// como PARAM_VALUE "_HASH_CHECK": o GCS compara com o cache e pula a lista inteira.
+uint32_t paramHash() {
+    uint32_t crc = 0xFFFFFFFF;
+    auto add = [&](const uint8_t* d, size_t n) {
+        for (size_t k = 0; k < n; k++) {
+            crc ^= d[k];
+            for (int b = 0; b < 8; b++) crc = (crc >> 1) ^ (0xEDB88320u & (0u - (crc & 1u)));
+        }
+    };
+    for (uint16_t i = 0; i < NPARAM; i++) {
+        add((const uint8_t*)g_params[i].name, strlen(g_params[i].name));
+        add((const uint8_t*)g_params[i].ptr, 4);
+    }
+    return ~crc;
+}
+
 // PARAM_REQUEST_READ wire: int16 idx[0..1], sys[2], comp[3], id[4..19]
 void handleParamReqRead(const uint8_t* p) {
     int16_t idx; memcpy(&idx, &p[0], 2);
+    if (idx == -1 && strncmp((const char*)&p[4], "_HASH_CHECK", 16) == 0) {
+        uint32_t h = paramHash(); float v; memcpy(&v, &h, 4);
+        mav_send_param_value(*g_mav, "_HASH_CHECK", v, NPARAM, 0xFFFF);
+        return;
+    }
     int i = (idx >= 0 && idx < (int)NPARAM) ? idx : findParam((const char*)&p[4]);
     if (i >= 0) sendParam((uint16_t)i);
 }
@@ -0,0 +1,380 @@
+"""
+Sincroniza os logs do ESP32 FC v2 (servidor web do AP, LittleFS) com uma pasta local.
+
+O firmware lista os arquivos em "/" (handleRoot: "<a href='/dl?f=NOME'>NOME</a> (N B)"),
+entrega cada um em "/dl?f=NOME" (handleDownload) e apaga todos em "/clear".
+Este cliente:
+
+  - lê o índice e baixa só o que é novo ou mudou (tamanho remoto x local);
+  - baixa vários arquivos ao mesmo tempo, cada thread com a sua conexão
+    keep-alive (reabre sozinha se o servidor fechar);
+  - retoma transferências: o parcial fica em NOME.part; com Range (206) pede só o
+    resto, sem Range (o WebServer do ESP32 sempre manda 200) pula os bytes já
+    salvos conferindo que batem com o parcial; log que só cresceu (o voo atual)
+    baixa só o trecho novo do mesmo jeito;
+  - confere o tamanho final com o do índice antes de renomear;
+  - processa os CSV enquanto chegam (pontos e distância parciais) e, com --db,
+    coloca os arquivos completos no banco do tracklog.py.
+
+Uso:
+    python logsync.py [pasta] [--host 192.168.4.1] [--jobs 4] [--db voos/] [--clear]
+    python logsync.py --serve <pasta_com_csv> [--port 8080] [--kbps 200]
+
+--serve sobe um servidor local que imita o do ESP32 (mesmo HTML, sem Range, uma
+pasta no lugar do LittleFS) para testar o cliente sem o avião:
+    python logsync.py --serve logs_teste --port 8080
+    python logsync.py baixados --host 127.0.0.1:8080 --db voos/
+"""
+
+import http.client
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import numpy as np
+    from tracklog import FlightDB, haversine
+except ImportError:     # sem numpy: sincroniza normalmente, só não calcula distância nem alimenta o banco
+    np = None
+    FlightDB = haversine = None
+
+DEFAULT_HOST = "192.168.4.1"       # IP padrão do AP do ESP32
+CHUNK = 16 << 10
+TIMEOUT_S = 10.0
+RETRIES = 3
+MANIFEST = ".logsync.json"
+
+_ENTRY = re.compile(r"<a href='/dl\?f=([^']+)'>[^<]*</a> \((\d+) B\)")
+
+
+def parse_index(html):
+    """[(nome, tamanho)] da página "/" do FC"""
+    return [(urllib.parse.unquote(n).lstrip("/"), int(size)) for n, size in _ENTRY.findall(html)]
+
+
+# =============================================================================
+# Processamento durante o download
+# =============================================================================
+class TrackStream:
+    """conta pontos e distância de um /trkN.csv à medida que os bytes chegam"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.tail = b""
+        self.points = 0
+        self.dist_m = 0.0
+        self.last = None
+
+    def feed(self, data):
+        data = self.tail + data
+        cut = data.rfind(b"\n") + 1
+        self.tail = data[cut:]
+        if not cut:
+            return
+        if np is None:
+            self.points += data[:cut].count(b"\n")
+            return
+        rows = [r.split(b",") for r in data[:cut].split(b"\n") if r and not r.startswith(b"ms,")]
+        rows = [r for r in rows if len(r) == 7]
+        if not rows:
+            return
+        try:
+            lat = np.array([float(r[1]) for r in rows])
+            lon = np.array([float(r[2]) for r in rows])
+        except ValueError:
+            return
+        if self.last is not None:
+            lat, lon = np.concatenate(([self.last[0]], lat)), np.concatenate(([self.last[1]], lon))
+        self.dist_m += float(haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]).sum())
+        self.last = (lat[-1], lon[-1])
+        self.points += len(rows)
+
+
+# =============================================================================
+# Cliente
+# =============================================================================
+class LogSync:
+    def __init__(self, dest, host=DEFAULT_HOST, jobs=4, log=print):
+        self.dest = dest
+        self.host = host
+        self.jobs = max(1, jobs)
+        self.log = log
+        self._local = threading.local()
+        self.bytes = 0
+        self.errors = []
+        self._lock = threading.Lock()
+        os.makedirs(dest, exist_ok=True)
+        self.manifest = {}
+        try:
+            with open(os.path.join(dest, MANIFEST), "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def _conn(self):
+        # uma conexão keep-alive por thread; http.client reconecta se o servidor fechar
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = self._local.conn = http.client.HTTPConnection(self.host, timeout=TIMEOUT_S)
+        return c
+
+    def _request(self, path, headers=None):
+        for attempt in range(2):
+            c = self._conn()
+            try:
+                c.request("GET", path, headers=headers or {})
+                return c.getresponse()
+            except (http.client.HTTPException, OSError):
+                # conexão velha derrubada pelo servidor: reabre uma vez
+                c.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def index(self):
+        r = self._request("/")
+        html = r.read().decode("utf-8", "replace")
+        if r.status != 200:
+            raise IOError(f"índice: HTTP {r.status}")
+        return parse_index(html)
+
+    def plan(self, entries):
+        """arquivos a baixar: novos, que cresceram ou que mudaram"""
+        todo = []
+        for name, size in entries:
+            path = os.path.join(self.dest, name)
+            have = os.path.getsize(path) if os.path.exists(path) else None
+            if have == size and self.manifest.get(name) == size:
+                continue
+            todo.append((name, size))
+        return todo
+
+    def fetch(self, name, size, stream=None):
+        """
+        baixa um arquivo para NOME.part retomando o que já existe; devolve o caminho final
+
+        stream: objeto com reset()/feed(bytes) (ex.: TrackStream) que recebe o arquivo
+        inteiro, em ordem, enquanto ele chega (reset() a cada tentativa)
+        """
+        path = os.path.join(self.dest, name)
+        part = path + ".part"
+        if not os.path.exists(part) and os.path.exists(path) and os.path.getsize(path) < size:
+            os.replace(path, part)          # log que cresceu: o que já temos vira o parcial
+        for attempt in range(RETRIES):
+            have = os.path.getsize(part) if os.path.exists(part) else 0
+            if have > size:
+                have = 0                    # remoto menor que o parcial: arquivo novo com o mesmo nome
+            if stream is not None:
+                stream.reset()
+            try:
+                self._fetch_into(name, part, have, stream)
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self._local.conn = None
+                if attempt == RETRIES - 1:
+                    raise
+                self.log(f"[WARN] {name}: {e}; retomando")
+        got = os.path.getsize(part)
+        if got < size:
+            # maior é normal: o /trkN.csv ativo ganha uma linha por segundo com fix
+            raise IOError(f"{name}: tamanho {got} < {size} do índice")
+        os.replace(part, path)
+        return path
+
+    def _fetch_into(self, name, part, have, stream):
+        headers = {"Range": f"bytes={have}-"} if have else {}
+        r = self._request("/dl?f=" + urllib.parse.quote("/" + name), headers)
+        if r.status not in (200, 206):
+            r.read()
+            raise IOError(f"{name}: HTTP {r.status}")
+        with open(part, "r+b" if os.path.exists(part) else "w+b") as f:
+            if r.status == 206:
+                pos = have
+                if stream is not None and have:
+                    stream.feed(f.read(have))        # o processamento vê o arquivo inteiro
+                f.seek(have)
+            else:
+                pos = 0     # servidor sem Range: o começo vem de novo e é conferido com o parcial
+            while True:
+                data = r.read(CHUNK)
+                if not data:
+                    break
+                self._count(len(data))
+                if pos < have:
+                    old = f.read(min(len(data), have - pos))
+                    if data.startswith(old):
+                        f.write(data[len(old):])
+                    else:
+                        f.seek(pos)          # conteúdo mudou (arquivo novo com o mesmo nome)
+                        f.truncate()
+                        have = pos
+                        f.write(data)
+                else:
+                    f.write(data)
+                pos += len(data)
+                if stream is not None:
+                    stream.feed(data)
+            f.truncate()
+
+    def _count(self, n):
+        with self._lock:
+            self.bytes += n
+
+    def sync(self, db=None):
+        """baixa o que falta; devolve a lista de arquivos completos baixados"""
+        t0 = time.perf_counter()
+        todo = self.plan(self.index())
+        if not todo:
+            self.log("nada novo no FC")
+            return []
+        streams = {name: TrackStream() for name, _ in todo}
+        done = []
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {pool.submit(self.fetch, name, size, streams[name]): (name, size) for name, size in todo}
+            for fut in as_completed(futures):
+                name, size = futures[fut]
+                try:
+                    path = fut.result()
+                except Exception as e:
+                    self.log(f"[ERRO] {name}: {e}")
+                    self.errors.append(name)
+                    continue
+                done.append(path)
+                size = os.path.getsize(path)     # o real, que pode ter crescido depois do índice
+                self.manifest[name] = size
+                s = streams[name]
+                self.log(f"{name:<14} {size:9d} B  {s.points:6d} pts  {s.dist_m / 1000:7.2f} km")
+        self._save_manifest()
+        dt = time.perf_counter() - t0
+        self.log(f"{len(done)}/{len(todo)} arquivos, {self.bytes / 1e6:.2f} MB em {dt:.2f} s "
+                 f"({self.bytes / 1e6 / dt if dt else 0:.2f} MB/s)")
+        if db is not None and done:
+            if FlightDB is None:
+                self.log("[WARN] numpy ausente; --db ignorado")
+                return done
+            fdb = FlightDB(db)
+            n = fdb.ingest(done)
+            if n:
+                fdb.save()
+            for path, err in fdb.errors:
+                self.log(f"[ERRO] banco: {path} ignorado: {err}")
+            self.log(f"banco {db}: {n} voo(s) novos/alterados, {len(fdb)} no total")
+        return done
+
+    def clear(self):
+        r = self._request("/clear")
+        r.read()
+        if r.status != 200:
+            raise IOError(f"/clear: HTTP {r.status}")
+        self.log("logs apagados no FC")
+
+    def _save_manifest(self):
+        tmp = os.path.join(self.dest, MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.dest, MANIFEST))
+
+
+# =============================================================================
+# Servidor de teste (imita handleRoot / handleDownload / handleClear do ESP32)
+# =============================================================================
+def serve(folder, port=8080, kbps=0):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, ctype, body):
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            names = sorted(n for n in os.listdir(folder) if n.endswith(".csv"))
+            if url.path == "/":
+                html = ("<html><head><meta name=viewport content='width=device-width,initial-scale=1'>"
+                        "<title>OpenRC FC logs</title></head><body style='font-family:sans-serif'>"
+                        "<h2>OpenRC AeroLink - Logs de voo</h2><ul>")
+                for n in names:
+                    size = os.path.getsize(os.path.join(folder, n))
+                    html += f"<li><a href='/dl?f={n}'>{n}</a> ({size} B)</li>"
+                html += ("</ul><p><a href='/clear' onclick=\"return confirm('Apagar todos os logs?')\">"
+                         "Apagar todos</a></p><p><a href='/update'>Atualizar firmware (OTA)</a></p></body></html>")
+                self._send(200, "text/html", html.encode())
+            elif url.path == "/dl":
+                q = urllib.parse.parse_qs(url.query)
+                if "f" not in q:
+                    return self._send(400, "text/plain", b"missing f")
+                name = os.path.basename(q["f"][0])
+                path = os.path.join(folder, name)
+                if not os.path.isfile(path):
+                    return self._send(404, "text/plain", b"not found")
+                with open(path, "rb") as f:
+                    data = f.read()
+                self.send_response(200)           # como o streamFile do ESP32: ignora Range
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                step = max(1, kbps * 1024 // 20) if kbps else len(data) or 1
+                for i in range(0, len(data), step):
+                    self.wfile.write(data[i:i + step])
+                    if kbps:
+                        time.sleep(0.05)
+            elif url.path == "/clear":
+                for n in names:
+                    os.remove(os.path.join(folder, n))
+                self._send(200, "text/html", b"<html><body>Logs apagados. Reinicie o ESP p/ novo log. "
+                                             b"<a href='/'>voltar</a></body></html>")
+            else:
+                self._send(404, "text/plain", b"not found")
+
+        def log_message(self, fmt, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"servindo {folder} em http://127.0.0.1:{port}/ (Ctrl+C para sair)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+def main(argv):
+    args, opts = [], {}
+    it = iter(argv)
+    for a in it:
+        if a in ("--host", "--jobs", "--db", "--serve", "--port", "--kbps"):
+            opts[a] = next(it)
+        elif a.startswith("--"):
+            opts[a] = True
+        else:
+            args.append(a)
+    if "--serve" in opts:
+        serve(opts["--serve"], int(opts.get("--port", 8080)), int(opts.get("--kbps", 0)))
+        return
+    if "--help" in opts:
+        print(__doc__)
+        return
+    s = LogSync(args[0] if args else "logs_fc", opts.get("--host", DEFAULT_HOST), int(opts.get("--jobs", 4)))
+    done = s.sync(opts.get("--db"))
+    if "--clear" in opts:
+        if s.errors:
+            print(f"[AVISO] {len(s.errors)} arquivo(s) com erro; /clear não enviado")
+        else:
+            s.clear()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,424 @@
+"""
+Cliente do protocolo PARAM do MAVLink para o ESP32 FC v2 (sem pymavlink).
+
+Fala MAVLink v1 como o mavlink_min.h do firmware, pela USB (115200) ou pelo
+TCP do AP (tcp:192.168.4.1:5760), e usa só o que o firmware responde:
+
+    PARAM_REQUEST_LIST  -> o FC manda a tabela inteira de uma vez (sendParam em laço)
+    PARAM_REQUEST_READ  -> um parâmetro por índice/nome; "_HASH_CHECK" (índice -1)
+                           devolve o CRC32 de nome+valor da tabela (paramHash)
+    PARAM_SET           -> aplica, grava na NVS e responde PARAM_VALUE (o ack)
+
+Tabela inteira: um PARAM_REQUEST_LIST; os índices que não chegaram (frame
+perdido/CRC ruim) são pedidos juntos, em sequência, com PARAM_REQUEST_READ e
+repetidos até completar. Com cache, a sincronização é um único pedido de
+_HASH_CHECK: se o hash bate com o da tabela salva, nada mais é transferido.
+
+Vários PARAM_SET vão em janela (até WINDOW sem ack, para não estourar o buffer
+serial do ESP32 enquanto ele grava na NVS); cada ack é conferido com o valor
+pedido (o firmware limita ao vmin/vmax) e os sem ack são reenviados.
+
+Uso:
+    python mavparam.py <porta|tcp:host:porta> list [--cache arq] [--force]
+    python mavparam.py <porta> get NOME [NOME ...]
+    python mavparam.py <porta> set NOME=valor [NOME=valor ...]
+    python mavparam.py <porta> save arquivo.param
+    python mavparam.py <porta> load arquivo.param      (só envia o que difere)
+"""
+
+import json
+import os
+import socket
+import struct
+import sys
+import time
+import zlib
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+STX = 0xFE
+GCS_SYSID = 255
+GCS_COMPID = 190
+FC_SYSID = 1
+FC_COMPID = 1
+
+MSG_PARAM_REQUEST_READ = 20
+MSG_PARAM_REQUEST_LIST = 21
+MSG_PARAM_VALUE = 22
+MSG_PARAM_SET = 23
+CRC_EXTRA = {MSG_PARAM_REQUEST_READ: 214, MSG_PARAM_REQUEST_LIST: 159, MSG_PARAM_VALUE: 220, MSG_PARAM_SET: 168}
+MAV_PARAM_TYPE_REAL32 = 9
+HASH_NAME = "_HASH_CHECK"
+
+_PARAM_VALUE = struct.Struct("<fHH16sB")
+_PARAM_REQUEST_READ = struct.Struct("<hBB16s")
+_PARAM_REQUEST_LIST = struct.Struct("<BB")
+_PARAM_SET = struct.Struct("<fBB16sB")
+_F32 = struct.Struct("<f")
+_U32 = struct.Struct("<I")
+
+WINDOW = 6            # PARAM_SET em voo sem ack
+GAP_S = 0.25          # silêncio que encerra uma rodada da lista
+ACK_TIMEOUT_S = 0.5
+RETRIES = 5
+DEFAULT_CACHE = "mavparam_cache.json"
+
+
+def _crc_table():
+    t = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+        t.append(crc)
+    return t
+
+
+_CRC = _crc_table()
+
+
+def x25(data, crc=0xFFFF):
+    """CRC X.25 do MAVLink (mav_crc_accumulate)"""
+    t = _CRC
+    for b in data:
+        crc = (crc >> 8) ^ t[(crc ^ b) & 0xFF]
+    return crc
+
+
+def f32(v):
+    """valor como o float do ESP32 o guarda"""
+    return _F32.unpack(_F32.pack(v))[0]
+
+
+def table_hash(params):
+    """paramHash() do firmware: CRC32 de nome + float32 LE, na ordem dos índices"""
+    crc = 0
+    for name, value in params:
+        crc = zlib.crc32(name.encode(), crc)
+        crc = zlib.crc32(_F32.pack(value), crc)
+    return crc
+
+
+def _name16(name):
+    return name.encode()[:16].ljust(16, b"\0")
+
+
+# =============================================================================
+# Transporte e framing
+# =============================================================================
+class _SerialLink:
+    def __init__(self, port, baud):
+        if serial is None:
+            raise RuntimeError("pyserial não disponível")
+        self.s = serial.Serial(port, baud, timeout=0)
+
+    def read(self):
+        return self.s.read(self.s.in_waiting or 1)
+
+    def write(self, data):
+        self.s.write(data)
+
+    def close(self):
+        self.s.close()
+
+
+class _TcpLink:
+    def __init__(self, host, port):
+        self.s = socket.create_connection((host, port), timeout=3.0)
+        self.s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.s.settimeout(0.02)
+
+    def read(self):
+        try:
+            data = self.s.recv(4096)
+        except socket.timeout:
+            return b""
+        if not data:
+            raise ConnectionError("FC fechou a conexão TCP")
+        return data
+
+    def write(self, data):
+        self.s.sendall(data)
+
+    def close(self):
+        self.s.close()
+
+
+def open_link(where, baud=115200):
+    if where.startswith("tcp:"):
+        host, _, port = where[4:].rpartition(":")
+        return _TcpLink(host, int(port))
+    return _SerialLink(where, baud)
+
+
+class ParamClient:
+    def __init__(self, link, cache=DEFAULT_CACHE, log=print):
+        self.link = link
+        self.cache = cache
+        self.log = log
+        self.seq = 0
+        self.buf = bytearray()
+        self.params = {}          # índice -> (nome, valor)
+        self.count = None
+        self.hash = None          # resposta do _HASH_CHECK
+        self.acks = {}            # nome -> último valor recebido (ack de PARAM_SET)
+        self.bad_crc = 0
+        self.frames_out = 0
+        self.frames_in = 0
+
+    # --- framing ---
+    def _frame(self, msgid, payload):
+        hdr = bytes((len(payload), self.seq & 0xFF, GCS_SYSID, GCS_COMPID, msgid))
+        self.seq += 1
+        crc = x25(bytes((CRC_EXTRA[msgid],)), x25(payload, x25(hdr)))
+        return bytes((STX,)) + hdr + payload + struct.pack("<H", crc)
+
+    def _send(self, frames):
+        # vários frames num único write: o FC recebe tudo de uma vez, sem ida-e-volta por item
+        self.link.write(b"".join(frames))
+        self.frames_out += len(frames)
+
+    def _pump(self, timeout):
+        """lê e trata o que chegar por até timeout s; devolve quantos PARAM_VALUE chegaram"""
+        deadline = time.monotonic() + timeout
+        got = 0
+        while True:
+            data = self.link.read()
+            if data:
+                self.buf += data
+                got += self._parse()
+            elif time.monotonic() >= deadline:
+                return got
+            else:
+                time.sleep(0.002)
+
+    def _parse(self):
+        buf = self.buf
+        got = 0
+        while True:
+            i = buf.find(STX)
+            if i < 0:
+                buf.clear()
+                return got
+            if i:
+                del buf[:i]
+            if len(buf) < 8:
+                return got
+            n = buf[1]
+            if len(buf) < n + 8:
+                return got
+            msgid = buf[5]
+            if msgid != MSG_PARAM_VALUE:
+                # telemetria (HEARTBEAT, ATTITUDE, ...) só é pulada pelo tamanho
+                if msgid in CRC_EXTRA or n > 255:
+                    del buf[:1]
+                else:
+                    del buf[:n + 8]
+                continue
+            crc = x25(bytes((CRC_EXTRA[msgid],)), x25(buf[1:6 + n]))
+            if crc != buf[6 + n] | (buf[7 + n] << 8) or n != _PARAM_VALUE.size:
+                self.bad_crc += 1
+                del buf[:1]          # STX falso ou frame corrompido: ressincroniza
+                continue
+            value, count, index, name, _ = _PARAM_VALUE.unpack_from(buf, 6)
+            raw = _U32.unpack_from(buf, 6)[0]
+            del buf[:n + 8]
+            name = name.split(b"\0", 1)[0].decode("ascii", "replace")
+            self.frames_in += 1
+            if name == HASH_NAME:
+                self.hash = raw          # bits do float, sem passar por float do Python
+            else:
+                self.count = count
+                self.params[index] = (name, value)
+                self.acks[name] = value
+            got += 1
+
+    # --- leitura ---
+    def missing(self):
+        return [i for i in range(self.count or 0) if i not in self.params]
+
+    def fetch_all(self):
+        """tabela inteira: uma lista + rodadas de PARAM_REQUEST_READ só para os buracos"""
+        self.params.clear()
+        self.count = None
+        self._send([self._frame(MSG_PARAM_REQUEST_LIST, _PARAM_REQUEST_LIST.pack(FC_SYSID, FC_COMPID))])
+        for attempt in range(RETRIES + 1):
+            # espera a rajada terminar (GAP_S sem nada novo)
+            deadline = time.monotonic() + 2.0
+            while time.monotonic() < deadline:
+                if self._pump(GAP_S) == 0 and self.count is not None:
+                    break
+            if self.count is None:
+                if attempt == RETRIES:
+                    raise TimeoutError("FC não respondeu ao PARAM_REQUEST_LIST")
+                self._send([self._frame(MSG_PARAM_REQUEST_LIST, _PARAM_REQUEST_LIST.pack(FC_SYSID, FC_COMPID))])
+                continue
+            gaps = self.missing()
+            if not gaps:
+                break
+            self.log(f"rodada {attempt + 1}: pedindo {len(gaps)} parâmetro(s) que faltaram")
+            self._send([self._frame(MSG_PARAM_REQUEST_READ, _PARAM_REQUEST_READ.pack(i, FC_SYSID, FC_COMPID, b"\0" * 16))
+                        for i in gaps])
+        if self.missing():
+            raise TimeoutError(f"faltaram {len(self.missing())} parâmetros depois de {RETRIES} rodadas")
+        return self.table()
+
+    def request_hash(self, timeout=0.5):
+        self.hash = None
+        self._send([self._frame(MSG_PARAM_REQUEST_READ,
+                                _PARAM_REQUEST_READ.pack(-1, FC_SYSID, FC_COMPID, _name16(HASH_NAME)))])
+        deadline = time.monotonic() + timeout
+        while self.hash is None and time.monotonic() < deadline:
+            self._pump(0.02)
+        return self.hash
+
+    def table(self):
+        return [self.params[i] for i in range(self.count or 0)]
+
+    def sync(self, force=False):
+        """tabela do FC, do cache quando o _HASH_CHECK bate; devolve (tabela, veio_do_cache)"""
+        cached = None
+        if not force and self.cache and os.path.exists(self.cache):
+            try:
+                with open(self.cache, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = None
+        if cached is not None:
+            h = self.request_hash()
+            table = [(n, f32(v)) for n, v in cached["params"]]
+            if h is not None and h == cached.get("hash") == table_hash(table):
+                self.params = dict(enumerate(table))
+                self.count = len(table)
+                return table, True
+            if h is None:
+                self.log("FC sem _HASH_CHECK (firmware antigo): baixando a tabela")
+        table = self.fetch_all()
+        self.save_cache()
+        return table, False
+
+    def save_cache(self):
+        if not self.cache:
+            return
+        table = self.table()
+        tmp = self.cache + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"hash": table_hash(table), "params": table}, f, indent=1)
+        os.replace(tmp, self.cache)
+
+    # --- escrita ---
+    def set_many(self, values):
+        """
+        PARAM_SET em lote, em janela, com ack por nome; devolve {nome: valor aplicado}.
+        Valores fora de vmin..vmax voltam limitados pelo firmware (avisado no log).
+        """
+        known = {name for name, _ in self.params.values()}
+        want = {name: f32(float(v)) for name, v in values.items()}
+        for name in want:
+            if known and name not in known:
+                raise KeyError(f"parâmetro desconhecido: {name}")
+        tries = dict.fromkeys(want, 0)
+        queue = list(want)
+        in_flight = {}                  # nome -> instante do envio
+        acked = {}
+        while queue or in_flight:
+            now = time.monotonic()
+            for name, t in list(in_flight.items()):
+                if now - t > ACK_TIMEOUT_S:
+                    del in_flight[name]
+                    if tries[name] >= RETRIES:
+                        raise TimeoutError(f"sem ack para {name}")
+                    queue.append(name)
+            frames = []
+            while queue and len(in_flight) < WINDOW:
+                name = queue.pop(0)
+                tries[name] += 1
+                self.acks.pop(name, None)
+                frames.append(self._frame(MSG_PARAM_SET, _PARAM_SET.pack(
+                    want[name], FC_SYSID, FC_COMPID, _name16(name), MAV_PARAM_TYPE_REAL32)))
+                in_flight[name] = now
+            if frames:
+                self._send(frames)
+            self._pump(0.005)
+            for name in list(in_flight):
+                if name in self.acks:
+                    del in_flight[name]
+                    acked[name] = self.acks.pop(name)
+                    if acked[name] != want[name]:
+                        self.log(f"[AVISO] {name}: pedido {want[name]:g}, FC aplicou {acked[name]:g} (limite)")
+        if self.count is not None and len(self.params) == self.count:
+            self.save_cache()
+        return acked
+
+
+# =============================================================================
+# Arquivos .param (formato do Mission Planner: NOME,VALOR)
+# =============================================================================
+def read_param_file(path):
+    out = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            name, value = line.replace("\t", ",").replace(" ", ",").split(",")[:2]
+            out[name] = float(value)
+    return out
+
+
+def write_param_file(path, table):
+    with open(path, "w", encoding="utf-8") as f:
+        for name, value in table:
+            f.write(f"{name},{value:.7g}\n")
+
+
+def main(argv):
+    args = [a for a in argv if not a.startswith("--")]
+    opts = {}
+    for k in ("--baud", "--cache"):
+        if k in argv:
+            opts[k] = argv[argv.index(k) + 1]
+            args.remove(opts[k])
+    if len(args) < 2:
+        print(__doc__)
+        return
+    where, cmd, rest = args[0], args[1], args[2:]
+    link = open_link(where, int(opts.get("--baud", 115200)))
+    pc = ParamClient(link, opts.get("--cache", DEFAULT_CACHE))
+    try:
+        t = time.perf_counter()
+        table, from_cache = pc.sync(force="--force" in argv)
+        dt = time.perf_counter() - t
+        current = dict(table)
+        if cmd == "list":
+            for name, value in table:
+                print(f"{name:<16} {value:.7g}")
+        elif cmd == "get":
+            for name in rest:
+                print(f"{name:<16} {current[name]:.7g}" if name in current else f"{name:<16} (não existe)")
+        elif cmd in ("set", "load"):
+            if cmd == "set":
+                values = {k: float(v) for k, v in (a.split("=", 1) for a in rest)}
+            else:
+                values = read_param_file(rest[0])
+            changed = {k: v for k, v in values.items() if k not in current or f32(v) != current[k]}
+            t = time.perf_counter()
+            acked = pc.set_many(changed) if changed else {}
+            print(f"{len(acked)} de {len(values)} parâmetro(s) enviados ({len(values) - len(changed)} já iguais) "
+                  f"em {1000 * (time.perf_counter() - t):.0f} ms")
+        elif cmd == "save":
+            write_param_file(rest[0], table)
+        else:
+            print(__doc__)
+            return
+        print(f"{len(table)} parâmetros {'do cache (hash igual)' if from_cache else 'baixados'} em {1000 * dt:.0f} ms; "
+              f"frames enviados {pc.frames_out}, recebidos {pc.frames_in}, CRC ruim {pc.bad_crc}")
+    finally:
+        link.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,321 @@
+"""
+SITL (software-in-the-loop) do laço de controle do ESP32 FC v2, vetorizado.
+
+Reproduz em NumPy, sobre um lote de B voos ao mesmo tempo (uma linha por
+conjunto de parâmetros / semente de ruído), as funções do ESP32.ino:
+
+    updateIMU()          filtro complementar, ALPHA = 0.98, dt 10 ms, gyro rad/s, accel m/s²
+    computeStabilized()  auto-nível: stick -> ângulo-alvo, P no erro + D na taxa
+    apply_expo()         manual: v*(1-e) + v³*e, vezes G_E / G_A
+    mixAndWriteElevon()  L = E - A, R = E + A, DIFF, norm_to_us, REFLEX_US, constrain, SRV_REV_L/R
+    applyFailsafe()      elevons em 1500 + REFLEX_US após RX_TIMEOUT_MS sem frame
+
+Parâmetros com os mesmos nomes da tabela g_params (STB_KP_RLL, MIX_GE, ...) e os
+mesmos defaults. O avião é um modelo simples de asa-voadora por eixo: servo de
+1a ordem, taxa com amortecimento aerodinâmico (p' = -p/tau + K·δ) e rajadas
+aleatórias; o MPU é simulado já alinhado (AHRS_ROT correto), com ruído no gyro e
+vibração no accel. Serve para comparar ganhos, não para prever o voo exato.
+
+Cenário: nivelado, em t_step o stick vai para (ail, ele) em auto-nível e fica.
+Métricas por eixo (ângulo real x alvo = stick * STB_MAXANG):
+    settle_s   último instante fora da faixa max(2°, 5% do degrau), desde o degrau
+    over_pct   sobressinal em % do degrau
+    sserr_deg  erro médio absoluto nos últimos 20% da simulação
+
+Uso:
+    python sitl.py [NOME=valor ...]                       um voo com os defaults do firmware
+    python sitl.py sweep STB_KP_RLL=0.004:0.04:12 STB_KD_RLL=0:0.012:12 [--seeds 4] [--jobs N] [--top 15] [--csv arq]
+    (faixa a:b:n = n valores de a a b; ou lista a,b,c)
+"""
+
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+RAD2DEG = 57.2957795
+G = 9.80665
+ALPHA = 0.98
+PWM_MIN, PWM_MAX = 1000, 2000
+REFLEX_US = 30
+RX_TIMEOUT_S = 0.200
+
+# defaults do firmware (g_params) + o que é constexpr/fixo no ESP32.ino
+FIRMWARE = {
+    "STB_RLL_SGN": 1.0, "STB_PIT_SGN": 1.0,
+    "SRV_REV_L": 0.0, "SRV_REV_R": 0.0,
+    "STB_KP_RLL": 0.012, "STB_KD_RLL": 0.0035,
+    "STB_KP_PIT": 0.012, "STB_KD_PIT": 0.0035,
+    "STB_MAXANG": 45.0,
+    "MIX_GE": 2.55, "MIX_GA": 2.55, "MIX_EXPO_E": 0.25, "MIX_EXPO_A": 0.25, "MIX_DIFF": -0.30,
+    "PITCH_LEVEL_OFFSET": 0.0,
+}
+
+# modelo do avião e dos sensores (não existem no firmware)
+AIRFRAME = {
+    "SIM_TAU_SRV": 0.05,      # constante de tempo do servo (s)
+    "SIM_TAU_RLL": 0.25,      # amortecimento em roll (s)
+    "SIM_K_RLL": 600.0,       # aceleração de roll (°/s²) por unidade de aileron normalizado
+    "SIM_TAU_PIT": 0.20,
+    "SIM_K_PIT": 500.0,
+    "SIM_GUST": 40.0,         # desvio padrão da rajada (°/s²)
+    "SIM_GYRO_NOISE": 0.01,   # rad/s
+    "SIM_ACC_NOISE": 0.8,     # m/s² (vibração do motor)
+    "SIM_GYRO_BIAS": 0.0,     # rad/s, resto de bias após a calibração
+}
+
+SCENARIO = {
+    "t_end": 4.0,        # s
+    "t_step": 0.5,       # s
+    "ail": 0.5,          # stick normalizado no degrau (-1..1)
+    "ele": 0.3,
+    "manual": False,     # True = passthrough com expo (CH8 baixo)
+    "failsafe_t": None,  # s: último frame CRSF (failsafe depois de RX_TIMEOUT_MS)
+    "dt": 0.01,          # updateIMU a 100 Hz
+    "substeps": 2,       # passos de física por passo de controle
+}
+
+
+def apply_expo(v, e):
+    return v * (1.0 - e) + v * v * v * e
+
+
+def norm_to_us(v):
+    return (1500.0 + np.clip(v, -1.0, 1.0) * 400.0).astype(np.int32)   # (int) trunca como no C
+
+
+def mix_elevon(E, A, p):
+    """mixAndWriteElevon(): (usL, usR) a partir de E (pitch) e A (roll)"""
+    L = E - A
+    R = E + A
+    k = 1.0 - p["MIX_DIFF"]
+    L = np.where(L < 0, L * k, L)
+    R = np.where(R < 0, R * k, R)
+    usL = np.clip(norm_to_us(L) + REFLEX_US, PWM_MIN, PWM_MAX)
+    usR = np.clip(norm_to_us(R) + REFLEX_US, PWM_MIN, PWM_MAX)
+    usL = np.where(p["SRV_REV_L"] > 0.5, 3000 - usL, usL)
+    usR = np.where(p["SRV_REV_R"] > 0.5, 3000 - usR, usR)
+    return usL, usR
+
+
+def compute_stabilized(ail, ele, att_roll, att_pitch, rate_roll, rate_pitch, p):
+    """computeStabilized(): (E, A); ângulos em graus, taxas em rad/s"""
+    err_roll = ail * p["STB_MAXANG"] - att_roll
+    err_pitch = ele * p["STB_MAXANG"] + p["PITCH_LEVEL_OFFSET"] - att_pitch
+    A = p["STB_RLL_SGN"] * (p["STB_KP_RLL"] * err_roll - p["STB_KD_RLL"] * rate_roll * RAD2DEG)
+    E = p["STB_PIT_SGN"] * (p["STB_KP_PIT"] * err_pitch - p["STB_KD_PIT"] * rate_pitch * RAD2DEG)
+    return E, A
+
+
+def update_imu(att_roll, att_pitch, gx, gy, ax, ay, az, dt):
+    """updateIMU(): filtro complementar (accel_roll/accel_pitch como no firmware)"""
+    accel_roll = np.arctan2(ay, az) * RAD2DEG
+    accel_pitch = np.arctan2(-ax, np.sqrt(ay * ay + az * az)) * RAD2DEG
+    att_roll = ALPHA * (att_roll + gx * RAD2DEG * dt) + (1.0 - ALPHA) * accel_roll
+    att_pitch = ALPHA * (att_pitch + gy * RAD2DEG * dt) + (1.0 - ALPHA) * accel_pitch
+    return att_roll, att_pitch
+
+
+def simulate(params, n, scenario=None, seed=0):
+    """
+    n voos em lote; params: nome -> escalar ou array (n,). Devolve dict de métricas (arrays (n,)).
+    """
+    sc = dict(SCENARIO, **(scenario or {}))
+    p = dict(FIRMWARE, **AIRFRAME)
+    for k, v in params.items():
+        if k not in p:
+            raise KeyError(f"parâmetro desconhecido: {k}")
+        p[k] = v
+    p = {k: (np.broadcast_to(np.asarray(v, np.float64), (n,)) if k in params else v) for k, v in p.items()}
+    rng = np.random.default_rng(seed)
+    dt, sub = sc["dt"], sc["substeps"]
+    h = dt / sub
+    steps = int(round(sc["t_end"] / dt))
+
+    z = lambda: np.zeros(n)
+    roll, pitch, p_rate, q_rate = z(), z(), z(), z()           # estado real (°, °/s)
+    dL, dR = z() + REFLEX_US / 400.0, z() + REFLEX_US / 400.0  # deflexão dos servos (normalizada)
+    att_roll, att_pitch = z(), z()                              # estimativa do filtro (°)
+
+    tgt_roll = sc["ail"] * p["STB_MAXANG"]
+    tgt_pitch = sc["ele"] * p["STB_MAXANG"] + p["PITCH_LEVEL_OFFSET"]
+    if sc["manual"]:
+        tgt_roll, tgt_pitch = z(), z()     # sem alvo em manual: mede só o que o avião fez
+    tgt_roll = np.broadcast_to(tgt_roll, (n,))
+    tgt_pitch = np.broadcast_to(tgt_pitch, (n,))
+    band_roll = np.maximum(2.0, 0.05 * np.abs(tgt_roll))
+    band_pitch = np.maximum(2.0, 0.05 * np.abs(tgt_pitch))
+    last_out_roll, last_out_pitch = z(), z()
+    peak_roll, peak_pitch = z(), z()
+    ss_roll, ss_pitch = z(), z()
+    ss_from = int(steps * 0.8)
+
+    for k in range(steps):
+        t = k * dt
+        stick = t >= sc["t_step"]
+        ail = sc["ail"] if stick else 0.0
+        ele = sc["ele"] if stick else 0.0
+
+        # --- sensores e updateIMU ---
+        rr, pr = np.radians(roll), np.radians(pitch)
+        noise = rng.standard_normal((5, n))
+        gx = np.radians(p_rate) + p["SIM_GYRO_BIAS"] + p["SIM_GYRO_NOISE"] * noise[0]
+        gy = np.radians(q_rate) + p["SIM_GYRO_BIAS"] + p["SIM_GYRO_NOISE"] * noise[1]
+        ax = -G * np.sin(pr) + p["SIM_ACC_NOISE"] * noise[2]
+        ay = G * np.sin(rr) * np.cos(pr) + p["SIM_ACC_NOISE"] * noise[3]
+        az = G * np.cos(rr) * np.cos(pr) + p["SIM_ACC_NOISE"] * noise[4]
+        att_roll, att_pitch = update_imu(att_roll, att_pitch, gx, gy, ax, ay, az, dt)
+
+        # --- controle: failsafe, auto-nível ou manual, mixagem ---
+        if sc["failsafe_t"] is not None and t > sc["failsafe_t"] + RX_TIMEOUT_S:
+            usL = usR = np.full(n, 1500 + REFLEX_US)          # applyFailsafe()
+        else:
+            if sc["manual"]:
+                E = apply_expo(ele, p["MIX_EXPO_E"]) * p["MIX_GE"]
+                A = apply_expo(ail, p["MIX_EXPO_A"]) * p["MIX_GA"]
+                E, A = np.broadcast_to(E, (n,)), np.broadcast_to(A, (n,))
+            else:
+                E, A = compute_stabilized(ail, ele, att_roll, att_pitch, gx, gy, p)
+            usL, usR = mix_elevon(E, A, p)
+        # servo reverso é instalação: o servo montado ao contrário desfaz o SRV_REV
+        cmdL = np.where(p["SRV_REV_L"] > 0.5, 3000 - usL, usL)
+        cmdR = np.where(p["SRV_REV_R"] > 0.5, 3000 - usR, usR)
+        cmdL = (cmdL - 1500) / 400.0
+        cmdR = (cmdR - 1500) / 400.0
+
+        # --- física (asa-voadora desacoplada), com rajadas ---
+        gust = p["SIM_GUST"] * rng.standard_normal((2, n))
+        for _ in range(sub):
+            dL += (cmdL - dL) * (h / p["SIM_TAU_SRV"])
+            dR += (cmdR - dR) * (h / p["SIM_TAU_SRV"])
+            da = (dR - dL) / 2.0
+            de = (dL + dR) / 2.0 - REFLEX_US / 400.0     # o reflex é a condição trimada
+            p_rate += (-p_rate / p["SIM_TAU_RLL"] + p["SIM_K_RLL"] * da + gust[0]) * h
+            q_rate += (-q_rate / p["SIM_TAU_PIT"] + p["SIM_K_PIT"] * de + gust[1]) * h
+            roll += p_rate * h
+            pitch += q_rate * h
+        roll = (roll + 180.0) % 360.0 - 180.0
+        pitch = np.clip(pitch, -90.0, 90.0)
+
+        # --- métricas online (memória O(n), sem guardar a trajetória) ---
+        if stick:
+            te = t + dt - sc["t_step"]
+            last_out_roll = np.where(np.abs(roll - tgt_roll) > band_roll, te, last_out_roll)
+            last_out_pitch = np.where(np.abs(pitch - tgt_pitch) > band_pitch, te, last_out_pitch)
+            peak_roll = np.maximum(peak_roll, roll * np.sign(tgt_roll))
+            peak_pitch = np.maximum(peak_pitch, pitch * np.sign(tgt_pitch))
+        if k >= ss_from:
+            ss_roll += np.abs(roll - tgt_roll)
+            ss_pitch += np.abs(pitch - tgt_pitch)
+
+    window = sc["t_end"] - sc["t_step"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = {
+            "roll_settle_s": np.where(last_out_roll >= window - dt / 2, np.inf, last_out_roll),
+            "roll_over_pct": np.maximum(0.0, (peak_roll - np.abs(tgt_roll)) / np.abs(tgt_roll) * 100.0),
+            "roll_sserr_deg": ss_roll / (steps - ss_from),
+            "pitch_settle_s": np.where(last_out_pitch >= window - dt / 2, np.inf, last_out_pitch),
+            "pitch_over_pct": np.maximum(0.0, (peak_pitch - np.abs(tgt_pitch)) / np.abs(tgt_pitch) * 100.0),
+            "pitch_sserr_deg": ss_pitch / (steps - ss_from),
+            "roll_deg": roll, "pitch_deg": pitch,
+        }
+    return {k: np.nan_to_num(v, nan=0.0, posinf=np.inf) for k, v in out.items()}
+
+
+# =============================================================================
+# Varredura de ganhos: produto cartesiano x sementes, em lotes por processo
+# =============================================================================
+def parse_range(text):
+    if ":" in text:
+        a, b, n = text.split(":")
+        return np.linspace(float(a), float(b), int(n)).tolist()
+    return [float(x) for x in text.split(",")]
+
+
+def _batch(args):
+    # um processo: um lote de conjuntos de parâmetros, repetido para cada semente
+    names, rows, scenario, seeds, seed0 = args
+    rows = np.asarray(rows, np.float64)
+    n = len(rows)
+    params = {name: np.tile(rows[:, i], seeds) for i, name in enumerate(names)}
+    m = simulate(params, n * seeds, scenario, seed0)
+    # média entre sementes (settle: pior caso, para não esconder oscilação)
+    agg = {}
+    for k, v in m.items():
+        v = v.reshape(seeds, n)
+        agg[k] = v.max(axis=0) if k.endswith("_settle_s") else v.mean(axis=0)
+    return agg
+
+
+def sweep(grid, scenario=None, seeds=4, jobs=None, batch=2048):
+    """grid: nome -> lista de valores. Devolve (nomes, linhas (N, P), métricas dict -> (N,))"""
+    names = list(grid)
+    rows = np.array(list(itertools.product(*(grid[k] for k in names))), np.float64).reshape(-1, len(names))
+    chunks = [rows[i:i + batch] for i in range(0, len(rows), batch)]
+    work = [(names, c.tolist(), scenario, seeds, 1000 + i) for i, c in enumerate(chunks)]
+    if len(work) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_batch, work))
+    else:
+        parts = [_batch(w) for w in work]
+    metrics = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]} if parts else {}
+    return names, rows, metrics
+
+
+def _score(m, axis):
+    # ordena por tempo de acomodação, desempate por sobressinal
+    return np.lexsort((m[axis + "_over_pct"], m[axis + "_settle_s"]))
+
+
+def main(argv):
+    opts, assigns = {}, {}
+    cmd = "run"
+    it = iter(argv)
+    for a in it:
+        if a in ("--seeds", "--jobs", "--top", "--csv", "--batch"):
+            opts[a] = next(it)
+        elif a == "--manual":
+            opts[a] = True
+        elif "=" in a:
+            k, v = a.split("=", 1)
+            assigns[k] = v
+        elif a in ("run", "sweep"):
+            cmd = a
+        else:
+            print(__doc__)
+            return
+    scenario = {"manual": True} if "--manual" in opts else None
+    if cmd == "run":
+        params = {k: float(v) for k, v in assigns.items()}
+        t = time.perf_counter()
+        m = simulate(params, 1, scenario)
+        print(" ".join(f"{k}={float(v[0]):.3f}" for k, v in m.items()))
+        print(f"({1000 * (time.perf_counter() - t):.0f} ms)")
+        return
+    grid = {k: parse_range(v) for k, v in assigns.items()}
+    seeds = int(opts.get("--seeds", 4))
+    jobs = int(opts["--jobs"]) if "--jobs" in opts else None
+    t = time.perf_counter()
+    names, rows, m = sweep(grid, scenario, seeds, jobs, int(opts.get("--batch", 2048)))
+    dt = time.perf_counter() - t
+    axis = "pitch" if any("PIT" in k for k in names) and not any("RLL" in k for k in names) else "roll"
+    order = _score(m, axis)
+    cols = ["roll_settle_s", "roll_over_pct", "roll_sserr_deg", "pitch_settle_s", "pitch_over_pct", "pitch_sserr_deg"]
+    print("  ".join(f"{n:>11}" for n in names + cols))
+    for i in order[:int(opts.get("--top", 15))]:
+        print("  ".join([f"{v:11.5g}" for v in rows[i]] + [f"{m[c][i]:11.3f}" for c in cols]))
+    total = len(rows) * seeds
+    print(f"{len(rows)} conjuntos x {seeds} sementes = {total} voos de {SCENARIO['t_end']:.0f} s em {dt:.2f} s "
+          f"({total * SCENARIO['t_end'] / dt:.0f} s de voo simulado por segundo, {os.cpu_count()} CPUs)")
+    if "--csv" in opts:
+        with open(opts["--csv"], "w") as f:
+            f.write(",".join(names + cols) + "\n")
+            for i in range(len(rows)):
+                f.write(",".join([repr(v) for v in rows[i].tolist()] + [f"{m[c][i]:.4f}" for c in cols]) + "\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
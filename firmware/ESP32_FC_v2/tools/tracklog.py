@@ -0,0 +1,396 @@
+"""
+Logs de trajeto do ESP32 FC v2 (/trkN.csv) -> banco de voos colunar.
+
+O firmware grava um CSV por boot (startLog() no ESP32.ino):
+
+    ms,lat,lon,alt_m,sats,spd_mps,crs_deg
+
+Este módulo carrega muitos desses arquivos de uma vez (np.loadtxt em C, sem
+laço por linha em Python), calcula as estatísticas de cada voo com haversine
+vetorizado e guarda tudo num diretório único:
+
+    flights.json           um registro por voo (arquivo, tamanho, mtime, linhas, estatísticas)
+    <coluna>.npy           as 7 colunas de todos os voos concatenadas (abertas com mmap)
+    grid_cell.npy          índice espacial: células (grade lat/lon de GRID_DEG graus)
+    grid_flight.npy        visitadas por cada voo, ordenadas por célula
+
+"Quais voos passaram por esta área" vira uma busca binária por linha de
+latitude no índice da grade e um refinamento exato só nos candidatos.
+
+Uso:
+    python tracklog.py ingest <db> <arquivos ou pastas...> [--jobs N]
+    python tracklog.py list <db>
+    python tracklog.py area <db> <lat0> <lon0> <lat1> <lon1>
+    python tracklog.py near <db> <lat> <lon> <raio_m>
+    python tracklog.py bench [n_arquivos] [linhas_por_arquivo]
+"""
+
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+COLUMNS = ("ms", "lat", "lon", "alt_m", "sats", "spd_mps", "crs_deg")
+DTYPES = (np.uint32, np.float64, np.float64, np.float32, np.uint8, np.float32, np.float32)
+HEADER = ",".join(COLUMNS)
+EARTH_R = 6371008.8     # raio médio da Terra (m)
+GRID_DEG = 0.01         # célula do índice espacial (~1.1 km em latitude)
+_NLON = int(round(360 / GRID_DEG))
+
+
+# =============================================================================
+# Leitura e estatísticas de um arquivo
+# =============================================================================
+def load_track(path):
+    """colunas (dict nome -> array) de um /trkN.csv; tolera a última linha cortada por queda de energia"""
+    with open(path, "rb") as f:
+        data = f.read()
+    data = data[:data.rfind(b"\n") + 1]          # descarta linha incompleta no fim
+    if data.startswith(b"ms,"):
+        data = data[data.find(b"\n") + 1:]
+    if not data.strip():
+        # só o cabeçalho: boot que nunca pegou fix (o firmware só grava com location válida)
+        return {name: np.empty(0, dt) for name, dt in zip(COLUMNS, DTYPES)}
+    try:
+        table = np.loadtxt(io.BytesIO(data), delimiter=",", ndmin=2, dtype=np.float64)
+    except ValueError:
+        # linha corrompida no meio (flash): só então cai para o caminho linha a linha
+        rows = []
+        for line in data.split(b"\n"):
+            parts = line.split(b",")
+            if len(parts) == len(COLUMNS):
+                try:
+                    rows.append([float(p) for p in parts])
+                except ValueError:
+                    pass
+        table = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+    if table.shape[1] != len(COLUMNS):
+        raise ValueError(f"{path}: esperado {len(COLUMNS)} colunas, achei {table.shape[1]}")
+    # pontos sem fix ficam em 0,0 em gravações antigas
+    table = table[(table[:, 1] != 0) | (table[:, 2] != 0)]
+    return {name: table[:, i].astype(dt) for i, (name, dt) in enumerate(zip(COLUMNS, DTYPES))}
+
+
+def haversine(lat0, lon0, lat1, lon1):
+    """distância em metros (arrays ou escalares, graus)"""
+    lat0, lon0, lat1, lon1 = (np.radians(x) for x in (lat0, lon0, lat1, lon1))
+    a = np.sin((lat1 - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+    return 2 * EARTH_R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def track_stats(cols):
+    """distância, velocidades, altitude, duração e bbox de um voo"""
+    n = len(cols["ms"])
+    if n == 0:
+        return {"points": 0}
+    lat, lon, alt = cols["lat"], cols["lon"], cols["alt_m"].astype(np.float64)
+    t = cols["ms"].astype(np.float64) / 1000.0
+    step = haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    dt = np.diff(t)
+    ok = dt > 0
+    v = step[ok] / dt[ok]
+    climb = np.diff(alt)
+    home = haversine(lat[0], lon[0], lat, lon)
+    return {
+        "points": int(n),
+        "duration_s": round(float(t[-1] - t[0]), 3),
+        "dist_m": round(float(step.sum()), 1),
+        "max_home_m": round(float(home.max()), 1),
+        "spd_max_mps": round(float(cols["spd_mps"].max()), 2),
+        "spd_avg_mps": round(float(step.sum() / (t[-1] - t[0])), 2) if t[-1] > t[0] else 0.0,
+        "spd_max_calc_mps": round(float(v.max()), 2) if len(v) else 0.0,
+        "alt_min_m": round(float(alt.min()), 1),
+        "alt_max_m": round(float(alt.max()), 1),
+        "climb_m": round(float(climb[climb > 0].sum()), 1),
+        "sats_min": int(cols["sats"].min()),
+        "bbox": [float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())],
+    }
+
+
+def grid_cells(lat, lon):
+    """ids das células da grade de cada ponto"""
+    ilat = np.floor((np.asarray(lat) + 90.0) / GRID_DEG).astype(np.int64)
+    ilon = np.floor((np.asarray(lon) + 180.0) / GRID_DEG).astype(np.int64) % _NLON
+    return ilat * _NLON + ilon
+
+
+def _ingest_one(path):
+    # roda no pool: carrega, calcula estatísticas e células (só dados picklable voltam);
+    # um arquivo ruim volta como erro (cols None) em vez de derrubar o lote
+    try:
+        cols = load_track(path)
+        return path, cols, track_stats(cols), np.unique(grid_cells(cols["lat"], cols["lon"]))
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}", None
+
+
+def find_tracks(paths):
+    out = []
+    for p in paths:
+        if os.path.isdir(p):
+            out += sorted(os.path.join(p, n) for n in os.listdir(p) if n.lower().endswith(".csv"))
+        else:
+            out.append(p)
+    return out
+
+
+# =============================================================================
+# Banco de voos colunar
+# =============================================================================
+class FlightDB:
+    def __init__(self, path):
+        self.path = path
+        self.flights = []               # registros: name, source, size, mtime, start, count, stats
+        self.columns = {name: np.empty(0, dt) for name, dt in zip(COLUMNS, DTYPES)}
+        self.grid_cell = np.empty(0, np.int64)
+        self.grid_flight = np.empty(0, np.int32)
+        self.errors = []                # (caminho, erro) do último ingest
+        meta = os.path.join(path, "flights.json")
+        if os.path.exists(meta):
+            with open(meta, "r", encoding="utf-8") as f:
+                self.flights = json.load(f)["flights"]
+            for name in COLUMNS:
+                self.columns[name] = np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+            self.grid_cell = np.load(os.path.join(path, "grid_cell.npy"), mmap_mode="r")
+            self.grid_flight = np.load(os.path.join(path, "grid_flight.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.flights)
+
+    def track(self, i):
+        """colunas do voo i (views no mmap)"""
+        f = self.flights[i]
+        return {name: c[f["start"]:f["start"] + f["count"]] for name, c in self.columns.items()}
+
+    def ingest(self, paths, jobs=None):
+        """
+        adiciona os arquivos novos ou alterados (tamanho/mtime); devolve quantos foram lidos.
+        Arquivos que falham ficam em ``self.errors`` [(caminho, erro)] e não entram
+        (a versão anterior no banco, se houver, é mantida).
+        """
+        self.errors = []
+        by_source = {f["source"]: i for i, f in enumerate(self.flights)}
+        todo = []
+        for p in find_tracks(paths):
+            src = os.path.abspath(p)
+            st = os.stat(p)
+            i = by_source.get(src)
+            if i is not None and self.flights[i]["size"] == st.st_size and self.flights[i]["mtime"] == st.st_mtime:
+                continue
+            todo.append((p, src, st))
+        if not todo:
+            return 0
+        if len(todo) >= 8 and jobs != 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(_ingest_one, [p for p, _, _ in todo], chunksize=4))
+        else:
+            results = [_ingest_one(p) for p, _, _ in todo]
+        ok = []
+        for t, r in zip(todo, results):
+            if r[1] is None:
+                self.errors.append((t[0], r[2]))
+            else:
+                ok.append((t, r))
+        if not ok:
+            return 0
+        todo = [t for t, _ in ok]
+        results = [r for _, r in ok]
+
+        # reconstrói as colunas: voos mantidos (do mmap) + novos, numa só concatenação por coluna
+        replaced = {by_source[src] for _, src, _ in todo if src in by_source}
+        parts, cells, flights = [], [], []
+        by_flight = np.argsort(self.grid_flight, kind="stable")
+        bounds = np.searchsorted(self.grid_flight[by_flight], np.arange(len(self.flights) + 1))
+        for i, f in enumerate(self.flights):
+            if i not in replaced:
+                parts.append(self.track(i))
+                cells.append(np.asarray(self.grid_cell[by_flight[bounds[i]:bounds[i + 1]]]))
+                flights.append(dict(f))
+        for (p, src, st), (_, cols, stats, c) in zip(todo, results):
+            parts.append(cols)
+            cells.append(c)
+            flights.append({"name": os.path.basename(p), "source": src, "size": st.st_size,
+                            "mtime": st.st_mtime, "stats": stats})
+        start = 0
+        for f, cols in zip(flights, parts):
+            f["start"], f["count"] = start, len(cols["ms"])
+            start += f["count"]
+        self.columns = {name: np.concatenate([c[name] for c in parts]).astype(dt, copy=False)
+                        for name, dt in zip(COLUMNS, DTYPES)}
+        fid = np.concatenate([np.full(len(c), i, np.int32) for i, c in enumerate(cells)]) if cells else np.empty(0, np.int32)
+        cell = np.concatenate(cells) if cells else np.empty(0, np.int64)
+        order = np.argsort(cell, kind="stable")
+        self.grid_cell, self.grid_flight = cell[order], fid[order]
+        self.flights = flights
+        return len(todo)
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        arrays = dict(self.columns, grid_cell=self.grid_cell, grid_flight=self.grid_flight)
+        for name, a in arrays.items():
+            tmp = os.path.join(self.path, name + ".tmp.npy")
+            np.save(tmp, np.asarray(a))
+            os.replace(tmp, os.path.join(self.path, name + ".npy"))
+        tmp = os.path.join(self.path, "flights.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"grid_deg": GRID_DEG, "columns": list(COLUMNS), "flights": self.flights}, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, "flights.json"))   # por último: o meta confirma as colunas
+
+    def _candidates(self, lat0, lon0, lat1, lon1):
+        # voos com alguma célula da grade dentro do retângulo (uma busca binária por linha de latitude)
+        (c0,), (c1,) = grid_cells([lat0], [lon0]), grid_cells([lat1], [lon1])
+        r0, r1 = c0 // _NLON, c1 // _NLON
+        l0, l1 = c0 % _NLON, c1 % _NLON
+        hits = []
+        for row in range(r0, r1 + 1):
+            base = row * _NLON
+            spans = [(l0, l1)] if l0 <= l1 else [(l0, _NLON - 1), (0, l1)]    # cruza o antimeridiano
+            for a, b in spans:
+                lo = np.searchsorted(self.grid_cell, base + a, "left")
+                hi = np.searchsorted(self.grid_cell, base + b, "right")
+                hits.append(self.grid_flight[lo:hi])
+        return np.unique(np.concatenate(hits)) if hits else np.empty(0, np.int32)
+
+    def flights_in(self, lat0, lon0, lat1, lon1):
+        """índices dos voos com pelo menos um ponto dentro do retângulo lat/lon"""
+        lat0, lat1 = min(lat0, lat1), max(lat0, lat1)
+        out = []
+        for i in self._candidates(lat0, lon0, lat1, lon1).tolist():
+            t = self.track(i)
+            lat, lon = t["lat"], t["lon"]
+            inside = (lat >= lat0) & (lat <= lat1)
+            inside &= ((lon >= lon0) & (lon <= lon1)) if lon0 <= lon1 else ((lon >= lon0) | (lon <= lon1))
+            if inside.any():
+                out.append(i)
+        return out
+
+    def flights_near(self, lat, lon, radius_m):
+        """índices dos voos que passaram a menos de radius_m do ponto, com a menor distância"""
+        dlat = np.degrees(radius_m / EARTH_R)
+        dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        out = []
+        for i in self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon).tolist():
+            t = self.track(i)
+            d = haversine(lat, lon, t["lat"], t["lon"]).min()
+            if d <= radius_m:
+                out.append((i, float(d)))
+        return out
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+def _print_flights(db, idx, extra=None):
+    for k, i in enumerate(idx):
+        f = db.flights[i]
+        s = f["stats"]
+        line = "{:<14} {:7d} pts {:8.1f} s {:9.1f} m  alt {:6.1f}..{:6.1f} m  vmax {:5.1f} m/s".format(
+            f["name"], s["points"], s.get("duration_s", 0), s.get("dist_m", 0),
+            s.get("alt_min_m", 0), s.get("alt_max_m", 0), s.get("spd_max_mps", 0))
+        if extra is not None:
+            line += "  " + extra[k]
+        print(line)
+
+
+def _synthetic(path, n, rnd):
+    # voo sintético: espiral em torno de um ponto aleatório, 5 Hz
+    lat0, lon0 = -19.9 + rnd.uniform(-1, 1), -43.9 + rnd.uniform(-1, 1)
+    k = np.arange(n)
+    r = 0.002 + 0.00001 * k
+    lat = lat0 + r * np.sin(k / 50.0)
+    lon = lon0 + r * np.cos(k / 50.0)
+    alt = 800 + 50 * np.sin(k / 300.0)
+    with open(path, "w") as f:
+        f.write(HEADER + "\n")
+        for row in zip((k * 200).tolist(), lat.tolist(), lon.tolist(), alt.tolist()):
+            f.write("%d,%.7f,%.7f,%.1f,9,12.3,180.0\n" % row)
+
+
+def _bench(n_files=200, rows=5000):
+    import random
+    import shutil
+    import tempfile
+
+    rnd = random.Random(1)
+    tmp = tempfile.mkdtemp()
+    try:
+        src = os.path.join(tmp, "src")
+        os.makedirs(src)
+        for i in range(n_files):
+            _synthetic(os.path.join(src, f"trk{i + 1}.csv"), rows, rnd)
+        db = FlightDB(os.path.join(tmp, "db"))
+        t = time.perf_counter()
+        n = db.ingest([src])
+        db.save()
+        t_ingest = time.perf_counter() - t
+        t = time.perf_counter()
+        db = FlightDB(db.path)
+        t_open = time.perf_counter() - t
+        db.flights_in(0, 0, 0, 0)      # primeira consulta paga o carregamento das páginas do índice
+        t = time.perf_counter()
+        hits = db.flights_in(-20.0, -44.0, -19.8, -43.8)
+        t_area = time.perf_counter() - t
+        # referência: varredura completa de todos os pontos
+        t = time.perf_counter()
+        brute = sorted({i for i in range(len(db)) if (
+            (db.track(i)["lat"] >= -20.0) & (db.track(i)["lat"] <= -19.8) &
+            (db.track(i)["lon"] >= -44.0) & (db.track(i)["lon"] <= -43.8)).any()})
+        t_brute = time.perf_counter() - t
+        assert hits == brute
+        total = n_files * rows
+        print(f"ingest: {n} arquivos, {total} pontos em {t_ingest:.2f} s ({total / t_ingest / 1e6:.2f} M pontos/s)")
+        print(f"abrir:  {1000 * t_open:.1f} ms")
+        print(f"area:   {len(hits)} voos em {1000 * t_area:.2f} ms (varredura completa {1000 * t_brute:.1f} ms)")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def main(argv):
+    args = [a for a in argv if not a.startswith("--")]
+    jobs = None
+    if "--jobs" in argv:
+        jobs = int(argv[argv.index("--jobs") + 1])
+        args.remove(str(jobs))
+    if not args:
+        print(__doc__)
+        return
+    cmd = args[0]
+    if cmd == "bench":
+        _bench(*(int(a) for a in args[1:3]))
+        return
+    if len(args) < 2:
+        print(__doc__)
+        return
+    db = FlightDB(args[1])
+    if cmd == "ingest":
+        t = time.perf_counter()
+        n = db.ingest(args[2:], jobs)
+        if n:
+            db.save()
+        for path, err in db.errors:
+            print(f"[ERRO] {path}: {err}")
+        print(f"{n} arquivo(s) novos/alterados, {len(db)} voos no banco ({time.perf_counter() - t:.2f} s)")
+    elif cmd == "list":
+        _print_flights(db, range(len(db)))
+    elif cmd == "area":
+        lat0, lon0, lat1, lon1 = (float(a) for a in args[2:6])
+        t = time.perf_counter()
+        idx = db.flights_in(lat0, lon0, lat1, lon1)
+        _print_flights(db, idx)
+        print(f"{len(idx)} de {len(db)} voos ({1000 * (time.perf_counter() - t):.2f} ms)")
+    elif cmd == "near":
+        lat, lon, radius = (float(a) for a in args[2:5])
+        t = time.perf_counter()
+        hits = db.flights_near(lat, lon, radius)
+        _print_flights(db, [i for i, _ in hits], [f"min {d:.0f} m" for _, d in hits])
+        print(f"{len(hits)} de {len(db)} voos ({1000 * (time.perf_counter() - t):.2f} ms)")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -113,13 +113,101 @@ PID pid_pitch(&g_input_pitch, &g_output_pitch, &g_setpoint_pitch, Kp_pitch, Ki_p
 // === FUNÇÕES AUXILIARES ===
 // =========================================================================
 
-// Helper para enviar JSON seguro (Thread Safe)
-void sendJsonSerial(const JsonDocument &doc)
+// Respostas enviadas com id (conferido pelo parser para saber se o comando respondeu)
+volatile uint32_t g_id_replies = 0;
+
+// Escreve uma linha JSON na Serial2 (chamar com g_serial_mutex tomado).
+// Se o comando veio com "id", a resposta devolve o mesmo id: o fc_bridge
+// manda vários comandos em sequência e casa as respostas por ele.
+void writeJsonLine(const JsonDocument &doc, long id)
 {
-  if (xSemaphoreTake(g_serial_mutex, portMAX_DELAY))
+  if (id < 0)
   {
     serializeJson(doc, Serial2);
     Serial2.println();
+    return;
+  }
+  char buf[512];
+  size_t n = serializeJson(doc, buf, sizeof(buf));
+  if (n > 2 && n < sizeof(buf) - 1 && buf[n - 1] == '}')
+  {
+    Serial2.write((const uint8_t *)buf, n - 1);
+    Serial2.printf(",\"id\":%ld}\n", id);
+  }
+  else
+  {
+    Serial2.write((const uint8_t *)buf, n);
+    Serial2.println();
+  }
+  g_id_replies++;
+}
+
+// Helper para enviar JSON seguro (Thread Safe)
+void sendJsonSerial(const JsonDocument &doc, long id = -1)
+{
+  if (xSemaphoreTake(g_serial_mutex, portMAX_DELAY))
+  {
+    writeJsonLine(doc, id);
+    xSemaphoreGive(g_serial_mutex);
+  }
+}
+
+// === TELEMETRIA BINÁRIA (push opcional para o RPi) ===
+// Frame: [0xB5][len][tipo][payload][crc16 LE]; len conta tipo+payload+crc e o
+// CRC-16/CCITT (poly 0x1021, início 0xFFFF) cobre tipo+payload. 0xB5 nunca
+// aparece nas linhas JSON (ASCII), então frames e respostas dividem a Serial2.
+const uint8_t TELEM_SYNC = 0xB5;
+const uint8_t TELEM_FRAME_STATE = 0x01;
+
+struct __attribute__((packed)) TelemState
+{
+  uint32_t t_ms;
+  int16_t roll_cdeg;  // graus * 100
+  int16_t pitch_cdeg; // graus * 100
+  uint16_t throttle_us;
+  uint8_t flags; // bit0 manual, bit1 failsafe, bit2 calibrando RC, bit3 s1, bit4 s2
+  uint8_t seq;
+  uint8_t ch[8]; // canais crus do rádio (0..255)
+};
+
+volatile uint16_t g_telem_bin_hz = 0; // 0 = desligado (telemetria só por pedido JSON)
+
+uint16_t crc16_ccitt(const uint8_t *p, size_t n)
+{
+  uint16_t crc = 0xFFFF;
+  while (n--)
+  {
+    crc ^= (uint16_t)(*p++) << 8;
+    for (int i = 0; i < 8; i++)
+      crc = (crc & 0x8000) ? (uint16_t)((crc << 1) ^ 0x1021) : (uint16_t)(crc << 1);
+  }
+  return crc;
+}
+
+void sendTelemetryFrame()
+{
+  static uint8_t seq = 0;
+  TelemState t;
+  t.t_ms = millis();
+  t.roll_cdeg = (int16_t)constrain(g_telemetry_roll * 100.0f, -32767.0f, 32767.0f);
+  t.pitch_cdeg = (int16_t)constrain(g_telemetry_pitch * 100.0f, -32767.0f, 32767.0f);
+  t.throttle_us = (uint16_t)g_cmd_throttle_us;
+  t.flags = (g_manual_mode ? 0x01 : 0) | (g_failsafe_active ? 0x02 : 0) | (g_rc_calibrating ? 0x04 : 0) |
+            (pkt.s1 == 1 ? 0x08 : 0) | (pkt.s2 == 1 ? 0x10 : 0);
+  t.seq = seq++;
+  memcpy(t.ch, pkt.p, sizeof(t.ch));
+
+  uint8_t frame[3 + sizeof(t) + 2];
+  frame[0] = TELEM_SYNC;
+  frame[1] = 1 + sizeof(t) + 2;
+  frame[2] = TELEM_FRAME_STATE;
+  memcpy(frame + 3, &t, sizeof(t));
+  uint16_t crc = crc16_ccitt(frame + 2, 1 + sizeof(t));
+  frame[3 + sizeof(t)] = crc & 0xFF;
+  frame[4 + sizeof(t)] = crc >> 8;
+  if (xSemaphoreTake(g_serial_mutex, portMAX_DELAY))
+  {
+    Serial2.write(frame, sizeof(frame));
     xSemaphoreGive(g_serial_mutex);
   }
 }
@@ -146,7 +234,7 @@ inline float applyDeadzone(float v, float dz)
   return sign * mag;
 }
 
-void savePidsToNVS()
+void savePidsToNVS(long id = -1)
 {
   preferences.begin("fc-config", false);
   preferences.putDouble("kp_roll", Kp_roll);
@@ -159,7 +247,7 @@ void savePidsToNVS()
   StaticJsonDocument<64> res;
   res["status"] = "ok";
   res["msg"] = "PIDs saved";
-  sendJsonSerial(res);
+  sendJsonSerial(res, id);
 }
 
 void loadPidsFromNVS()
@@ -174,29 +262,38 @@ void loadPidsFromNVS()
   preferences.end();
 }
 
-void saveRcCalibrationToNVS()
+// Não responde na serial: quem chamou junta o resultado na sua própria resposta
+// (um pedido com id recebe uma resposta só)
+bool saveRcCalibrationToNVS()
 {
-  preferences.begin("fc-rc", false);
+  if (!preferences.begin("fc-rc", false))
+    return false;
+  bool ok = true;
   char key[16];
   for (int i = 0; i < 8; i++)
   {
     snprintf(key, sizeof(key), "rcmin%d", i);
-    preferences.putInt(key, g_rc_min[i]);
+    ok &= preferences.putInt(key, g_rc_min[i]) > 0;
     snprintf(key, sizeof(key), "rcmax%d", i);
-    preferences.putInt(key, g_rc_max[i]);
+    ok &= preferences.putInt(key, g_rc_max[i]) > 0;
     snprintf(key, sizeof(key), "rccenter%d", i);
-    preferences.putInt(key, g_rc_center[i]);
+    ok &= preferences.putInt(key, g_rc_center[i]) > 0;
     snprintf(key, sizeof(key), "rctrim%d", i);
-    preferences.putInt(key, g_rc_trim[i]);
+    ok &= preferences.putInt(key, g_rc_trim[i]) > 0;
   }
-  preferences.putInt("servo_trim_l", g_servo_trim_l);
-  preferences.putInt("servo_trim_r", g_servo_trim_r);
-  preferences.putFloat("deadzone", g_deadzone);
+  ok &= preferences.putInt("servo_trim_l", g_servo_trim_l) > 0;
+  ok &= preferences.putInt("servo_trim_r", g_servo_trim_r) > 0;
+  ok &= preferences.putFloat("deadzone", g_deadzone) > 0;
   preferences.end();
+  return ok;
+}
+
+void sendRcSaveResult(bool saved, const char *msg, long id = -1)
+{
   StaticJsonDocument<64> res;
-  res["status"] = "ok";
-  res["msg"] = "RC Cal Saved";
-  sendJsonSerial(res);
+  res["status"] = saved ? "ok" : "error";
+  res["msg"] = saved ? msg : "RC NVS write failed";
+  sendJsonSerial(res, id);
 }
 
 void loadRcCalibrationFromNVS()
@@ -281,14 +378,11 @@ void performRcCalibration(uint32_t duration_ms)
   }
   for (int i = 0; i < 8; i++)
     g_rc_center[i] = (g_rc_min[i] + g_rc_max[i]) / 2;
-  saveRcCalibrationToNVS();
+  bool saved = saveRcCalibrationToNVS();
   g_rc_calibrating = false;
   if (!was_in_failsafe)
     g_failsafe_active = false;
-  StaticJsonDocument<64> res;
-  res["status"] = "ok";
-  res["msg"] = "RC Cal Done";
-  sendJsonSerial(res);
+  sendRcSaveResult(saved, "RC Cal Done");
 }
 
 void performCenterServos(uint32_t hold_ms)
@@ -319,7 +413,7 @@ void performCenterAndSave()
     else
       g_rc_center[i] = (g_rc_center[i] >= PWM_MIN && g_rc_center[i] <= PWM_MAX) ? g_rc_center[i] : 1500;
   }
-  saveRcCalibrationToNVS();
+  sendRcSaveResult(saveRcCalibrationToNVS(), "RC Cal Saved");
 }
 
 // =========================================================================
@@ -370,7 +464,8 @@ void taskRadioComm(void *pvParameters)
       g_failsafe_active = true;
 
     // 3. PARSER JSON (RPi)
-    if (Serial2.available())
+    // Várias linhas por passada: o fc_bridge escreve comandos em sequência
+    for (int n = 0; n < 8 && Serial2.available(); n++)
     {
       String cmdJson = Serial2.readStringUntil('\n');
       StaticJsonDocument<300> doc;
@@ -379,6 +474,8 @@ void taskRadioComm(void *pvParameters)
       if (!error)
       {
         const char *cmd = doc["cmd"];
+        long reqId = doc["id"] | -1L;
+        uint32_t repliesBefore = g_id_replies;
         if (strcmp(cmd, "get") == 0)
         {
           const char *param = doc["param"];
@@ -396,7 +493,7 @@ void taskRadioComm(void *pvParameters)
             pids["kp_p"] = Kp_pitch;
             pids["ki_p"] = Ki_pitch;
             pids["kd_p"] = Kd_pitch;
-            sendJsonSerial(res);
+            sendJsonSerial(res, reqId);
           }
           else if (strcmp(param, "telemetry") == 0)
           {
@@ -406,7 +503,7 @@ void taskRadioComm(void *pvParameters)
             res["p"] = g_telemetry_pitch;
             res["m"] = g_manual_mode ? "MANUAL" : "STAB";
             res["t"] = g_cmd_throttle_us;
-            sendJsonSerial(res);
+            sendJsonSerial(res, reqId);
           }
           else if (strcmp(param, "rc") == 0)
           {
@@ -438,8 +535,7 @@ void taskRadioComm(void *pvParameters)
               rc["servo_trim_r"] = g_servo_trim_r;
               rc["deadzone"] = g_deadzone;
 
-              serializeJson(res, Serial2);
-              Serial2.println();
+              writeJsonLine(res, reqId);
               xSemaphoreGive(g_serial_mutex);
             }
           }
@@ -469,11 +565,7 @@ void taskRadioComm(void *pvParameters)
                 i++;
               }
             }
-            saveRcCalibrationToNVS();
-            StaticJsonDocument<32> res;
-            res["status"] = "ok";
-            res["msg"] = "rc_all saved";
-            sendJsonSerial(res);
+            sendRcSaveResult(saveRcCalibrationToNVS(), "rc_all saved", reqId);
           }
           else
           {
@@ -499,7 +591,16 @@ void taskRadioComm(void *pvParameters)
               xSemaphoreGive(g_pid_mutex);
               StaticJsonDocument<32> res;
               res["status"] = "ok";
-              sendJsonSerial(res);
+              sendJsonSerial(res, reqId);
+            }
+            // Telemetria binária em push (Hz, 0 = desliga); não vai para a NVS
+            else if (strcmp(p, "telem_bin") == 0)
+            {
+              g_telem_bin_hz = constrain((int)v, 0, 200);
+              StaticJsonDocument<64> res;
+              res["status"] = "ok";
+              res["hz"] = g_telem_bin_hz;
+              sendJsonSerial(res, reqId);
             }
             // Trims
             else if (strncmp(p, "trim_ch", 7) == 0)
@@ -508,25 +609,25 @@ void taskRadioComm(void *pvParameters)
               if (idx >= 0 && idx < 8)
               {
                 g_rc_trim[idx] = (int)v;
-                saveRcCalibrationToNVS();
+                sendRcSaveResult(saveRcCalibrationToNVS(), "RC Cal Saved", reqId);
               }
             }
             else if (strcmp(p, "trim_servo_l") == 0)
             {
               g_servo_trim_l = (int)v;
-              saveRcCalibrationToNVS();
+              sendRcSaveResult(saveRcCalibrationToNVS(), "RC Cal Saved", reqId);
             }
             else if (strcmp(p, "trim_servo_r") == 0)
             {
               g_servo_trim_r = (int)v;
-              saveRcCalibrationToNVS();
+              sendRcSaveResult(saveRcCalibrationToNVS(), "RC Cal Saved", reqId);
             }
             else if (strcmp(p, "deadzone") == 0)
             {
               g_deadzone = (float)v;
               if (g_deadzone < 0) g_deadzone = 0;
               if (g_deadzone > 0.45f) g_deadzone = 0.45f;
-              saveRcCalibrationToNVS();
+              sendRcSaveResult(saveRcCalibrationToNVS(), "RC Cal Saved", reqId);
             }
           }
         }
@@ -537,7 +638,7 @@ void taskRadioComm(void *pvParameters)
             g_request_gyro_cal = true;
           }
           else if (strcmp(doc["name"], "save_pids") == 0)
-            savePidsToNVS();
+            savePidsToNVS(reqId);
           else if (strcmp(doc["name"], "cal_rc") == 0)
           {
             g_request_rc_cal = true;
@@ -551,8 +652,27 @@ void taskRadioComm(void *pvParameters)
             g_request_center_and_save = true;
           }
         }
+        // Comando com id que não gerou resposta (ações em fila, parâmetro
+        // desconhecido): responde mesmo assim para o fc_bridge não esperar o timeout
+        if (reqId >= 0 && g_id_replies == repliesBefore)
+        {
+          StaticJsonDocument<64> res;
+          bool queued = strcmp(cmd, "action") == 0;
+          res["status"] = queued ? "ok" : "error";
+          res["msg"] = queued ? "queued" : "no reply";
+          sendJsonSerial(res, reqId);
+        }
       }
     }
+
+    // 4. TELEMETRIA BINÁRIA (push, limitada pelo período desta task)
+    static uint32_t last_telem_ms = 0;
+    uint16_t telem_hz = g_telem_bin_hz;
+    if (telem_hz && millis() - last_telem_ms >= 1000u / telem_hz)
+    {
+      last_telem_ms = millis();
+      sendTelemetryFrame();
+    }
     vTaskDelay(pdMS_TO_TICKS(5));
   }
 }
@@ -568,6 +688,7 @@ void setup()
   g_pid_mutex = xSemaphoreCreateMutex();
   g_serial_mutex = xSemaphoreCreateMutex(); // Inicializa o Mutex Serial
 
+  Serial2.setRxBufferSize(1024); // comandos em sequência do fc_bridge (padrão: 256)
   Serial2.begin(115200, SERIAL_8N1, PIN_UART_RX, PIN_UART_TX);
   Serial2.setTimeout(5);
 
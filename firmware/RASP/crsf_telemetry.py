@@ -0,0 +1,237 @@
+"""
+Telemetria CRSF (ELRS / Crossfire) para o bridge do Raspberry Pi.
+
+Decodifica, direto de um fluxo de bytes, os frames de telemetria que trafegam
+na linha CRSF e atualiza o dicionário compartilhado ``telemetry_data`` sem
+nenhum pedido/resposta: a telemetria chega na taxa nativa do link.
+
+Frames suportados (payload big-endian, conforme a spec CRSF):
+  0x02 GPS             lat, lon (deg*1e7), gspd (km/h*10), hdg (deg*100), alt (m+1000), sats
+  0x08 BATTERY         tensão (V*10), corrente (A*10), consumo (mAh, 24 bits), restante (%)
+  0x14 LINK_STATISTICS RSSI1/RSSI2 (-dBm), LQ, SNR, antena, rf_mode, potência, RSSI/LQ/SNR downlink
+  0x1E ATTITUDE        pitch, roll, yaw (rad*10000)
+
+A posição do GPS CRSF vai em chaves próprias (``crsf_lat``, ``crsf_lon``,
+``crsf_sats``, ``crsf_fix``) para não brigar com o GPS NMEA do próprio Pi
+nas chaves ``lat``/``lon``/``sats``/``fix``; com ``gps_fallback`` ligado (Pi
+sem GPS) ela também é copiada para essas chaves.
+
+Constantes e CRC8 repetidos aqui (como no crsf_rx.h) para não acoplar esta
+pasta ao app de PC.
+"""
+
+import struct
+import threading
+import time
+
+CRSF_SYNC_BYTES = (0xC8, 0xEA, 0xEE)   # FC, rádio (handset), módulo TX
+CRSF_LEN_MIN = 2
+CRSF_LEN_MAX = 62
+CRSF_BAUDRATE = 420000
+
+CRSF_FRAMETYPE_GPS = 0x02
+CRSF_FRAMETYPE_BATTERY_SENSOR = 0x08
+CRSF_FRAMETYPE_LINK_STATISTICS = 0x14
+CRSF_FRAMETYPE_RC_CHANNELS_PACKED = 0x16
+CRSF_FRAMETYPE_ATTITUDE = 0x1E
+
+RAD2DEG = 57.29577951308232
+
+
+def _make_crc8_table(poly):
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return tuple(table)
+
+
+CRC8_TABLE = _make_crc8_table(0xD5)
+
+
+def crc8(data, crc=0):
+    t = CRC8_TABLE
+    for b in data:
+        crc = t[crc ^ b]
+    return crc
+
+
+# =============================================================================
+# Decodificadores (um por tipo de frame) -> dict com as chaves de telemetry_data
+# =============================================================================
+_GPS = struct.Struct('>iiHHHB')
+_BATT = struct.Struct('>HH3sB')
+_LINK = struct.Struct('>BBBbBBBBBb')
+_ATT = struct.Struct('>hhh')
+
+
+def decode_gps(p):
+    lat, lon, gspd, hdg, alt, sats = _GPS.unpack_from(p)
+    return {
+        "crsf_lat": lat / 1e7, "crsf_lon": lon / 1e7,
+        "gspd": gspd / 36.0,          # km/h*10 -> m/s
+        "hdg": hdg / 100.0,
+        "gps_alt": alt - 1000,
+        "crsf_sats": sats, "crsf_fix": sats > 0 and (lat != 0 or lon != 0),
+    }
+
+
+def decode_battery(p):
+    v, a, cap, pct = _BATT.unpack_from(p)
+    return {
+        "bat_v": v / 10.0, "bat_a": a / 10.0,
+        "bat_mah": int.from_bytes(cap, 'big'), "bat_pct": pct,
+    }
+
+
+def decode_link_stats(p):
+    (rssi1, rssi2, lq, snr, ant, rf_mode, tx_pwr,
+     d_rssi, d_lq, d_snr) = _LINK.unpack_from(p)
+    return {
+        "rssi": -(rssi2 if ant else rssi1), "lq": lq, "snr": snr,
+        "rf_mode": rf_mode, "tx_pwr": tx_pwr,
+        "rssi_down": -d_rssi, "lq_down": d_lq, "snr_down": d_snr,
+    }
+
+
+def decode_attitude(p):
+    pitch, roll, yaw = _ATT.unpack_from(p)
+    return {
+        "pitch": pitch / 10000.0 * RAD2DEG,
+        "roll": roll / 10000.0 * RAD2DEG,
+        "yaw": yaw / 10000.0 * RAD2DEG,
+    }
+
+
+# tipo -> (tamanho mínimo do payload, decodificador)
+DECODERS = {
+    CRSF_FRAMETYPE_GPS: (_GPS.size, decode_gps),
+    CRSF_FRAMETYPE_BATTERY_SENSOR: (_BATT.size, decode_battery),
+    CRSF_FRAMETYPE_LINK_STATISTICS: (_LINK.size, decode_link_stats),
+    CRSF_FRAMETYPE_ATTITUDE: (_ATT.size, decode_attitude),
+}
+
+
+# =============================================================================
+# Parser de fluxo (aceita pedaços de qualquer tamanho, guarda frames parciais)
+# =============================================================================
+class CrsfStreamParser:
+    def __init__(self, sync_bytes=CRSF_SYNC_BYTES):
+        self.sync_bytes = frozenset(sync_bytes)
+        self._buf = bytearray()
+        self.good_frames = 0
+        self.bad_frames = 0
+
+    def feed(self, data):
+        """Retorna a lista de (tipo, payload) completos e com CRC válido."""
+        buf = self._buf
+        buf += data
+        n = len(buf)
+        i = 0
+        frames = []
+        while n - i >= 4:
+            if buf[i] not in self.sync_bytes:
+                i += 1
+                continue
+            ln = buf[i + 1]
+            if ln < CRSF_LEN_MIN or ln > CRSF_LEN_MAX:
+                self.bad_frames += 1
+                i += 1
+                continue
+            end = i + 2 + ln
+            if end > n:
+                break                       # frame parcial: espera mais bytes
+            body = bytes(buf[i + 2:end - 1])
+            if crc8(body) != buf[end - 1]:
+                self.bad_frames += 1
+                i += 1                      # ressincroniza no próximo byte
+                continue
+            self.good_frames += 1
+            frames.append((body[0], body[1:]))
+            i = end
+        del buf[:i]
+        return frames
+
+
+class CrsfTelemetry:
+    """
+    Lê telemetria CRSF de uma porta serial numa thread e atualiza ``state``.
+
+    ``state`` é o dicionário compartilhado do bridge (telemetry_data); cada frame
+    decodificado faz um ``state.update(...)``. ``last_rx[tipo]`` guarda o
+    instante (time.time) do último frame de cada tipo. ``gps_fallback``: copia
+    ``crsf_lat``/... também para ``lat``/``lon``/``sats``/``fix``.
+    """
+
+    def __init__(self, state, port=None, baud=CRSF_BAUDRATE, gps_fallback=False):
+        self.state = state
+        self.gps_fallback = gps_fallback
+        self.port = port
+        self.baud = baud
+        self.parser = CrsfStreamParser()
+        self.last_rx = {}
+        self.counts = {}
+        self._lock = threading.Lock()    # counts: escrito pela thread de leitura, lido por stats()
+        self._ser = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def handle_frames(self, frames, now=None):
+        now = time.time() if now is None else now
+        for ftype, payload in frames:
+            dec = DECODERS.get(ftype)
+            if dec is None or len(payload) < dec[0]:
+                continue
+            try:
+                data = dec[1](payload)
+            except struct.error:
+                continue
+            self.state.update(data)
+            if ftype == CRSF_FRAMETYPE_GPS and self.gps_fallback:
+                self.state.update(lat=data["crsf_lat"], lon=data["crsf_lon"],
+                                  sats=data["crsf_sats"], fix=data["crsf_fix"])
+            self.last_rx[ftype] = now
+            with self._lock:
+                self.counts[ftype] = self.counts.get(ftype, 0) + 1
+
+    def feed(self, data):
+        self.handle_frames(self.parser.feed(data))
+
+    def is_fresh(self, ftype=CRSF_FRAMETYPE_ATTITUDE, max_age_s=0.5):
+        t = self.last_rx.get(ftype)
+        return t is not None and (time.time() - t) <= max_age_s
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            "good": self.parser.good_frames,
+            "bad": self.parser.bad_frames,
+            "by_type": {f"0x{k:02X}": v for k, v in counts.items()},
+        }
+
+    def start(self):
+        import serial
+        self._ser = serial.Serial(self.port, self.baud, timeout=0.1)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="CrsfTelemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        if self._ser:
+            self._ser.close()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                data = self._ser.read(self._ser.in_waiting or 1)
+                if data:
+                    self.feed(data)
+            except Exception as e:
+                print(f"⚠️ CRSF telemetria: {e}")
+                time.sleep(0.5)
@@ -0,0 +1,264 @@
+"""
+Link JSON com o ESP32_RX (Serial2) para o bridge do Raspberry Pi.
+
+Uma thread lê todas as linhas que chegam do ESP32; nenhuma resposta é
+descartada com ``reset_input_buffer``. Cada comando sai com um ``id`` e o
+firmware devolve o mesmo id na resposta, então vários comandos podem ser
+escritos em sequência (pipeline) e as respostas casadas por id. Com firmware
+antigo (sem eco de id) o link cai para um comando por vez, casado pela ordem.
+
+Janela do pipeline: os bytes em voo (comandos escritos e ainda sem resposta)
+ficam abaixo do buffer de RX da Serial2 do ESP32 (1024 bytes no firmware com
+eco de id), para nenhum comando ser perdido por overflow.
+
+Frames binários de telemetria (esp_telemetry.py) chegam misturados às linhas
+e vão para ``on_frames``.
+
+Linhas sem id e com ``"status":"info"`` (progresso das calibrações) e as
+respostas tardias das ações em fila vão para ``events``.
+
+O RTT (escrita do comando -> resposta) de cada pedido entra em ``RttStats``;
+``stats()`` compara o tempo de fio (bytes * 10 / baud) com o tempo gasto,
+para mostrar se o limite é a serial ou o resto do caminho.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+from esp_telemetry import EspStreamParser
+
+REPLY_TIMEOUT_S = 1.0
+ESP_RX_WINDOW = 900      # bytes em voo com eco de id (RX do ESP32 = 1024)
+MAX_BATCH = 64           # comandos por /api/batch
+
+
+class RttStats:
+    """Últimos ``n`` RTTs (s) + média móvel exponencial."""
+
+    def __init__(self, n=256, alpha=0.1):
+        self.samples = deque(maxlen=n)
+        self.alpha = alpha
+        self.ewma = None
+        self.count = 0
+
+    def add(self, dt):
+        self.samples.append(dt)
+        self.count += 1
+        self.ewma = dt if self.ewma is None else self.ewma + self.alpha * (dt - self.ewma)
+
+    def snapshot(self):
+        if not self.samples:
+            return {"count": 0}
+        s = sorted(self.samples)
+        ms = lambda v: round(v * 1000.0, 2)
+        return {
+            "count": self.count,
+            "last_ms": ms(self.samples[-1]),
+            "ewma_ms": ms(self.ewma),
+            "min_ms": ms(s[0]),
+            "p50_ms": ms(s[len(s) // 2]),
+            "p95_ms": ms(s[min(len(s) - 1, int(len(s) * 0.95))]),
+            "max_ms": ms(s[-1]),
+        }
+
+
+class _Pending:
+    __slots__ = ("id", "nbytes", "t0", "event", "reply", "data")
+
+    def __init__(self, rid, nbytes, t0):
+        self.id = rid
+        self.nbytes = nbytes
+        self.t0 = t0
+        self.event = threading.Event()
+        self.reply = None
+        self.data = None
+
+
+class EspLink:
+    """
+    Pedido/resposta com o ESP32 sobre uma ``serial.Serial`` já aberta.
+
+    ``request(cmd)`` manda um comando (dict) e devolve a linha de resposta;
+    ``batch(cmds)`` escreve vários em sequência e devolve as respostas na
+    ordem dos comandos. Falhas viram o mesmo JSON de erro de antes
+    (``{"status":"error","msg":...}``).
+    """
+
+    def __init__(self, ser, baud=115200, timeout=REPLY_TIMEOUT_S, window=ESP_RX_WINDOW, on_frames=None):
+        self.ser = ser
+        self.parser = EspStreamParser()
+        self.on_frames = on_frames
+        self.baud = baud
+        self.timeout = timeout
+        self.window = window
+        self.echo_id = None   # None: ainda não sabemos; True/False após a 1a resposta
+        self.rtt = RttStats()
+        self.events = deque(maxlen=32)
+        self.counts = {"sent": 0, "replies": 0, "timeouts": 0, "garbage": 0,
+                       "unsolicited": 0, "bytes_out": 0, "bytes_in": 0}
+        self._pending = OrderedDict()   # id -> _Pending, na ordem de envio
+        self._inflight = 0
+        self._next_id = 1
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------ API
+    def start(self):
+        self.ser.timeout = 0.05
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="EspLink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def request(self, cmd):
+        return self.batch([cmd])[0][0]
+
+    def batch(self, cmds):
+        """Devolve ``[(linha, dict), ...]`` na ordem de ``cmds``."""
+        pend = []
+        i = 0
+        while i < len(cmds):
+            sent = self._send_window(cmds[i:])
+            pend.extend(sent)
+            i += len(sent)
+        out = []
+        for p in pend:
+            p.event.wait(max(0.0, p.t0 + self.timeout - time.monotonic()))
+            with self._cond:
+                if p.reply is None:
+                    self._drop(p)
+                    self.counts["timeouts"] += 1
+                    p.data = {"status": "error", "msg": "Timeout"}
+                    p.reply = json.dumps(p.data)
+            out.append((p.reply, p.data))
+        return out
+
+    def stats(self):
+        with self._cond:
+            c = dict(self.counts)
+        wire_s = (c["bytes_out"] + c["bytes_in"]) * 10.0 / self.baud
+        n = max(1, c["replies"])
+        return {
+            "echo_id": self.echo_id,
+            "rtt": self.rtt.snapshot(),
+            "wire_ms_per_cmd": round(wire_s * 1000.0 / n, 2),
+            "events": list(self.events),
+            **c,
+        }
+
+    # ------------------------------------------------------------ internos
+    def _fits(self, nbytes):
+        # Só chamado com algo em voo. Firmware sem eco de id (ou ainda não
+        # sabemos): um comando por vez, como antes.
+        return bool(self.echo_id) and self._inflight + nbytes <= self.window
+
+    def _send_window(self, cmds):
+        """Registra e escreve (num único write) os comandos que cabem na janela."""
+        with self._cond:
+            while True:
+                self._expire(time.monotonic())
+                lines, sent, nbytes = [], [], 0
+                for cmd in cmds:
+                    rid = self._next_id
+                    line = (json.dumps(dict(cmd, id=rid), separators=(",", ":")) + "\n").encode()
+                    if (self._pending or lines) and not self._fits(nbytes + len(line)):
+                        break
+                    self._next_id = rid % 1000000 + 1
+                    lines.append(line)
+                    sent.append(rid)
+                    nbytes += len(line)
+                if lines:
+                    break
+                self._cond.wait(0.05)
+            now = time.monotonic()
+            pend = []
+            for rid, line in zip(sent, lines):
+                p = _Pending(rid, len(line), now)
+                self._pending[rid] = p
+                self._inflight += len(line)
+                pend.append(p)
+            data = b"".join(lines)
+            try:
+                self.ser.write(data)
+            except Exception as e:
+                for p in pend:
+                    self._drop(p)
+                    p.data = {"status": "error", "msg": str(e)}
+                    p.reply = json.dumps(p.data)
+                    p.event.set()
+                return pend
+            self.counts["sent"] += len(pend)
+            self.counts["bytes_out"] += len(data)
+            return pend
+
+    def _drop(self, p):
+        if self._pending.pop(p.id, None) is not None:
+            self._inflight -= p.nbytes
+            self._cond.notify_all()
+
+    def _expire(self, now):
+        for p in list(self._pending.values()):
+            if now - p.t0 <= self.timeout:
+                break
+            self._drop(p)
+
+    def _resolve(self, p, line, data, now):
+        self._drop(p)
+        self.rtt.add(now - p.t0)
+        self.counts["replies"] += 1
+        p.reply, p.data = line, data
+        p.event.set()
+
+    def _handle_line(self, line, now):
+        if not (line.startswith("{") and line.endswith("}")):
+            print(f"LIXO: {line}")
+            self.counts["garbage"] += 1
+            return
+        try:
+            data = json.loads(line)
+        except ValueError:
+            print(f"LIXO: {line}")
+            self.counts["garbage"] += 1
+            return
+        with self._cond:
+            rid = data.get("id")
+            if rid is not None:
+                self.echo_id = True
+                p = self._pending.get(rid)
+                if p is not None:
+                    self._resolve(p, line, data, now)
+                    return
+            elif data.get("status") != "info" and self._pending and not self.echo_id:
+                # firmware antigo: a resposta é do (único) comando em voo
+                self.echo_id = False
+                self._resolve(next(iter(self._pending.values())), line, data, now)
+                return
+            self.counts["unsolicited"] += 1
+            self.events.append(data)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                print(f"⚠️ ESP32 serial: {e}")
+                time.sleep(0.5)
+                continue
+            if not chunk:
+                continue
+            now = time.monotonic()
+            self.counts["bytes_in"] += len(chunk)
+            lines, frames = self.parser.feed(chunk)
+            if frames and self.on_frames:
+                self.on_frames(frames)
+            for raw in lines:
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if line:
+                    self._handle_line(line, now)
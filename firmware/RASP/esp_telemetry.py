@@ -0,0 +1,226 @@
+"""
+Telemetria binária do ESP32_RX (push na Serial2) para o bridge do Raspberry Pi.
+
+Com ``{"cmd":"set","param":"telem_bin","value":HZ}`` o firmware passa a mandar,
+entre as linhas JSON de resposta, frames binários:
+
+  [0xB5][len][tipo][payload][crc16 LE]   len = tipo + payload + crc
+
+CRC-16/CCITT (poly 0x1021, início 0xFFFF) sobre tipo+payload: é o
+``binascii.crc_hqx``, em C, então conferir um frame custa o mesmo que achá-lo.
+0xB5 nunca aparece nas linhas JSON (ASCII), então ``EspStreamParser`` separa o
+fluxo em linhas de texto e frames. Um byte corrompido derruba só aquele frame
+(CRC: o frame declarado inteiro é pulado) ou aquela linha, não a conexão; o
+lixo antes do ``{`` de uma linha é cortado para a resposta seguinte não se
+perder. Os erros ficam contados em ``stats()``.
+
+Frame 0x01 (estado, little-endian, 20 bytes):
+  t_ms u32, roll i16 (graus*100), pitch i16 (graus*100), throttle u16 (us),
+  flags u8 (manual, failsafe, calibrando RC, s1, s2), seq u8, canais u8[8]
+
+25 bytes por amostra contra ~40 de pedido + ~60 de resposta no polling JSON.
+Benchmark do decodificador: ``python esp_telemetry.py``.
+"""
+
+import struct
+import time
+from binascii import crc_hqx
+
+TELEM_SYNC = 0xB5
+TELEM_FRAME_STATE = 0x01
+TELEM_MAX_LEN = 62
+MAX_LINE = 4096          # linha de texto sem '\n' maior que isso é lixo
+
+_STATE = struct.Struct('<IhhHBB8B')
+_CRC = struct.Struct('<H')
+_SEQ_OFFSET = 11         # seq dentro do payload de estado
+
+FLAG_MANUAL = 0x01
+FLAG_FAILSAFE = 0x02
+FLAG_RC_CAL = 0x04
+FLAG_S1 = 0x08
+FLAG_S2 = 0x10
+
+
+def unpack_state(p):
+    """Tupla crua do frame de estado: t_ms, roll, pitch, throttle, flags, seq, ch1..ch8."""
+    return _STATE.unpack_from(p)
+
+
+def decode_state(p):
+    v = _STATE.unpack_from(p)
+    flags = v[4]
+    return {
+        "roll": v[1] / 100.0, "pitch": v[2] / 100.0,
+        "mode": "MANUAL" if flags & FLAG_MANUAL else "STAB",
+        "throttle": v[3],
+        "failsafe": bool(flags & FLAG_FAILSAFE),
+        "rc_ch": list(v[6:]),
+    }
+
+
+# tipo -> (tamanho mínimo do payload, decodificador)
+DECODERS = {
+    TELEM_FRAME_STATE: (_STATE.size, decode_state),
+}
+
+
+def encode_frame(ftype, payload):
+    """Monta um frame como o firmware (usado pelo benchmark e por testes de bancada)."""
+    body = bytes([ftype]) + payload
+    return bytes([TELEM_SYNC, len(body) + 2]) + body + _CRC.pack(crc_hqx(body, 0xFFFF))
+
+
+class EspStreamParser:
+    """Separa linhas JSON e frames binários de um fluxo em pedaços de qualquer tamanho."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.good_frames = 0
+        self.bad_frames = 0
+        self.seq_gaps = 0
+        self.trimmed = 0
+        self._seq = None
+
+    def feed(self, data):
+        """Retorna ``(linhas, frames)``: linhas sem o '\\n', frames (tipo, payload) com CRC ok."""
+        buf = self._buf
+        buf += data
+        n = len(buf)
+        i = 0
+        lines, frames = [], []
+        while i < n:
+            if buf[i] == TELEM_SYNC:
+                if n - i < 2:
+                    break
+                ln = buf[i + 1]
+                if ln < 3 or ln > TELEM_MAX_LEN:
+                    self.bad_frames += 1
+                    i += 1
+                    continue
+                end = i + 2 + ln
+                if end > n:
+                    break                   # frame parcial: espera mais bytes
+                body = bytes(buf[i + 2:end - 2])
+                if crc_hqx(body, 0xFFFF) != buf[end - 2] | (buf[end - 1] << 8):
+                    self.bad_frames += 1
+                    i = end                 # pula o frame declarado: o resto dele não vira texto
+                    continue
+                self.good_frames += 1
+                frames.append((body[0], body[1:]))
+                i = end
+                continue
+            j = buf.find(b'\n', i)
+            k = buf.find(TELEM_SYNC, i, n if j == -1 else j)
+            if k != -1:
+                # texto cortado por um frame (só com bytes perdidos): vira linha-lixo
+                lines.append(self._clean(buf[i:k]))
+                i = k
+            elif j != -1:
+                lines.append(self._clean(buf[i:j]))
+                i = j + 1
+            else:
+                if n - i > MAX_LINE:
+                    i = n
+                break
+        del buf[:i]
+        return lines, frames
+
+    def _clean(self, line):
+        # restos de frame ou ruído antes da linha: começa no '{' (JSON) ou no 1o byte ASCII imprimível
+        k = line.find(b'{')
+        if k == -1:
+            k = 0
+            while k < len(line) and not 0x20 <= line[k] < 0x7F:
+                k += 1
+        if k:
+            self.trimmed += 1
+        return bytes(line[k:])
+
+    def check_seq(self, seq):
+        if self._seq is not None and seq != (self._seq + 1) & 0xFF:
+            self.seq_gaps += 1
+        self._seq = seq
+
+
+class EspTelemetry:
+    """
+    Aplica os frames binários em ``state`` (telemetry_data do bridge).
+
+    ``handle_frames`` é chamado pela thread do EspLink; ``is_fresh`` diz se o
+    push está chegando (aí o bridge não pergunta mais ao ESP32). ``on_state``,
+    se definido, recebe o payload de todo frame de estado (gravador de voo).
+    """
+
+    def __init__(self, state, parser):
+        self.state = state
+        self.parser = parser
+        self.last_rx = None
+        self.count = 0
+        self.on_state = None
+
+    def handle_frames(self, frames, now=None):
+        # Só o último frame de cada tipo vai para ``state`` (os anteriores do
+        # mesmo pedaço seriam sobrescritos de qualquer jeito); seq conta perdas.
+        now = time.time() if now is None else now
+        latest = {}
+        for ftype, payload in frames:
+            dec = DECODERS.get(ftype)
+            if dec is None or len(payload) < dec[0]:
+                continue
+            if ftype == TELEM_FRAME_STATE:
+                self.parser.check_seq(payload[_SEQ_OFFSET])
+                if self.on_state:
+                    self.on_state(payload)
+            latest[ftype] = payload
+            self.count += 1
+        for ftype, payload in latest.items():
+            self.state.update(DECODERS[ftype][1](payload))
+            self.last_rx = now
+
+    def is_fresh(self, max_age_s=0.5):
+        return self.last_rx is not None and (time.time() - self.last_rx) <= max_age_s
+
+    def stats(self):
+        p = self.parser
+        return {"frames": self.count, "good": p.good_frames, "bad": p.bad_frames,
+                "seq_gaps": p.seq_gaps, "trimmed": p.trimmed}
+
+
+def _benchmark(n=20000):
+    import json
+    state = {}
+    payloads = [_STATE.pack(i * 10, 1234 - i % 900, -321 + i % 500, 1500, i & 0x1B, i & 0xFF,
+                            *((i + c) & 0xFF for c in range(8))) for i in range(n)]
+    stream = b''.join(encode_frame(TELEM_FRAME_STATE, p) for p in payloads)
+    lines = [json.dumps({"status": "data", "r": 12.34, "p": -3.21, "m": "STAB", "t": 1500})
+             for _ in range(n)]
+    req = len(json.dumps({"cmd": "get", "param": "telemetry", "id": 123}, separators=(",", ":"))) + 1
+
+    parser = EspStreamParser()
+    tel = EspTelemetry(state, parser)
+    t = time.perf_counter()
+    for off in range(0, len(stream), 256):       # pedaços como chegam da UART
+        _, frames = parser.feed(stream[off:off + 256])
+        tel.handle_frames(frames)
+    bin_us = (time.perf_counter() - t) / n * 1e6
+
+    t = time.perf_counter()
+    for line in lines:
+        if line.startswith('{') and line.endswith('}'):
+            d = json.loads(line)
+            state['roll'] = d.get('r', 0)
+            state['pitch'] = d.get('p', 0)
+            state['mode'] = d.get('m', 'N/A')
+            state['throttle'] = d.get('t', 0)
+    json_us = (time.perf_counter() - t) / n * 1e6
+
+    bin_b = len(stream) / n
+    json_b = sum(len(l) + 1 for l in lines) / n + req
+    print(f"binário: {bin_us:.2f} us/amostra, {bin_b:.0f} B/amostra "
+          f"(máx. {11520 / bin_b:.0f} Hz a 115200), {tel.count} frames, {parser.bad_frames} ruins")
+    print(f"JSON:    {json_us:.2f} us/amostra, {json_b:.0f} B/amostra (pedido+resposta)")
+
+
+if __name__ == '__main__':
+    _benchmark()
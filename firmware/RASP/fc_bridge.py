@@ -5,8 +5,15 @@ import smbus
 import threading
 import json
 import math
-from flask import Flask, request, jsonify, send_from_directory
+import os
+import atexit
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+from crsf_telemetry import CrsfTelemetry
+from esp_link import EspLink, MAX_BATCH
+from esp_telemetry import EspTelemetry
+from param_cache import ParamCache
+from flight_recorder import FlightRecorder, read_records, REC_NAMES
 
 # === CONFIGURAÇÕES DE HARDWARE ===
 ESP_BAUD = 115200
@@ -19,18 +26,37 @@ GPS_BAUD = 9600
 BARO_ADDR = 0x77 # Endereço que achamos no i2cdetect
 BARO_BUS = 1
 
+# Telemetria CRSF (linha CRSF do RX ELRS num adaptador USB-serial).
+# None = desligado (telemetria só por polling JSON no ESP32).
+CRSF_TELEM_PORT = None   # ex.: '/dev/ttyUSB1'
+CRSF_TELEM_BAUD = 420000
+CRSF_MAX_AGE_S = 0.5     # atitude (CRSF ou push) mais velha que isso -> roll/pitch voltam a vir do ESP32
+
+# Telemetria binária em push do ESP32 (frames na própria Serial2, ver esp_telemetry.py).
+# 0 = desligado (polling JSON a cada /api/get telemetry).
+ESP_TELEM_BIN_HZ = 0     # ex.: 100
+
+# Gravador de voo (segmentos mmap, ver flight_recorder.py). None = desligado.
+# Reserva até 512 MiB (64 segmentos de 8 MiB) no cartão quando ligado.
+REC_DIR = None           # ex.: os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flightlog')
+REC_SAMPLE_HZ = 10       # amostragem de GPS/bateria (e atitude sem push binário)
+
 # === ESTADO GLOBAL (Dados compartilhados entre as threads) ===
 telemetry_data = {
     # Dados vindos do ESP32
     "roll": 0, "pitch": 0, "mode": "N/A", "throttle": 0, 
     # Dados vindos do RPi
     "lat": 0, "lon": 0, "sats": 0, "fix": False,
-    "alt": 0, "temp": 0, "press": 0
+    "alt": 0, "temp": 0, "press": 0,
+    # Dados vindos da telemetria CRSF (se CRSF_TELEM_PORT estiver ligado)
+    "yaw": 0, "gspd": 0, "hdg": 0, "gps_alt": 0,
+    "crsf_lat": 0, "crsf_lon": 0, "crsf_sats": 0, "crsf_fix": False,
+    "bat_v": 0, "bat_a": 0, "bat_mah": 0, "bat_pct": 0,
+    "rssi": 0, "lq": 0, "snr": 0,
+    # Dados vindos da telemetria binária do ESP32 (se ESP_TELEM_BIN_HZ > 0)
+    "failsafe": False, "rc_ch": [],
 }
 
-# Semáforo para impedir que duas rotas usem a Serial ao mesmo tempo
-serial_lock = threading.Lock()
-
 app = Flask(__name__)
 CORS(app)
 
@@ -48,6 +74,22 @@ for p in POSSIBLE_PORTS:
 
 if not ser_esp: print("❌ AVISO: ESP32 não encontrado na UART.")
 
+# Uma thread lê todas as respostas; os pedidos são casados por id (ver esp_link.py)
+esp_link = None
+esp_telem = None
+if ser_esp:
+    esp_link = EspLink(ser_esp, ESP_BAUD)
+    esp_telem = EspTelemetry(telemetry_data, esp_link.parser)
+    esp_link.on_frames = esp_telem.handle_frames
+    esp_link.start()
+    if ESP_TELEM_BIN_HZ:
+        r = esp_link.request({"cmd":"set", "param":"telem_bin", "value":ESP_TELEM_BIN_HZ})
+        if '"ok"' in r: print(f"✅ Telemetria binária do ESP32 a {ESP_TELEM_BIN_HZ} Hz")
+        else: print(f"⚠️ Firmware sem telemetria binária ({r}); usando polling JSON")
+
+# Cache dos gets que só mudam por set (pids, rc); ver param_cache.py
+param_cache = ParamCache()
+
 
 # --- 2. INICIALIZAÇÃO DO GPS (Pigpio) ---
 pi = pigpio.pi()
@@ -63,6 +105,16 @@ else:
         print("⚠️ GPS: Porta já estava aberta (OK)")
         gps_ready = True
 
+# --- 2b. TELEMETRIA CRSF (opcional, push na taxa do link) ---
+# Posição CRSF só ocupa lat/lon/sats/fix quando o Pi não tem GPS próprio
+crsf_telem = CrsfTelemetry(telemetry_data, CRSF_TELEM_PORT, CRSF_TELEM_BAUD, gps_fallback=not gps_ready)
+if CRSF_TELEM_PORT:
+    try:
+        crsf_telem.start()
+        print(f"✅ Telemetria CRSF em {CRSF_TELEM_PORT} @ {CRSF_TELEM_BAUD}")
+    except Exception as e:
+        print(f"❌ Telemetria CRSF indisponível: {e}")
+
 # --- 3. INICIALIZAÇÃO DO BARÔMETRO (BMP180) ---
 class BMP180:
     def __init__(self):
@@ -144,55 +196,115 @@ def thread_baro_loop():
         # telemetry_data['alt'] = alt
         time.sleep(1)
 
+# --- GRAVADOR DE VOO ---
+recorder = None
+if REC_DIR:
+    try:
+        recorder = FlightRecorder(REC_DIR)
+        recorder.start()
+        atexit.register(recorder.stop)   # último msync + índice
+        if esp_telem: esp_telem.on_state = recorder.log_state   # cada frame do push
+        print(f"✅ Gravador de voo em {REC_DIR}")
+    except Exception as e:
+        recorder = None
+        print(f"❌ Gravador de voo indisponível: {e}")
+
+def thread_rec_loop():
+    # Só enfileira (não toca no disco) e só quando o valor mudou
+    last = {}
+    def changed(kind, key):
+        if last.get(kind) == key: return False
+        last[kind] = key
+        return True
+    d = telemetry_data
+    while True:
+        if not (esp_telem and esp_telem.is_fresh()):
+            if changed('att', (d['roll'], d['pitch'], d['yaw'], d['throttle'], d['mode'])):
+                recorder.log_att(d)
+        if changed('gps', (d['lat'], d['lon'], d['sats'], d['fix'], d['gps_alt'])):
+            recorder.log_gps(d)
+        if changed('bat', (d['bat_v'], d['bat_a'], d['bat_mah'], d['rssi'], d['lq'], d['snr'])):
+            recorder.log_bat(d)
+        time.sleep(1.0 / REC_SAMPLE_HZ)
+
 # Inicia Threads
 t_gps = threading.Thread(target=thread_gps_loop); t_gps.daemon=True; t_gps.start()
+if recorder:
+    t_rec = threading.Thread(target=thread_rec_loop); t_rec.daemon=True; t_rec.start()
 # t_baro = threading.Thread(target=thread_baro_loop); t_baro.daemon=True; t_baro.start()
 
 
 # --- COMUNICAÇÃO SERIAL SEGURA ---
-def talk_to_esp(cmd_string):
-    if not ser_esp: return '{"status":"error", "msg":"Serial Off"}'
-    
-    # O Lock garante que ninguém interrompa uma conversa no meio
-    with serial_lock:
-        try:
-            ser_esp.reset_input_buffer()
-            ser_esp.write((cmd_string + '\n').encode())
-            line = ser_esp.readline().decode('utf-8', errors='ignore').strip()
-            if not line: return '{"status":"error", "msg":"Timeout"}'
-            
-            # Verifica se é JSON válido (começa com { e termina com })
-            if not (line.startswith('{') and line.endswith('}')):
-                print(f"LIXO: {line}")
-                return '{"status":"error", "msg":"Dados corrompidos"}'
-                
-            return line
-        except Exception as e:
-            return f'{{"status":"error", "msg":"{str(e)}"}}'
+def talk_to_esp(cmd):
+    """Manda um comando (dict) ao ESP32 e devolve a linha JSON de resposta."""
+    if not esp_link: return '{"status":"error", "msg":"Serial Off"}'
+    return esp_link.request(cmd)
+
+def talk_and_observe(cmd):
+    """talk_to_esp para set/action: mantém o cache de parâmetros coerente."""
+    resp = talk_to_esp(cmd)
+    try:
+        param_cache.observe(cmd, json.loads(resp))
+    except ValueError:
+        param_cache.invalidate()
+    return resp
+
+def cached_response(entry, hit):
+    if request.if_none_match.contains(entry.etag):
+        param_cache.counts["not_modified"] += 1
+        resp = Response(status=304)
+    else:
+        resp = Response(entry.body, mimetype='application/json')
+    resp.set_etag(entry.etag)
+    resp.headers['X-Cache'] = 'hit' if hit else 'miss'
+    return resp
 
 
 # --- ROTAS API ---
 
-@app.route('/api/get', methods=['POST'])
+@app.route('/api/get', methods=['GET', 'POST'])
 def api_get():
-    data = request.json
+    # GET /api/get?param=pids também vale (o navegador manda If-None-Match sozinho)
+    data = request.json if request.method == 'POST' else request.args
     
     # Se pedir telemetria, busca no ESP e mistura com GPS local
     if data.get('param') == 'telemetry':
-        resp = talk_to_esp('{"cmd":"telemetry"}')
+        # Push binário do ESP32 traz tudo (atitude, modo, throttle): nada a perguntar
+        if esp_telem and esp_telem.is_fresh(max_age_s=CRSF_MAX_AGE_S):
+            return jsonify(telemetry_data)
+        # A telemetria CRSF não tem modo nem throttle: esses continuam vindo do ESP32,
+        # só roll/pitch ficam com o CRSF enquanto ele estiver chegando
+        crsf_att = crsf_telem.is_fresh(max_age_s=CRSF_MAX_AGE_S)
+        resp = talk_to_esp({"cmd":"get", "param":"telemetry"})
         if "{" in resp:
             try:
                 d = json.loads(resp)
-                telemetry_data['roll'] = d.get('r', 0)
-                telemetry_data['pitch'] = d.get('p', 0)
+                if not crsf_att:
+                    telemetry_data['roll'] = d.get('r', 0)
+                    telemetry_data['pitch'] = d.get('p', 0)
                 telemetry_data['mode'] = d.get('m', 'N/A')
                 telemetry_data['throttle'] = d.get('t', 0)
             except: pass
         return jsonify(telemetry_data)
 
-    # Outros gets
-    cmd = json.dumps({"cmd":"get", "param":data['param']})
-    return talk_to_esp(cmd)
+    # Outros gets: pids/rc saem do cache até um set/action ou o TTL
+    param = data['param']
+    if param_cache.cacheable(param):
+        fresh = data.get('fresh') or 'no-cache' in request.headers.get('Cache-Control', '')
+        entry = None if fresh else param_cache.get(param)
+        if entry:
+            return cached_response(entry, True)
+        resp = talk_to_esp({"cmd":"get", "param":param})
+        try:
+            entry = param_cache.put(param, json.loads(resp))
+        except ValueError:
+            entry = None
+        return cached_response(entry, False) if entry else resp
+    return talk_to_esp({"cmd":"get", "param":param})
+
+@app.route('/api/crsf_stats', methods=['GET'])
+def api_crsf_stats():
+    return jsonify(crsf_telem.stats())
 
 @app.route('/api/set', methods=['POST'])
 def api_set():
@@ -210,18 +322,66 @@ def api_set():
             cmd_dict['servo_trim_r'] = d['servo_trim_r']
         if 'trim' in d and isinstance(d['trim'], list):
             cmd_dict['trim'] = d['trim']
-        cmd = json.dumps(cmd_dict)
-        return talk_to_esp(cmd)
+        return talk_and_observe(cmd_dict)
 
     # comportamento antigo para parâmetros simples (param + value)
-    cmd = json.dumps({"cmd":"set", "param":d['param'], "value":d.get('value')})
-    return talk_to_esp(cmd)
+    return talk_and_observe({"cmd":"set", "param":d['param'], "value":d.get('value')})
 
 @app.route('/api/action', methods=['POST'])
 def api_action():
     d = request.json
-    cmd = json.dumps({"cmd":"action", "name":d['name']})
-    return talk_to_esp(cmd)
+    return talk_and_observe({"cmd":"action", "name":d['name']})
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    # Vários get/set/action de uma vez, no formato do ESP32:
+    # {"commands": [{"cmd":"get","param":"pids"}, {"cmd":"set","param":"kp_roll","value":1.2}, ...]}
+    # Os comandos são escritos em sequência e as respostas voltam na mesma ordem.
+    d = request.json
+    cmds = d.get('commands') if isinstance(d, dict) else d
+    if not isinstance(cmds, list) or not cmds or len(cmds) > MAX_BATCH:
+        return jsonify({"status":"error", "msg":f"commands: lista de 1..{MAX_BATCH}"}), 400
+    for c in cmds:
+        if not isinstance(c, dict) or c.get('cmd') not in ('get', 'set', 'action'):
+            return jsonify({"status":"error", "msg":f"comando inválido: {c}"}), 400
+    if not esp_link:
+        return jsonify({"status":"error", "msg":"Serial Off"})
+    t0 = time.monotonic()
+    results = [data for _, data in esp_link.batch(cmds)]
+    for c, r in zip(cmds, results):
+        param_cache.observe(c, r)
+    return jsonify({"status":"ok", "results":results,
+                    "elapsed_ms":round((time.monotonic() - t0) * 1000.0, 2)})
+
+@app.route('/api/link_stats', methods=['GET'])
+def api_link_stats():
+    if not esp_link: return jsonify({"status":"error", "msg":"Serial Off"})
+    return jsonify(dict(esp_link.stats(), cache=param_cache.stats(), telem_bin=esp_telem.stats()))
+
+@app.route('/api/rec/status', methods=['GET'])
+def api_rec_status():
+    if not recorder: return jsonify({"status":"error", "msg":"Gravador desligado"})
+    return jsonify(recorder.stats())
+
+@app.route('/api/rec/query', methods=['GET'])
+def api_rec_query():
+    # /api/rec/query?t0=<epoch>&t1=<epoch>&type=att,gps&limit=5000
+    if not recorder: return jsonify({"status":"error", "msg":"Gravador desligado"})
+    a = request.args
+    names = {v: k for k, v in REC_NAMES.items()}
+    types = {names[n] for n in a.get('type', '').split(',') if n in names} or None
+    try:
+        limit = min(int(a.get('limit', 5000)), 50000)
+        t0, t1 = float(a.get('t0', 0)), float(a.get('t1', 'inf'))
+    except ValueError:
+        return jsonify({"status":"error", "msg":"limit inteiro, t0/t1 numéricos (epoch)"}), 400
+    if limit < 1:
+        return jsonify({"status":"error", "msg":"limit deve ser >= 1"}), 400
+    out = []
+    for t, kind, fields in read_records(REC_DIR, t0, t1, types):
+        out.append(dict(fields, t=t, type=kind))
+        if len(out) >= limit: break
+    return jsonify({"status":"ok", "records":out, "truncated":len(out) >= limit})
 
 @app.route('/')
 def index(): return send_from_directory('.', 'configurador.html')
@@ -0,0 +1,375 @@
+"""
+Gravador de voo (flight-data recorder) do bridge do Raspberry Pi.
+
+Registros de tamanho fixo (32 bytes: tempo, tipo, payload ``struct``) vão para
+segmentos pré-alocados e mapeados em memória (``mmap``) numa pasta:
+
+  rec_000001.frd, rec_000002.frd, ...   segmentos (SEGMENT_BYTES cada)
+  index.json                            t_first/t_last/count de cada segmento
+
+Quem registra (rotas da API, thread do GPS, thread do EspLink) só empacota o
+registro numa lista em memória: nunca toca no disco. Uma thread escreve os
+registros pendentes no mmap e faz ``msync`` em lote a cada ``flush_s`` só das
+páginas novas + a página do cabeçalho. Com o arquivo já alocado, nenhuma
+escrita muda o tamanho do arquivo (sem atualização de metadados no cartão SD).
+
+Cada segmento começa com um cabeçalho do tamanho de um registro:
+  magic 'FRDR', versão u16, tamanho do registro u16, count u64, t_first f64, t_last f64
+
+Os registros de um segmento estão em ordem de tempo (o tempo é carimbado sob o
+mesmo lock que define a ordem), então uma leitura por intervalo de tempo usa
+o índice para escolher os segmentos e busca binária dentro de cada um. O tempo
+é o relógio de parede (epoch); se ele voltar (NTP/RTC acertando a hora do Pi
+depois do boot), o writer fecha o segmento e abre outro, e cada segmento
+continua ordenado. Entre segmentos vale a ordem de gravação, não a de tempo.
+
+Leitura: ``python flight_recorder.py PASTA [t0 t1]`` (CSV) ou /api/rec/query.
+Benchmark: ``python flight_recorder.py --bench``.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from esp_telemetry import FLAG_FAILSAFE, FLAG_MANUAL, unpack_state
+
+REC_SIZE = 32
+SEGMENT_BYTES = 8 * 1024 * 1024     # ~260 mil registros por segmento
+MAX_SEGMENTS = 64                   # retenção: apaga os mais antigos (512 MiB)
+FLUSH_S = 2.0
+MAX_PENDING = 4 * 1024 * 1024       # writer atrasado: descarta além disso (conta em dropped)
+
+_HEADER = struct.Struct('<4sHHQdd')
+MAGIC = b'FRDR'
+VERSION = 1
+_T = struct.Struct('<dB')           # início de todo registro: tempo (epoch), tipo
+
+REC_ATT = 1     # atitude/estado do ESP32
+REC_RC = 2      # canais crus do rádio
+REC_GPS = 3
+REC_BAT = 4     # bateria + link (telemetria CRSF)
+
+# tipo -> (struct com o cabeçalho, nomes dos campos). Todos com REC_SIZE bytes.
+RECORDS = {
+    REC_ATT: (struct.Struct('<dBfffHBB7x'), ("roll", "pitch", "yaw", "throttle", "manual", "failsafe")),
+    REC_RC: (struct.Struct('<dB8BB14x'), tuple(f"ch{i}" for i in range(1, 9)) + ("flags",)),
+    REC_GPS: (struct.Struct('<dBiifffBBx'), ("lat", "lon", "alt", "gspd", "hdg", "sats", "fix")),
+    REC_BAT: (struct.Struct('<dBffIBbBb7x'), ("bat_v", "bat_a", "bat_mah", "bat_pct", "rssi", "lq", "snr")),
+}
+REC_NAMES = {REC_ATT: "att", REC_RC: "rc", REC_GPS: "gps", REC_BAT: "bat"}
+assert all(s.size == REC_SIZE for s, _ in RECORDS.values())
+
+
+def _clip8(v):
+    return max(-128, min(127, int(v)))
+
+
+class FlightRecorder:
+    def __init__(self, folder, segment_bytes=SEGMENT_BYTES, flush_s=FLUSH_S,
+                 max_segments=MAX_SEGMENTS):
+        self.folder = folder
+        self.segment_bytes = segment_bytes - segment_bytes % mmap.PAGESIZE
+        self.flush_s = flush_s
+        self.max_segments = max_segments
+        self.counts = {"records": 0, "dropped": 0, "flushes": 0, "segments": 0, "bytes": 0,
+                       "clock_steps": 0}
+        self._pending = []
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seg = None                # (número, arquivo, mmap)
+        self._off = REC_SIZE
+        self._synced = REC_SIZE
+        self._t_first = 0.0
+        self._t_last = 0.0
+        self._index = []
+
+    # ------------------------------------------------------------ produtores
+    def log(self, rtype, *values):
+        """Empacota um registro (tempo = agora) e enfileira; nunca bloqueia em disco."""
+        st = RECORDS[rtype][0]
+        with self._lock:
+            if self._pending_bytes >= MAX_PENDING:
+                self.counts["dropped"] += 1
+                return
+            try:
+                rec = st.pack(time.time(), rtype, *values)
+            except struct.error:
+                self.counts["dropped"] += 1
+                return
+            self._pending.append(rec)
+            self._pending_bytes += REC_SIZE
+            if self._pending_bytes == MAX_PENDING // 4:
+                self._wake.set()        # muito pendente: adianta o writer
+
+    def log_state(self, payload):
+        """Frame de estado da telemetria binária do ESP32 (esp_telemetry)."""
+        v = unpack_state(payload)
+        flags = v[4]
+        self.log(REC_ATT, v[1] / 100.0, v[2] / 100.0, 0.0, v[3],
+                 bool(flags & FLAG_MANUAL), bool(flags & FLAG_FAILSAFE))
+        self.log(REC_RC, *v[6:], flags)
+
+    def log_att(self, d):
+        self.log(REC_ATT, d.get("roll", 0), d.get("pitch", 0), d.get("yaw", 0),
+                 int(d.get("throttle", 0)), d.get("mode") == "MANUAL", bool(d.get("failsafe")))
+
+    def log_gps(self, d):
+        self.log(REC_GPS, int(d.get("lat", 0) * 1e7), int(d.get("lon", 0) * 1e7),
+                 d.get("gps_alt", d.get("alt", 0)), d.get("gspd", 0), d.get("hdg", 0),
+                 int(d.get("sats", 0)), bool(d.get("fix")))
+
+    def log_bat(self, d):
+        self.log(REC_BAT, d.get("bat_v", 0), d.get("bat_a", 0), int(d.get("bat_mah", 0)),
+                 int(d.get("bat_pct", 0)), _clip8(d.get("rssi", 0)), int(d.get("lq", 0)),
+                 _clip8(d.get("snr", 0)))
+
+    # ---------------------------------------------------------------- writer
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        self._index = _load_index(self.folder)
+        self._open_segment()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="FlightRecorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+        self._close_segment()
+
+    def _seg_path(self, num):
+        return os.path.join(self.folder, f"rec_{num:06d}.frd")
+
+    def _open_segment(self):
+        num = max([e["num"] for e in self._index] + [0]) + 1
+        path = self._seg_path(num)
+        f = open(path, "w+b")
+        try:
+            os.posix_fallocate(f.fileno(), 0, self.segment_bytes)
+        except (AttributeError, OSError):
+            f.truncate(self.segment_bytes)
+        mm = mmap.mmap(f.fileno(), self.segment_bytes)
+        self._seg = (num, f, mm)
+        self._off = self._synced = REC_SIZE
+        self._t_first = self._t_last = 0.0
+        self._write_header()
+        mm.flush(0, mmap.PAGESIZE)
+        self._index.append({"num": num, "file": os.path.basename(path),
+                            "t_first": 0.0, "t_last": 0.0, "count": 0})
+        self.counts["segments"] += 1
+        self._retain()
+        _save_index(self.folder, self._index)
+
+    def _write_header(self):
+        n = (self._off - REC_SIZE) // REC_SIZE
+        _HEADER.pack_into(self._seg[2], 0, MAGIC, VERSION, REC_SIZE, n, self._t_first, self._t_last)
+        e = self._index[-1] if self._index and self._index[-1]["num"] == self._seg[0] else None
+        if e:
+            e.update(t_first=self._t_first, t_last=self._t_last, count=n)
+
+    def _sync(self):
+        """msync só das páginas escritas desde o último flush + o cabeçalho."""
+        mm = self._seg[2]
+        self._write_header()
+        start = self._synced - self._synced % mmap.PAGESIZE
+        if self._off > start:
+            mm.flush(start, self._off - start)
+        mm.flush(0, mmap.PAGESIZE)
+        self._synced = self._off
+        self.counts["flushes"] += 1
+
+    def _close_segment(self):
+        if not self._seg:
+            return
+        self._sync()
+        num, f, mm = self._seg
+        mm.close()
+        f.close()
+        self._seg = None
+        _save_index(self.folder, self._index)
+
+    def _retain(self):
+        while len(self._index) > self.max_segments:
+            old = self._index.pop(0)
+            try:
+                os.remove(os.path.join(self.folder, old["file"]))
+            except OSError:
+                pass
+
+    def _write(self, recs):
+        i = 0
+        while i < len(recs):
+            room = (self.segment_bytes - self._off) // REC_SIZE
+            if room == 0:
+                self._close_segment()
+                self._open_segment()
+                continue
+            part = recs[i:i + room]
+            # corta a parte no primeiro registro com tempo menor que o anterior
+            t_prev = self._t_last if self._off > REC_SIZE else None
+            for k, r in enumerate(part):
+                t = _T.unpack_from(r)[0]
+                if t_prev is not None and t < t_prev:
+                    part = part[:k]
+                    break
+                t_prev = t
+            if not part:
+                # relógio voltou: segmento novo, a busca binária exige tempo crescente
+                self.counts["clock_steps"] += 1
+                self._close_segment()
+                self._open_segment()
+                continue
+            data = b"".join(part)
+            self._seg[2][self._off:self._off + len(data)] = data
+            if not self._t_first:
+                self._t_first = _T.unpack_from(part[0])[0]
+            self._t_last = _T.unpack_from(part[-1])[0]
+            self._off += len(data)
+            i += len(part)
+        self.counts["bytes"] += len(recs) * REC_SIZE
+
+    def _loop(self):
+        last_sync = time.monotonic()
+        while True:
+            self._wake.wait(self.flush_s)
+            self._wake.clear()
+            with self._lock:
+                recs, self._pending, self._pending_bytes = self._pending, [], 0
+            if recs:
+                self._write(recs)
+                self.counts["records"] += len(recs)
+            now = time.monotonic()
+            stopping = self._stop.is_set()
+            if self._off != self._synced and (now - last_sync >= self.flush_s or stopping):
+                self._sync()
+                last_sync = now
+            if stopping:
+                return
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        seg = self._seg[0] if self._seg else None
+        return dict(self.counts, pending=pending, segment=seg, folder=self.folder,
+                    offset=self._off, segment_bytes=self.segment_bytes)
+
+
+# =============================================================================
+# Leitura (índice + busca binária por tempo)
+# =============================================================================
+def _load_index(folder):
+    try:
+        with open(os.path.join(folder, "index.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        idx = []
+        for name in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+            if name.startswith("rec_") and name.endswith(".frd"):
+                idx.append({"num": int(name[4:10]), "file": name, "t_first": 0.0, "t_last": 0.0, "count": 0})
+        return idx
+
+
+def _save_index(folder, index):
+    tmp = os.path.join(folder, "index.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, os.path.join(folder, "index.json"))
+
+
+def _read_segment(path, t0, t1, types):
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+    with mm:
+        magic, ver, rsize, n, _, _ = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or rsize != REC_SIZE:
+            return
+        lo, hi = 0, n                   # primeiro registro com t >= t0
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _T.unpack_from(mm, REC_SIZE * (mid + 1))[0] < t0:
+                lo = mid + 1
+            else:
+                hi = mid
+        for i in range(lo, n):
+            off = REC_SIZE * (i + 1)
+            t, rtype = _T.unpack_from(mm, off)
+            if t > t1:
+                break
+            if (types and rtype not in types) or rtype not in RECORDS:
+                continue
+            st, names = RECORDS[rtype]
+            v = st.unpack_from(mm, off)
+            d = dict(zip(names, v[2:]))
+            if rtype == REC_GPS:
+                d["lat"] /= 1e7
+                d["lon"] /= 1e7
+            yield t, REC_NAMES[rtype], d
+
+
+def read_records(folder, t0=0.0, t1=float("inf"), types=None):
+    """
+    Itera ``(t, tipo, campos)`` no intervalo [t0, t1], segmento a segmento na
+    ordem de gravação (em ordem de tempo dentro de cada segmento).
+    """
+    index = _load_index(folder)
+    for k, e in enumerate(index):
+        # segmentos fechados: o índice basta; o ativo (último) se confere pelo cabeçalho
+        if k < len(index) - 1 and e["count"] and (e["t_last"] < t0 or e["t_first"] > t1):
+            continue
+        path = os.path.join(folder, e["file"])
+        if os.path.exists(path):
+            yield from _read_segment(path, t0, t1, types)
+
+
+def _bench(n=200000):
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        rec = FlightRecorder(d, segment_bytes=2 * 1024 * 1024, flush_s=0.2)
+        rec.start()
+        att = {"roll": 1.5, "pitch": -2.0, "throttle": 1500, "mode": "STAB"}
+        t = time.perf_counter()
+        for _ in range(n):
+            rec.log_att(att)
+        log_us = (time.perf_counter() - t) / n * 1e6
+        rec.stop()
+        t = time.perf_counter()
+        rows = list(read_records(d))
+        read_s = time.perf_counter() - t
+        mid = rows[len(rows) // 2][0]
+        t = time.perf_counter()
+        part = list(read_records(d, mid, mid + 0.001))
+        range_ms = (time.perf_counter() - t) * 1000
+        print(f"log: {log_us:.2f} us/registro (sem disco), {rec.counts['segments']} segmentos, "
+              f"{rec.counts['flushes']} msync, {rec.counts['dropped']} descartados")
+        print(f"leitura: {len(rows)} registros em {read_s:.2f} s; intervalo de 1 ms: "
+              f"{len(part)} registros em {range_ms:.2f} ms")
+
+
+def main(argv):
+    if argv and argv[0] == "--bench":
+        _bench()
+        return 0
+    if not argv:
+        print(__doc__)
+        return 1
+    t0 = float(argv[1]) if len(argv) > 1 else 0.0
+    t1 = float(argv[2]) if len(argv) > 2 else float("inf")
+    for t, kind, d in read_records(argv[0], t0, t1):
+        print(f"{t:.3f},{kind}," + ",".join(f"{k}={v}" for k, v in d.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,146 @@
+"""
+Cache das respostas de ``/api/get`` que só mudam por ``/api/set``.
+
+``pids`` e ``rc`` (trims, deadzone, trims dos servos, centros) ficam em
+memória depois da primeira leitura; cada ``set`` bem-sucedido atualiza o
+valor em cache (write-through, com o mesmo clamp do firmware) e qualquer
+``action`` (calibração, centrar, salvar) descarta tudo.
+
+Cada entrada tem TTL e um ETag (hash do JSON servido): o configurador pode
+mandar ``If-None-Match`` e receber 304 sem tocar na serial.
+
+Em ``rc`` os campos ao vivo (channels, sw1/sw2, failsafe, calibrating) podem
+estar até ``TTL['rc']`` segundos atrasados; quem precisa deles pede com
+``Cache-Control: no-cache`` (ou ``"fresh": true``) e vai direto ao ESP32.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+# Segundos até reler do ESP32 mesmo sem set/action
+TTL = {"pids": 300.0, "rc": 5.0}
+
+# kp_roll -> kp_r etc. (nomes do set -> chaves do get pids)
+_PID_KEYS = {f"{k}_{axis}": f"{k}_{axis[0]}" for k in ("kp", "ki", "kd") for axis in ("roll", "pitch")}
+
+
+def _clamp_deadzone(v):
+    return min(max(float(v), 0.0), 0.45)
+
+
+class _Entry:
+    __slots__ = ("data", "body", "etag", "t")
+
+    def __init__(self, data, now):
+        self.data = data
+        self.t = now
+        self.refresh()
+
+    def refresh(self):
+        self.body = json.dumps(self.data, separators=(",", ":"))
+        self.etag = hashlib.sha1(self.body.encode()).hexdigest()[:16]
+
+
+class ParamCache:
+    def __init__(self, ttl=TTL):
+        self.ttl = dict(ttl)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "not_modified": 0, "writes": 0, "invalidations": 0}
+
+    def cacheable(self, param):
+        return isinstance(param, str) and param in self.ttl
+
+    def get(self, param):
+        """Entrada válida (``.body``, ``.etag``) ou None."""
+        with self._lock:
+            e = self._entries.get(param)
+            if e is None or time.monotonic() - e.t > self.ttl[param]:
+                self.counts["misses"] += 1
+                return None
+            self.counts["hits"] += 1
+            return e
+
+    def put(self, param, data):
+        """Guarda a resposta de um get (só ``status == data``); devolve a entrada."""
+        if not self.cacheable(param) or not isinstance(data, dict) or data.get("status") != "data":
+            return None
+        if param == "rc" and data.get("rc", {}).get("calibrating"):
+            return None   # centros ainda mudando
+        data = {k: v for k, v in data.items() if k != "id"}
+        e = _Entry(data, time.monotonic())
+        with self._lock:
+            self._entries[param] = e
+        return e
+
+    def on_set(self, cmd, reply):
+        """Write-through de um set com resposta ok; se não souber aplicar, descarta."""
+        if not isinstance(reply, dict) or reply.get("status") != "ok":
+            # erro/timeout: o ESP32 pode ter aplicado ou não
+            self.invalidate()
+            return
+        p = cmd.get("param")
+        if not isinstance(p, str):
+            # set sem param (ex.: item malformado no /api/batch): não dá para aplicar
+            self.invalidate()
+            return
+        with self._lock:
+            pids = self._entries.get("pids")
+            rc = self._entries.get("rc")
+            try:
+                if p in _PID_KEYS:
+                    if pids:
+                        pids.data["pids"][_PID_KEYS[p]] = float(cmd["value"])
+                        pids.refresh()
+                elif rc is None:
+                    pass
+                elif p == "rc_all":
+                    r = rc.data["rc"]
+                    if "deadzone" in cmd:
+                        r["deadzone"] = _clamp_deadzone(cmd["deadzone"])
+                    for k in ("servo_trim_l", "servo_trim_r"):
+                        if k in cmd:
+                            r[k] = int(cmd[k])
+                    if isinstance(cmd.get("trim"), list):
+                        for i, v in enumerate(cmd["trim"][:8]):
+                            r["trim"][i] = int(v)
+                    rc.refresh()
+                elif p.startswith("trim_ch"):
+                    idx = int(p[7:]) - 1
+                    if 0 <= idx < 8:
+                        rc.data["rc"]["trim"][idx] = int(cmd["value"])
+                        rc.refresh()
+                elif p in ("trim_servo_l", "trim_servo_r"):
+                    rc.data["rc"]["servo_trim_" + p[-1]] = int(cmd["value"])
+                    rc.refresh()
+                elif p == "deadzone":
+                    rc.data["rc"]["deadzone"] = _clamp_deadzone(cmd["value"])
+                    rc.refresh()
+                else:
+                    return
+                self.counts["writes"] += 1
+            except (KeyError, IndexError, TypeError, ValueError):
+                # formato inesperado: melhor reler do ESP32
+                self._entries.clear()
+                self.counts["invalidations"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.counts["invalidations"] += 1
+
+    def observe(self, cmd, data):
+        """Mantém o cache coerente com um comando que passou direto (ex.: /api/batch)."""
+        c = cmd.get("cmd")
+        if c == "get":
+            self.put(cmd.get("param") or "pids", data)
+        elif c == "set":
+            self.on_set(cmd, data)
+        elif c == "action":
+            self.invalidate()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, cached=sorted(self._entries))
@@ -0,0 +1,247 @@
+#run stats / dump / export over many bin logs with a process pool
+#
+#every log is split into record aligned chunks (FMT table from find_fmts(), chunk
+#boundaries from align()), the chunks of all logs are spread over the workers and
+#the per chunk results are merged back in file order, so the output is the same
+#as a sequential run whatever the completion order
+#
+#usage: python batch.py stats  [dir or logs...] <--jobs N> <--chunk MB>
+#       python batch.py dump   [dir or logs...] --type ATT     --> [log]_ATT.txt
+#       python batch.py export [dir or logs...] <--npz>        --> [log].npz or [log]_parquet/
+
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import binlog
+
+
+def find_logs(paths):
+    logs = []
+    for p in paths:
+        if os.path.isdir(p):
+            for fn in sorted(os.listdir(p)):
+                if fn.lower().endswith('.bin'):
+                    logs.append(os.path.join(p, fn))
+        else:
+            logs.append(p)
+    return logs
+
+
+def split(filename, chunk_bytes):
+    """[(start, end)] record aligned chunks of a log, and its FMT table"""
+    fh, d = binlog.open_mmap(filename)
+    try:
+        fmts = binlog.find_fmts(d)
+        bounds = [0]
+        while bounds[-1] + chunk_bytes < len(d):
+            b = binlog.align(d, fmts, bounds[-1] + chunk_bytes)
+            if b >= len(d):
+                break
+            bounds.append(b)
+        bounds.append(len(d))
+    finally:
+        if fh:
+            d.close()
+            fh.close()
+    return list(zip(bounds[:-1], bounds[1:])), fmts
+
+
+# ---- workers (run in the pool, one call per chunk) ----
+#the FMT table travels as Fmt.as_list() rows, Fmt holds a struct.Struct which does not pickle
+def _fmts(rows):
+    return {row[0]: binlog.Fmt(*row) for row in rows}
+
+
+def _stats(filename, start, end, fmts, opts):
+    fmts = _fmts(fmts)
+    fh, d = binlog.open_mmap(filename)
+    try:
+        r = binlog.ScanResult()
+        r.fmts.update(fmts)
+        binlog.scan(d, start, end, r)
+        return {
+            "counts": {t: len(a) for t, a in r.offsets.items()},
+            "first": {t: a[0] for t, a in r.offsets.items()},
+            "error_bytes": r.error_bytes,
+            "fmts": [f.as_list() for f in r.fmts.values()],
+        }
+    finally:
+        if fh:
+            d.close()
+            fh.close()
+
+
+def _dump(filename, start, end, fmts, opts):
+    fmts = _fmts(fmts)
+    part = opts["part"]
+    name = opts["type"]
+    n = 0
+    fh, d = binlog.open_mmap(filename)
+    try:
+        with open(part, 'w') as fo:
+            for r, offsets in binlog.scan_chunks(d, 16 << 20, start, end, fmts):
+                for t, offs in offsets.items():
+                    f = r.fmts[t]
+                    if f.name != name:
+                        continue
+                    for off in offs:
+                        fo.write(binlog.format_record(f, f.unpack(d, off)) + '\n')
+                    n += len(offs)
+    finally:
+        if fh:
+            d.close()
+            fh.close()
+    return {"counts": {name: n}}
+
+
+def _export(filename, start, end, fmts, opts):
+    import export   # numpy (and pyarrow) only needed for export
+    fmts = _fmts(fmts)
+    counts = export.export(filename, opts["part"], opts["format"], start=start, end=end, fmts=fmts)
+    return {"counts": counts}
+
+
+WORKERS = {"stats": _stats, "dump": _dump, "export": _export}
+
+
+# ---- merge (parent, in chunk order) ----
+def _merge_stats(filename, results, opts):
+    counts = {}
+    first = {}
+    fmts = {}
+    err = 0
+    for res in results:
+        for t, n in res["counts"].items():
+            counts[t] = counts.get(t, 0) + n
+            first.setdefault(t, res["first"][t])
+        for f in res["fmts"]:
+            fmts.setdefault(f[0], f)
+        err += res["error_bytes"]
+    print("\n" + filename)
+    print("Msg   Count Type Len")
+    print("---- ------- ---- ---")
+    for t in sorted(counts, key=first.get):
+        f = fmts[t]
+        print("{: <4} {:7d} 0x{:02X} {:3d}".format(f[2], counts[t], t, f[1]))
+    print("Error Bytes    :", err)
+    print("Record Count   :", sum(counts.values()))
+    return counts
+
+
+def _merge_dump(filename, results, opts):
+    out = opts["out"]
+    with open(out, 'w') as fo:
+        for part in opts["parts"]:
+            with open(part) as fi:
+                shutil.copyfileobj(fi, fo, 1 << 20)
+            os.remove(part)
+    n = sum(res["counts"][opts["type"]] for res in results)
+    print("{}: {} {} records -> {}".format(filename, n, opts["type"], out))
+    return {opts["type"]: n}
+
+
+def _merge_export(filename, results, opts):
+    import export
+    out = opts["out"]
+    if len(opts["parts"]) == 1:
+        if os.path.isdir(out):
+            shutil.rmtree(out)
+        os.replace(opts["parts"][0], out)
+    else:
+        sink = export.open_sink(out, opts["format"])
+        try:
+            for part in opts["parts"]:
+                sink.merge(part)
+        finally:
+            sink.close()
+        for part in opts["parts"]:
+            shutil.rmtree(part) if os.path.isdir(part) else os.remove(part)
+    counts = {}
+    for res in results:
+        for k, n in res["counts"].items():
+            counts[k] = counts.get(k, 0) + n
+    print("{}: {} records -> {}".format(filename, sum(counts.values()), out))
+    return counts
+
+
+MERGERS = {"stats": _merge_stats, "dump": _merge_dump, "export": _merge_export}
+
+
+def run(op, logs, jobs=None, chunk_bytes=32 << 20, type=None, fmt='npz', progress=True):
+    """run op over logs in a process pool, returns {log: merged counts}"""
+    plan = []   # (log, [(start, end)], fmts, opts)
+    for fn in logs:
+        chunks, fmts = split(fn, chunk_bytes)
+        opts = {"type": type, "format": fmt}
+        base = os.path.splitext(fn)[0]
+        if op == "dump":
+            opts["out"] = base + "_" + type + ".txt"
+        elif op == "export":
+            opts["out"] = base + (".npz" if fmt == 'npz' else "_parquet")
+        ext = {"dump": ".txt", "export": ".npz" if fmt == 'npz' else ""}.get(op, "")
+        opts["parts"] = ["%s.part%d%s" % (base, k, ext) for k in range(len(chunks))]
+        plan.append((fn, chunks, [f.as_list() for f in fmts.values()], opts))
+
+    total = sum(e - s for _, chunks, _, _ in plan for s, e in chunks)
+    results = {fn: [None] * len(chunks) for fn, chunks, _, _ in plan}
+    done = 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futs = {}
+        for fn, chunks, fmts, opts in plan:
+            for k, (s, e) in enumerate(chunks):
+                o = dict(opts, part=opts["parts"][k])
+                futs[pool.submit(WORKERS[op], fn, s, e, fmts, o)] = (fn, k, e - s)
+        for fut in as_completed(futs):
+            fn, k, nbytes = futs[fut]
+            results[fn][k] = fut.result()
+            done += nbytes
+            if progress:
+                dt = max(time.perf_counter() - t0, 1e-9)
+                sys.stderr.write("\r{:5.1f}% {:8.1f} MB {:6.0f} MB/s".format(
+                    100.0 * done / max(total, 1), done / 1e6, done / 1e6 / dt))
+    if progress:
+        sys.stderr.write("\n")
+
+    merged = {}
+    for fn, chunks, fmts, opts in plan:
+        merged[fn] = MERGERS[op](fn, results[fn], opts)
+    dt = max(time.perf_counter() - t0, 1e-9)
+    print("Total          : {} logs, {:.1f} MB in {:.2f} s -> {:.0f} MB/s".format(len(logs), total / 1e6, dt, total / 1e6 / dt))
+    return merged
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in WORKERS:
+        print("Usage: batch.py [stats|dump|export] [dir or logs...] <--type T> <--jobs N> <--chunk MB> <--npz>")
+        exit()
+    op = sys.argv[1]
+    paths = []
+    jobs = None
+    chunk = 32
+    type = None
+    argv = iter(sys.argv[2:])
+    for a in argv:
+        if a == '--jobs':
+            jobs = int(next(argv))
+        elif a == '--chunk':
+            chunk = int(next(argv))
+        elif a == '--type':
+            type = next(argv)
+        elif not a.startswith('--'):
+            paths.append(a)
+    if op == "dump" and type is None:
+        print("dump needs --type")
+        exit()
+    fmt = 'parquet'
+    if '--npz' in sys.argv:
+        fmt = 'npz'
+    else:
+        try:
+            import pyarrow
+        except ImportError:
+            fmt = 'npz'
+    run(op, find_logs(paths), jobs, chunk << 20, type, fmt)
@@ -0,0 +1,497 @@
+#bin log reader with sidecar index - does not depend on pymavlink
+#
+#  scan()      one sequential pass over a memory mapped log, finds every record
+#  LogIndex    sidecar index <log>.bidx with the byte offsets of each message type,
+#              memory mapped on load so tools can seek straight to ATT, IMU, ...
+#  scan_chunks() the same pass in bounded windows, for streaming consumers
+#  find_fmts() / align()  FMT table and record boundaries, to split a log between workers
+#  decode_columns()  NumPy columnar decode of one message type, dtype built from FMT
+#
+#usage: python binlog.py [binlog filename] <--bench>   --> builds/refreshes the index and prints counts
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HEAD1 = 0xA3
+HEAD2 = 0x95
+SYNC = bytes([HEAD1, HEAD2])
+FMT_TYPE = 0x80
+FMT_LEN = 89
+
+# format char -> (struct code, numpy dtype, scale)
+# see ArduPilot AP_Logger/LogStructure.h
+FORMAT_CHARS = {
+    'a': ('32h', ('<i2', (32,)), None),   # int16_t[32]
+    'b': ('b', 'i1', None),
+    'B': ('B', 'u1', None),
+    'h': ('h', '<i2', None),
+    'H': ('H', '<u2', None),
+    'i': ('i', '<i4', None),
+    'I': ('I', '<u4', None),
+    'f': ('f', '<f4', None),
+    'd': ('d', '<f8', None),
+    'n': ('4s', 'S4', None),
+    'N': ('16s', 'S16', None),
+    'Z': ('64s', 'S64', None),
+    'c': ('h', '<i2', 0.01),
+    'C': ('H', '<u2', 0.01),
+    'e': ('i', '<i4', 0.01),
+    'E': ('I', '<u4', 0.01),
+    'L': ('i', '<i4', 1e-7),     # lat/lon
+    'M': ('B', 'u1', None),      # flight mode
+    'q': ('q', '<i8', None),
+    'Q': ('Q', '<u8', None),
+}
+
+
+class Fmt:
+    """Message definition from a FMT record"""
+
+    def __init__(self, type, length, name, format, columns):
+        self.type = type
+        self.length = length
+        self.name = name
+        self.format = format
+        self.columns = columns.split(',') if columns else []
+        self.scales = []
+        code = '<'
+        try:
+            for c in format:
+                s, _, scale = FORMAT_CHARS[c]
+                code += s
+                self.scales.append(scale)
+            self.struct = struct.Struct(code)
+            if self.struct.size != length - 3:
+                self.struct = None
+        except KeyError:
+            self.struct = None
+
+    @classmethod
+    def from_record(cls, d, i):
+        t = d[i + 3]
+        length = d[i + 4]
+        name = bytes(d[i + 5:i + 9]).decode("ascii", "replace").rstrip('\x00')
+        fmt = bytes(d[i + 9:i + 25]).decode("ascii", "replace").rstrip('\x00')
+        cols = bytes(d[i + 25:i + 89]).decode("ascii", "replace").rstrip('\x00')
+        return cls(t, length, name, fmt, cols)
+
+    def dtype(self):
+        """NumPy structured dtype of a whole record (3 header bytes + fields)"""
+        fields = [('_head', 'V3')]
+        seen = set()
+        for col, c in zip(self.columns, self.format):
+            while col in seen or col == '_head':
+                col += '_'
+            seen.add(col)
+            fields.append((col, FORMAT_CHARS[c][1]))
+        return np.dtype(fields)
+
+    def as_list(self):
+        return [self.type, self.length, self.name, self.format, ','.join(self.columns)]
+
+    def unpack(self, d, i):
+        """decode the record at offset i into a dict (column -> value)"""
+        if self.struct is None:
+            return {}
+        vals = self.struct.unpack_from(d, i + 3)
+        out = {}
+        k = 0   #value cursor: an 'a' field is 32 struct values
+        for col, c, scale in zip(self.columns, self.format, self.scales):
+            if c == 'a':
+                out[col] = list(vals[k:k + 32])
+                k += 32
+                continue
+            v = vals[k]
+            k += 1
+            if isinstance(v, bytes):
+                v = v.rstrip(b'\x00').decode("ascii", "replace")
+            elif scale is not None:
+                v = v * scale
+            out[col] = v
+        return out
+
+    def time_us(self, d, i):
+        """TimeUS of the record at offset i, or None if the type has no TimeUS column"""
+        if not self.columns or self.columns[0] != 'TimeUS' or self.struct is None:
+            return None
+        return struct.unpack_from('<' + FORMAT_CHARS[self.format[0]][0], d, i + 3)[0]
+
+
+def decode_columns(d, fmt, offsets, scaled=True):
+    """
+    Decode the records of one type at the given offsets into columns.
+
+    Returns {column: ndarray}. The records are gathered from a sliding window
+    view of the buffer (one copy of N x length bytes, no per-record Python) and
+    reinterpreted with the structured dtype built from the FMT format string.
+    With scaled=True the c/C/e/E/L fields are converted to float64 units.
+    """
+    if np is None:
+        raise ImportError("decode_columns() requires numpy")
+    if fmt.struct is None:
+        return {}
+    dt = fmt.dtype()
+    offs = np.asarray(offsets, dtype=np.int64)
+    buf = np.frombuffer(d, dtype=np.uint8)
+    n = len(offs)
+    if n and offs[-1] - offs[0] == (n - 1) * fmt.length and np.all(np.diff(offs) == fmt.length):
+        #contiguous run of this type only: zero-copy view
+        rec = buf[offs[0]:offs[0] + n * fmt.length].view(dt)
+    elif n:
+        win = np.lib.stride_tricks.sliding_window_view(buf, fmt.length)
+        rec = np.ascontiguousarray(win[offs]).view(dt).reshape(-1)
+    else:
+        rec = np.zeros(0, dtype=dt)
+    out = {}
+    for name, c, scale in zip(dt.names[1:], fmt.format, fmt.scales):
+        col = rec[name]
+        if scaled and scale is not None:
+            col = col * scale
+        out[name] = col
+    return out
+
+
+def format_record(fmt, vals):
+    """same layout as pymavlink's DFMessage.__str__"""
+    return fmt.name + " {" + ", ".join("%s : %s" % (k, v) for k, v in vals.items()) + "}"
+
+
+class ScanResult:
+    def __init__(self):
+        self.fmts = {FMT_TYPE: Fmt(FMT_TYPE, FMT_LEN, "FMT", "BBnNZ", "Type,Length,Name,Format,Columns")}
+        self.offsets = {}           # type -> array('Q') of record offsets
+        self.error_bytes = 0
+        self.error_regions = []     # [(start, end)] runs of bytes that are not records
+        self.pos = 0                # offset where the scan stopped (start of a partial record at EOF)
+
+
+def scan(d, start=0, end=None, result=None):
+    """
+    One pass over buffer d (bytes/mmap) from start to end.
+
+    Headers are located with find() and records are skipped by their FMT length,
+    so the Python loop runs once per record, not once per byte. Passing the
+    ScanResult of a previous call continues with the FMT table it learned.
+    """
+    if end is None:
+        end = len(d)
+    r = result if result is not None else ScanResult()
+    lens = [0] * 256
+    for t, f in r.fmts.items():
+        lens[t] = f.length
+    offsets = r.offsets
+    i = start
+    err_start = -1
+    while i + 3 <= end:
+        if d[i] == HEAD1 and d[i + 1] == HEAD2 and lens[d[i + 2]]:
+            t = d[i + 2]
+            ln = lens[t]
+            if i + ln > end:
+                break   # partial record at the end of the buffer
+            if err_start >= 0:
+                r.error_regions.append((err_start, i))
+                err_start = -1
+            if t == FMT_TYPE:
+                f = Fmt.from_record(d, i)
+                r.fmts[f.type] = f
+                lens[f.type] = f.length
+            a = offsets.get(t)
+            if a is None:
+                a = offsets[t] = array('Q')
+            a.append(i)
+            i += ln
+        else:
+            # not a (known) record: jump to the next header candidate
+            if err_start < 0:
+                err_start = i
+            j = d.find(SYNC, i + 1, end)
+            if j < 0:
+                j = max(i + 1, end - 1)   # keep a trailing 0xA3 for the next read
+                if d[j] != HEAD1:
+                    j = end
+            r.error_bytes += j - i
+            i = j
+    if err_start >= 0:
+        r.error_regions.append((err_start, min(i, end)))
+    r.pos = i
+    return r
+
+
+def scan_chunks(d, chunk_bytes=16 << 20, start=0, end=None, fmts=None):
+    """
+    Scan d in windows of chunk_bytes, yielding (result, offsets) per window.
+
+    offsets holds only the records of that window (type -> array('Q')), so memory
+    stays bounded by the window size; result carries the FMT table, error counts
+    and the resume position between windows. fmts seeds the FMT table when the
+    scan starts in the middle of a log (see find_fmts).
+    """
+    if end is None:
+        end = len(d)
+    r = ScanResult()
+    if fmts:
+        r.fmts.update(fmts)
+    r.pos = start
+    while r.pos < end:
+        pos = r.pos
+        stop = min(pos + chunk_bytes, end)
+        r.offsets = {}
+        scan(d, pos, stop, r)
+        yield r, r.offsets
+        if stop == end or r.pos == pos:
+            break
+
+
+def find_fmts(d, start=0, end=None):
+    """
+    FMT table of a whole log without decoding it: find() for the 3 byte FMT
+    header only, so a worker can start scanning at any record boundary.
+    """
+    if end is None:
+        end = len(d)
+    fmts = {}
+    head = SYNC + bytes([FMT_TYPE])
+    i = d.find(head, start, end)
+    while i >= 0 and i + FMT_LEN <= end:
+        f = Fmt.from_record(d, i)
+        if f.length >= 3 and f.name.isprintable():
+            fmts[f.type] = f
+        i = d.find(head, i + 1, end)
+    return fmts
+
+
+def align(d, fmts, pos, end=None, depth=4):
+    """
+    First offset >= pos where a record starts, i.e. where depth consecutive
+    headers of known types chain by their FMT lengths (or the chain reaches end).
+    """
+    if end is None:
+        end = len(d)
+    lens = [0] * 256
+    lens[FMT_TYPE] = FMT_LEN
+    for t, f in fmts.items():
+        lens[t] = f.length
+    i = d.find(SYNC, pos, end)
+    while i >= 0:
+        j = i
+        for _ in range(depth):
+            if j + 3 > end:
+                return i
+            if d[j] != HEAD1 or d[j + 1] != HEAD2 or not lens[d[j + 2]]:
+                break
+            j += lens[d[j + 2]]
+        else:
+            return i
+        i = d.find(SYNC, i + 1, end)
+    return end
+
+
+def open_mmap(filename):
+    fh = open(filename, 'rb')
+    if os.fstat(fh.fileno()).st_size == 0:
+        fh.close()
+        return None, b''
+    return fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ============================================================================
+# Sidecar index
+#
+#  [magic 8B] [meta_len u64] [meta json, padded to 8] [offsets u64 ...]
+#
+#  offsets are grouped by type (ascending within a type); meta["types"] maps
+#  type -> [first slot, count]
+# ============================================================================
+IDX_MAGIC = b'BINLIDX1'
+IDX_SUFFIX = '.bidx'
+
+
+class LogIndex:
+    def __init__(self, filename, meta, idx_fh, idx_mm, data_off):
+        self.filename = filename
+        self.meta = meta
+        self.fmts = {}
+        for f in meta["fmts"]:
+            fmt = Fmt(*f)
+            self.fmts[fmt.type] = fmt
+        self.by_name = {f.name: f for f in self.fmts.values()}
+        self.types = {int(t): v for t, v in meta["types"].items()}
+        self._idx_fh = idx_fh
+        self._idx_mm = idx_mm
+        n = sum(c for _, c in self.types.values())
+        self._mv = memoryview(idx_mm)
+        self._offsets = self._mv[data_off:data_off + 8 * n].cast('Q')
+        self._fh, self.data = open_mmap(filename)
+
+    # ---- building / loading ----
+    @staticmethod
+    def index_path(filename):
+        return filename + IDX_SUFFIX
+
+    @classmethod
+    def build(cls, filename):
+        fh, d = open_mmap(filename)
+        r = scan(d)
+        if fh:
+            d.close()
+            fh.close()
+        st = os.stat(filename)
+        types = {}
+        flat = array('Q')
+        for t in sorted(r.offsets):
+            types[str(t)] = [len(flat), len(r.offsets[t])]
+            flat.extend(r.offsets[t])
+        meta = {
+            "log_size": st.st_size,
+            "log_mtime_ns": st.st_mtime_ns,
+            "fmts": [f.as_list() for f in r.fmts.values()],
+            "types": types,
+            "error_bytes": r.error_bytes,
+            "error_regions": r.error_regions[:1000],
+            "scan_end": r.pos,
+        }
+        js = json.dumps(meta).encode()
+        js += b' ' * (-len(js) % 8)
+        tmp = cls.index_path(filename) + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(IDX_MAGIC)
+            f.write(struct.pack('<Q', len(js)))
+            f.write(js)
+            flat.tofile(f)
+        os.replace(tmp, cls.index_path(filename))
+
+    @classmethod
+    def load(cls, filename, rebuild=True):
+        """open the index of filename, (re)building it when missing or stale"""
+        path = cls.index_path(filename)
+        for attempt in range(2):
+            if os.path.exists(path):
+                fh = open(path, 'rb')
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                ok = mm[:8] == IDX_MAGIC
+                if ok:
+                    n = struct.unpack_from('<Q', mm, 8)[0]
+                    meta = json.loads(mm[16:16 + n])
+                    st = os.stat(filename)
+                    ok = meta["log_size"] == st.st_size and meta["log_mtime_ns"] == st.st_mtime_ns
+                if ok:
+                    return cls(filename, meta, fh, mm, 16 + n)
+                mm.close()
+                fh.close()
+            if not rebuild or attempt:
+                break
+            cls.build(filename)
+        raise IOError("no valid index for " + filename)
+
+    def close(self):
+        self._offsets.release()
+        self._mv.release()
+        try:
+            self._idx_mm.close()
+            if self._fh:
+                self.data.close()
+        except BufferError:
+            pass    # views handed out by offsets() are still alive, mmap closes on gc
+        self._idx_fh.close()
+        if self._fh:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- queries ----
+    def fmt(self, type_or_name):
+        if isinstance(type_or_name, str):
+            return self.by_name.get(type_or_name)
+        return self.fmts.get(type_or_name)
+
+    def count(self, type_or_name):
+        f = self.fmt(type_or_name)
+        return self.types.get(f.type, (0, 0))[1] if f else 0
+
+    def offsets(self, type_or_name):
+        """record offsets of one message type (zero-copy view on the index)"""
+        f = self.fmt(type_or_name)
+        if f is None or f.type not in self.types:
+            return self._offsets[0:0]
+        s, n = self.types[f.type]
+        return self._offsets[s:s + n]
+
+    def time_range(self, type_or_name, t0_us=None, t1_us=None):
+        """slot range [lo, hi) of records with t0_us <= TimeUS < t1_us (binary search)"""
+        f = self.fmt(type_or_name)
+        offs = self.offsets(type_or_name)
+        d = self.data
+
+        def bisect(t):
+            lo, hi = 0, len(offs)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if f.time_us(d, offs[mid]) < t:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        if f is None or not len(offs) or f.time_us(d, offs[0]) is None:
+            return 0, len(offs)
+        lo = bisect(t0_us) if t0_us is not None else 0
+        hi = bisect(t1_us) if t1_us is not None else len(offs)
+        return lo, hi
+
+    def columns(self, type_or_name, t0_us=None, t1_us=None, scaled=True):
+        """columnar decode (see decode_columns) of one type, optionally in a time window"""
+        f = self.fmt(type_or_name)
+        if f is None:
+            return {}
+        lo, hi = self.time_range(type_or_name, t0_us, t1_us)
+        return decode_columns(self.data, f, self.offsets(type_or_name)[lo:hi], scaled)
+
+    def records(self, type_or_name, t0_us=None, t1_us=None, limit=None):
+        """yield (offset, dict) of one type, optionally limited to a time window"""
+        f = self.fmt(type_or_name)
+        if f is None:
+            return
+        offs = self.offsets(type_or_name)
+        lo, hi = self.time_range(type_or_name, t0_us, t1_us)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        d = self.data
+        for k in range(lo, hi):
+            off = offs[k]
+            yield off, f.unpack(d, off)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: binlog.py [binlog filename]")
+        exit()
+    with LogIndex.load(sys.argv[1]) as idx:
+        print("Msg   Count Type Len")
+        print("---- ------- ---- ---")
+        for t in sorted(idx.types):
+            f = idx.fmts[t]
+            print("{: <4} {:7d} 0x{:02X} {:3d}".format(f.name, idx.types[t][1], t, f.length))
+        print("Error Bytes    :", idx.meta["error_bytes"])
+        print("Index File     :", LogIndex.index_path(sys.argv[1]))
+        if "--bench" in sys.argv and np is not None:
+            import time
+            nbytes = 0
+            t = time.perf_counter()
+            for typ in idx.types:
+                idx.columns(typ)
+                nbytes += idx.count(typ) * idx.fmts[typ].length
+            t = time.perf_counter() - t
+            print("Column Decode  : {:.1f} MB in {:.3f} s -> {:.0f} MB/s".format(nbytes / 1e6, t, nbytes / 1e6 / max(t, 1e-9)))
@@ -1,11 +1,10 @@
 #dump bin log to stdout
 
 #pip install pymavlink
-from pymavlink import DFReader
 import sys
 
 if len(sys.argv) < 2: 
-  print("Usage: dump [binlog filename] <num lines -OR- msgtype>")
+  print("Usage: dump [binlog filename] <num lines -OR- msgtype [start_s] [end_s]>")
   exit()
 
 filename = sys.argv[1]
@@ -18,6 +17,20 @@ if len(sys.argv) >= 3:
     else:
         filter_type = s
 
+if filter_type is not None:
+    #filtered dump: seek straight to the records through the sidecar index (no pymavlink)
+    import binlog
+    t0 = int(float(sys.argv[3]) * 1e6) if len(sys.argv) >= 4 else None
+    t1 = int(float(sys.argv[4]) * 1e6) if len(sys.argv) >= 5 else None
+    with binlog.LogIndex.load(filename) as idx:
+        f = idx.fmt(filter_type)
+        if f is not None:
+            for off, vals in idx.records(filter_type, t0, t1):
+                print(binlog.format_record(f, vals))
+    exit()
+
+from pymavlink import DFReader
+
 log = DFReader.DFReader_binary(filename)
 
 lineno = 0
@@ -25,11 +38,7 @@ while True:
     m = log.recv_msg()
     if m is None:
         break
-    if filter_type is None:
-        print(m)
-    elif m.get_type() == filter_type:
-        print(m)
+    print(m)
     lineno += 1
     if(lineno >= num_lines) :
         break;
-
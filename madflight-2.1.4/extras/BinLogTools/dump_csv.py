@@ -1,31 +1,33 @@
 #dump bin log to file out.txt
 
-#pip install pymavlink
-from pymavlink import DFReader
+#reads only the records of [type] through the sidecar index (see binlog.py) and
+#decodes them in column blocks; use export.py to convert all types at once
+import binlog
 import sys
 import csv
 
+BLOCK = 65536
+
 if len(sys.argv) < 3: 
-    print("Usage: dump_csv.py [filename] [type] --> dumps output to file out.txt")
+    print("Usage: dump_csv.py [filename] [type] <outfile> --> dumps output to file out.txt")
     exit()
 
 filename = sys.argv[1]
 type = sys.argv[2]
+outfile = sys.argv[3] if len(sys.argv) > 3 else 'out.txt'
 
-log = DFReader.DFReader_binary(filename)
-
-printheader = True
-with open('out.txt', 'w', newline='') as f:
-    while True:
-        m = log.recv_msg()
-        if m is None:
-            break
-        if m.get_type() == type:
-            d = m.to_dict()
-            if printheader:
-                fieldnames = d.keys();
-                writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter='\t', extrasaction='ignore')
-                writer.writeheader()
-                printheader = False
-            writer.writerow(d)
-
+with binlog.LogIndex.load(filename) as idx:
+    f = idx.fmt(type)
+    with open(outfile, 'w', newline='') as fo:
+        if f is not None:
+            writer = csv.writer(fo, delimiter='\t')
+            writer.writerow(f.columns)
+            offs = idx.offsets(type)
+            for k in range(0, len(offs), BLOCK):
+                cols = binlog.decode_columns(idx.data, f, offs[k:k + BLOCK])
+                rows = [c.tolist() for c in cols.values()]
+                for j, c in enumerate(cols.values()):
+                    if c.dtype.kind == 'S':
+                        rows[j] = [v.decode("ascii", "replace") for v in rows[j]]
+                writer.writerows(zip(*rows))
+            del offs
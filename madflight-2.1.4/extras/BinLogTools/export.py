@@ -0,0 +1,202 @@
+#export all message types of a bin log to a columnar file in one pass
+#
+#  parquet (needs pyarrow): [out]/[NAME].parquet, one row group per scan window
+#  npz     (numpy only)   : [out].npz with one array per column, key "NAME.Column"
+#
+#the log is memory mapped and scanned in windows (binlog.scan_chunks), every window
+#is decoded per type with decode_columns() and appended to the writers, so memory
+#stays bounded by the window size whatever the log size
+#
+#usage: python export.py [binlog filename] <out> <--npz> <--raw> <--chunk MB>
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+import binlog
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def _unique(name, used):
+    out = name
+    k = 2
+    while out in used:
+        out = "%s_%d" % (name, k)
+        k += 1
+    used.add(out)
+    return out
+
+
+class ParquetSink:
+    """one ParquetWriter per message definition, each write() becomes a row group"""
+
+    def __init__(self, path):
+        if pa is None:
+            raise ImportError("parquet export requires pyarrow")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.writers = {}
+        self.names = {}
+        self.used = set()
+
+    @staticmethod
+    def _array(col):
+        if col.dtype.kind == 'S':
+            return pa.array(np.char.decode(col, 'ascii', 'replace'))
+        if col.ndim == 2:
+            return pa.FixedSizeListArray.from_arrays(pa.array(col.reshape(-1)), col.shape[1])
+        return pa.array(col)
+
+    def write(self, fmt, cols):
+        key = (fmt.name, fmt.format, tuple(fmt.columns))
+        name = self.names.get(key)
+        if name is None:
+            name = self.names[key] = _unique(fmt.name, self.used)
+        self.append(name, pa.table({k: self._array(v) for k, v in cols.items()}))
+
+    def append(self, name, table):
+        w = self.writers.get(name)
+        if w is None:
+            w = self.writers[name] = pq.ParquetWriter(os.path.join(self.path, name + '.parquet'), table.schema)
+        w.write_table(table)
+
+    def merge(self, part):
+        """append the tables of another export (in the order of the calls)"""
+        for fn in sorted(os.listdir(part)):
+            if fn.endswith('.parquet'):
+                self.append(fn[:-8], pq.read_table(os.path.join(part, fn)))
+
+    def close(self):
+        for w in self.writers.values():
+            w.close()
+
+
+class NpzSink:
+    """
+    Streams each column to a raw spill file, then assembles the .npz at close.
+
+    np.savez needs the whole array up front; here only the .npy header (which
+    holds the final shape) is written at the end, the data is copied in blocks.
+    """
+
+    def __init__(self, path):
+        self.path = path if path.endswith('.npz') else path + '.npz'
+        self.tmpdir = tempfile.mkdtemp(prefix='export_', dir=os.path.dirname(os.path.abspath(self.path)))
+        self.cols = {}      # key -> [file, dtype, inner shape, rows]
+        self.names = {}     # message definition -> unique name
+        self.used = set()
+
+    def write(self, fmt, cols):
+        key = (fmt.name, fmt.format, tuple(fmt.columns))
+        name = self.names.get(key)
+        if name is None:
+            name = self.names[key] = _unique(fmt.name, self.used)
+        self.append(name, cols)
+
+    def append(self, name, cols):
+        for col, arr in cols.items():
+            k = name + '.' + col
+            c = self.cols.get(k)
+            if c is None:
+                c = self.cols[k] = [open(os.path.join(self.tmpdir, str(len(self.cols))), 'wb'), arr.dtype, arr.shape[1:], 0]
+            np.ascontiguousarray(arr).tofile(c[0])
+            c[3] += len(arr)
+
+    def merge(self, part):
+        """append the arrays of another .npz export (in the order of the calls)"""
+        with np.load(part) as z:
+            for k in z.files:
+                name, col = k.split('.', 1)
+                self.append(name, {col: z[k]})
+
+    def close(self):
+        try:
+            with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_STORED, allowZip64=True) as z:
+                for k, (fh, dt, inner, n) in self.cols.items():
+                    fh.close()
+                    with z.open(k + '.npy', 'w', force_zip64=True) as zf:
+                        np.lib.format.write_array_header_1_0(zf, {
+                            'descr': np.lib.format.dtype_to_descr(dt),
+                            'fortran_order': False,
+                            'shape': (n,) + inner,
+                        })
+                        with open(fh.name, 'rb') as src:
+                            shutil.copyfileobj(src, zf, 1 << 20)
+        finally:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def open_sink(out, fmt='parquet'):
+    return ParquetSink(out) if fmt == 'parquet' else NpzSink(out)
+
+
+def export(filename, out, fmt='parquet', chunk_bytes=16 << 20, scaled=True, start=0, end=None, fmts=None):
+    """
+    single pass export of every message type, returns {name: record count}
+
+    start/end/fmts export only a record aligned byte range (see batch.py)
+    """
+    sink = open_sink(out, fmt)
+    counts = {}
+    fh, d = binlog.open_mmap(filename)
+    try:
+        for r, offsets in binlog.scan_chunks(d, chunk_bytes, start, end, fmts):
+            for t, offs in offsets.items():
+                f = r.fmts[t]
+                if t == binlog.FMT_TYPE or f.struct is None:
+                    continue
+                sink.write(f, binlog.decode_columns(d, f, offs, scaled))
+                counts[f.name] = counts.get(f.name, 0) + len(offs)
+    finally:
+        sink.close()
+        if fh:
+            d.close()
+            fh.close()
+    return counts
+
+
+def load(path, name, columns=None):
+    """read back some columns of one message type from an export ({column: ndarray})"""
+    if path.endswith('.npz'):
+        z = np.load(path)
+        pre = name + '.'
+        keys = [k for k in z.files if k.startswith(pre)]
+        return {k[len(pre):]: z[k] for k in keys if columns is None or k[len(pre):] in columns}
+    table = pq.read_table(os.path.join(path, name + '.parquet'), columns=columns)
+    return {c: table[c].to_numpy() for c in table.column_names}
+
+
+if __name__ == "__main__":
+    args = []
+    chunk = 16
+    argv = iter(sys.argv[1:])
+    for a in argv:
+        if a == '--chunk':
+            chunk = int(next(argv))
+        elif not a.startswith('--'):
+            args.append(a)
+    if not args:
+        print("Usage: export.py [binlog filename] <out> <--npz> <--raw> <--chunk MB>")
+        exit()
+    filename = args[0]
+    fmt = 'npz' if '--npz' in sys.argv or pa is None else 'parquet'
+    out = args[1] if len(args) > 1 else os.path.splitext(filename)[0] + ('.npz' if fmt == 'npz' else '_parquet')
+    t = time.perf_counter()
+    counts = export(filename, out, fmt, chunk << 20, '--raw' not in sys.argv)
+    t = time.perf_counter() - t
+    for name in sorted(counts):
+        print("{: <4} {:8d}".format(name, counts[name]))
+    size = os.path.getsize(filename)
+    print("Output         :", out if fmt == 'parquet' or out.endswith('.npz') else out + '.npz', "(%s)" % fmt)
+    print("Export         : {:.1f} MB in {:.3f} s -> {:.0f} MB/s".format(size / 1e6, t, size / 1e6 / max(t, 1e-9)))
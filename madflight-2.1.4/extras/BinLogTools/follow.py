@@ -0,0 +1,107 @@
+#follow a bin log while it is being written (like tail -f)
+#
+#new bytes are read incrementally and scanned with binlog.scan(), a partial record
+#at the end of a read stays in the buffer until the rest arrives; only the last
+#record of each watched type is decoded, so the cost per poll is the size of the
+#new data and memory stays constant however long the log grows
+#
+#usage: python follow.py [binlog filename] <NAME.Field ...> <--interval s>
+#   eg: python follow.py log.bin ATT.Roll ATT.Pitch BARO.Alt
+
+import os
+import sys
+import time
+
+import binlog
+
+READ_MAX = 4 << 20
+
+
+class Follower:
+    def __init__(self, filename, fields=()):
+        self.filename = filename
+        self.fields = [f.split('.', 1) for f in fields]     # [[NAME, Field]]
+        self.watch = {name for name, _ in self.fields}
+        self.reset()
+
+    def reset(self):
+        self.r = binlog.ScanResult()
+        self.buf = bytearray()
+        self.pos = 0            # file offset of buf[0]
+        self.counts = {}        # type -> records so far
+        self.last = {}          # name -> dict of the last record of a watched type
+        self.last_time = None   # TimeUS of the newest record seen
+
+    def poll(self):
+        """read what was appended since the last call, returns the number of new bytes"""
+        try:
+            size = os.path.getsize(self.filename)
+        except OSError:
+            return 0
+        end = self.pos + len(self.buf)
+        if size < end:
+            self.reset()        # log truncated or replaced: start over
+            end = 0
+        if size == end:
+            return 0
+        with open(self.filename, 'rb') as fh:
+            fh.seek(end)
+            data = fh.read(min(size - end, READ_MAX))
+        self.buf += data
+        r = self.r
+        r.offsets = {}
+        binlog.scan(self.buf, 0, len(self.buf), r)
+        for t, offs in r.offsets.items():
+            self.counts[t] = self.counts.get(t, 0) + len(offs)
+            f = r.fmts[t]
+            ts = f.time_us(self.buf, offs[-1])
+            if ts is not None and (self.last_time is None or ts > self.last_time):
+                self.last_time = ts
+            if f.name in self.watch:
+                self.last[f.name] = f.unpack(self.buf, offs[-1])
+        r.error_regions.clear()    # buffer relative, only error_bytes is kept
+        del self.buf[:r.pos]
+        self.pos += r.pos
+        r.offsets = {}
+        return len(data)
+
+    def status(self):
+        """one line: time, records per type, watched fields"""
+        parts = []
+        if self.last_time is not None:
+            parts.append("{:9.3f}s".format(self.last_time / 1e6))
+        for t in sorted(self.counts):
+            if t != binlog.FMT_TYPE:
+                parts.append("{}:{}".format(self.r.fmts[t].name, self.counts[t]))
+        for name, col in self.fields:
+            v = self.last.get(name, {}).get(col)
+            if isinstance(v, float):
+                v = round(v, 3)
+            parts.append("{}.{}={}".format(name, col, v))
+        if self.r.error_bytes:
+            parts.append("err:{}".format(self.r.error_bytes))
+        return " ".join(parts)
+
+
+if __name__ == "__main__":
+    args = []
+    interval = 0.5
+    argv = iter(sys.argv[1:])
+    for a in argv:
+        if a == '--interval':
+            interval = float(next(argv))
+        elif not a.startswith('--'):
+            args.append(a)
+    if not args:
+        print("Usage: follow.py [binlog filename] <NAME.Field ...> <--interval s>")
+        exit()
+    fo = Follower(args[0], args[1:])
+    try:
+        while True:
+            #catch up in READ_MAX steps, then print once per interval
+            while fo.poll() == READ_MAX:
+                pass
+            print(fo.status(), flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
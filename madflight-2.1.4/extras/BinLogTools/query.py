@@ -0,0 +1,135 @@
+#time window queries over indexed bin logs, downsampled for plotting
+#
+#the window is located with a binary search on TimeUS through the sidecar index
+#(LogIndex.time_range), only the records inside it are decoded (decode_columns),
+#then reduced to about [points] rows:
+#  minmax  keeps the first, min and max row of every bucket for each column, so
+#          spikes survive whatever the reduction (at most [points] rows)
+#  lttb    largest triangle three buckets on one column (best visual shape)
+#
+#usage: python query.py [binlog filename] [TYPE,TYPE..] [start_s] [end_s] <--points N> <--lttb COL> <--out prefix>
+#   eg: python query.py log.bin ATT,RCIN,BARO 95 125 --points 300
+
+import sys
+
+import numpy as np
+
+import binlog
+
+
+def minmax_indices(cols, points):
+    """
+    row indices keeping the first/min/max row of each bucket for every column
+
+    points is an upper bound: the bucket count starts at points // 3 (one column)
+    and shrinks until the de-duplicated union of the kept rows fits, so the result
+    gets close to points however many columns share the rows
+    """
+    n = len(next(iter(cols.values()))) if cols else 0
+    if n <= points:
+        return np.arange(n)
+    cols = [c for c in cols.values() if c.ndim == 1 and c.dtype.kind in 'biuf']
+    buckets = max(1, points // 3)
+    while True:
+        keep = _minmax_rows(cols, n, buckets)
+        if len(keep) <= points or buckets == 1:
+            return keep
+        #rows shared between columns make the union smaller than buckets * (1 + 2 * ncols)
+        buckets = max(1, min(buckets - 1, int(buckets * points / len(keep))))
+
+
+def _minmax_rows(cols, n, buckets):
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(buckets), np.diff(np.append(starts, n)))
+    keep = [starts]
+    for col in cols:
+        for reduce in (np.minimum, np.maximum):
+            v = reduce.reduceat(col, starts)
+            hit = np.flatnonzero(col == v[bucket])
+            _, first = np.unique(bucket[hit], return_index=True)
+            keep.append(hit[first])
+    keep.append([n - 1])
+    return np.unique(np.concatenate(keep))
+
+
+def lttb_indices(x, y, points):
+    """largest triangle three buckets: row indices of points rows of (x, y)"""
+    n = len(x)
+    if n <= points or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    out = np.empty(points, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for k in range(points - 2):
+        lo, hi = edges[k], edges[k + 1]
+        #average of the next bucket (or the last point)
+        nlo, nhi = hi, edges[k + 2] if k + 2 < len(edges) else n
+        cx = x[nlo:nhi].mean()
+        cy = y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[k + 1] = a
+    return out
+
+
+def window(idx, name, t0_us=None, t1_us=None, points=None, lttb=None):
+    """
+    columns of one type with t0_us <= TimeUS < t1_us, downsampled to ~points rows
+
+    lttb: column name to downsample with LTTB instead of min/max buckets
+    """
+    cols = idx.columns(name, t0_us, t1_us)
+    if not points or not cols:
+        return cols
+    if lttb is not None:
+        x = cols.get("TimeUS", np.arange(len(cols[lttb])))
+        keep = lttb_indices(x, cols[lttb], points)
+    else:
+        keep = minmax_indices({k: v for k, v in cols.items() if k != "TimeUS"}, points)
+    return {k: v[keep] for k, v in cols.items()}
+
+
+def write_table(fo, cols):
+    names = list(cols)
+    fo.write('\t'.join(names) + '\n')
+    for row in zip(*(cols[k].tolist() for k in names)):
+        fo.write('\t'.join(str(v) for v in row) + '\n')
+
+
+if __name__ == "__main__":
+    args = []
+    points = None
+    lttb = None
+    out = None
+    argv = iter(sys.argv[1:])
+    for a in argv:
+        if a == '--points':
+            points = int(next(argv))
+        elif a == '--lttb':
+            lttb = next(argv)
+        elif a == '--out':
+            out = next(argv)
+        elif not a.startswith('--'):
+            args.append(a)
+    if len(args) < 2:
+        print("Usage: query.py [binlog filename] [TYPE,TYPE..] <start_s> <end_s> <--points N> <--lttb COL> <--out prefix>")
+        exit()
+    t0 = int(float(args[2]) * 1e6) if len(args) > 2 else None
+    t1 = int(float(args[3]) * 1e6) if len(args) > 3 else None
+    with binlog.LogIndex.load(args[0]) as idx:
+        for name in args[1].split(','):
+            f = idx.fmt(name)
+            lo, hi = idx.time_range(name, t0, t1)
+            #--lttb applies to the types that have that column, the others use min/max
+            cols = window(idx, name, t0, t1, points, lttb if f and lttb in f.columns else None)
+            n = len(next(iter(cols.values()))) if cols else 0
+            print("{: <4} {:8d} records in window -> {:6d} rows".format(name, hi - lo, n))
+            if out is not None:
+                with open("{}_{}.txt".format(out, name), 'w') as fo:
+                    write_table(fo, cols)
+            elif n and n <= 1000:
+                write_table(sys.stdout, cols)
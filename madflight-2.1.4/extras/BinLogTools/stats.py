@@ -1,107 +1,84 @@
 #print bin log statistics - does not depend on pymavlink
 
+#the log is memory mapped and scanned in windows with binlog.scan_chunks(): headers
+#are found with find() and records skipped by their FMT length, so the file is
+#never loaded into memory and the Python loop runs once per record
+
 import sys
 
+import binlog
+
+MAX_REGIONS = 20
+
 if len(sys.argv) < 2: 
   print("ERROR: need filename on command line")
   exit()
 
 filename = sys.argv[1]
 
-fh = open(filename, 'rb')
-#d = bytearray(fh.read())
-d = fh.read()
-fh.close()
-
+fh, d = binlog.open_mmap(filename)
 dlen = len(d)
 
-name = [''] * 256
-fmt = [''] * 256
-cols = [''] * 256
-len = [0] * 256
-cnt = [0] * 256
-fmtpos = [0] * 256
-recpos = [0] * 256
-
-miss_i = 0
-miss_cnt = 0
+cnt = {}
+first = {}
+last = {}
+regions = []        #first MAX_REGIONS error regions, adjacent windows merged
+region_cnt = 0
+r = binlog.ScanResult()
+for r, offsets in binlog.scan_chunks(d):
+    for t, offs in offsets.items():
+        cnt[t] = cnt.get(t, 0) + len(offs)
+        first.setdefault(t, offs[0])
+        last[t] = offs[-1]
+    for s, e in r.error_regions:
+        if regions and regions[-1][1] == s:
+            regions[-1] = (regions[-1][0], e)
+        else:
+            region_cnt += 1
+            if len(regions) < MAX_REGIONS:
+                regions.append((s, e))
+    r.error_regions = []
+if fh:
+    d.close()
+    fh.close()
 
-i = 0
+fmts = r.fmts
+hdr = "Msg   Count Type Len    First     Last Format           Columns"
+sep = "---- ------ ---- --- -------- -------- ---------------- -----------------------------------------"
 
-while i<dlen:
-    if d[i]==0xa3 and d[i+1]==0x95 and d[i+2]==0x80 :
-        #we got a FMT message
-        t = d[i+3]
-        len[t] = d[i+4]
-        name[t] = d[i+5:i+5+4].decode("ascii").rstrip('\x00')
-        fmt[t] = d[i+9:i+9+16].decode("ascii").rstrip('\x00')
-        cols[t] = d[i+25:i+25+64].decode("ascii").rstrip('\x00')
-        cnt[0x80] += 1
-        fmtpos[t] = i
-        #print("{:5d} FMT: typ:{:02X} len:{:2d} name:{:<4}".format(i,t,ln,n))
-        i += len[0x80]
-    elif d[i]==0xa3 and d[i+1]==0x95 :
-        #we got a message
-        t = d[i+2]
-        n = name[t]
-        ln = len[t]
-        if(ln==0):
-            #message type unknown
-            miss_cnt += 1
-            if i!=miss_i+1: print("\n{:08X}:".format(i), end="")
-            #print("MISS {:02X} ".format(d[i]), end="")
-            miss_i = i
-            i += 1
-        else:
-            cnt[t] += 1
-            if recpos[t]==0: 
-                recpos[t]=i
-                #print("{:5d} {}: len:{:2d}".format(i, n, ln))
-            i += ln
-    else:
-        #we got a miss
-        miss_cnt += 1
-        #print("MISS {:02X} ".format(d[i]), end="")
-        i += 1
-print()
+def row(t):
+    f = fmts[t]
+    return "{: <4} {:6d} 0x{:02X} {:3d} {:08X} {:08X} {: <16} {}".format(
+        f.name, cnt.get(t, 0), t, f.length, first.get(t, 0), last.get(t, 0), f.format, ','.join(f.columns))
 
 #print unused types
-typ_cnt = 0
-for i in range(256):
-    if name[i] != '' and cnt[i]==0: typ_cnt += 1
-if typ_cnt>0:
+unused = [t for t in sorted(fmts) if t not in cnt]
+if unused:
     print("==== UNUSED ===")
-    print("Msg   Count Type Len Format           Columns")
-    print("---- ------ ---- --- ---------------- -----------------------------------------")
-    max_len = 0
-    for i in range(256):
-        if name[i] != '' and cnt[i]==0:
-            if max_len<len[i]: max_len = len[i]    
-            #print("{:02X} len:{:3d} cnt:{:6d} fmtpos:{:6d} recpos:{:6d} name:{}".format(i,len[i],cnt[i],fmtpos[i],recpos[i],name[i]))
-        print("{: <4} {:6d} 0x{:02X} {:3d} {: <16} {}".format(name[i],cnt[i],i,len[i],fmt[i],cols[i]))
-    print("Type Count     :",typ_cnt)
-    print("Max Record Len :",max_len)
+    print(hdr)
+    print(sep)
+    for t in unused:
+        print(row(t))
+    print("Type Count     :", len(unused))
+    print("Max Record Len :", max(fmts[t].length for t in unused))
     print("");
     print("==== UNUSED ===")
 
 #print used types
-print("Msg   Count Type Len Format           Columns")
-print("---- ------ ---- --- ---------------- -----------------------------------------")
-typ_cnt = 0
-rec_cnt = 0
-max_len = 0
-for i in range(256):
-    if name[i] != '' and cnt[i]>0:
-        typ_cnt += 1
-        rec_cnt += cnt[i]
-        if max_len<len[i]: max_len = len[i]
-        #print("{:02X} len:{:3d} cnt:{:6d} fmtpos:{:6d} recpos:{:6d} name:{}".format(i,len[i],cnt[i],fmtpos[i],recpos[i],name[i]))
-        print("{: <4} {:6d} 0x{:02X} {:3d} {: <16} {}".format(name[i],cnt[i],i,len[i],fmt[i],cols[i]))
-print("File Bytes     :",dlen)
-print("Error Bytes    :",miss_cnt)
-print("Type Count     :",typ_cnt)
-print("Max Record Len :",max_len)
-print("Record Count   :",rec_cnt)
+print(hdr)
+print(sep)
+for t in sorted(cnt):
+    print(row(t))
+print("File Bytes     :", dlen)
+print("Error Bytes    :", r.error_bytes)
+print("Error Regions  :", region_cnt)
+for s, e in regions:
+    print("  {:08X}-{:08X} {:6d} bytes".format(s, e, e - s))
+if region_cnt > len(regions):
+    print("  ... {} more".format(region_cnt - len(regions)))
+print("Type Count     :", len(cnt))
+print("Max Record Len :", max((fmts[t].length for t in cnt), default=0))
+print("Record Count   :", sum(cnt.values()))
 
 
 
@@ -1,7 +1,7 @@
 #stats of a bin log
 
-#pip install pymavlink
-from pymavlink import DFReader
+#counts come straight from the sidecar index (see binlog.py), no full decode
+import binlog
 import sys
 
 if len(sys.argv) < 2: 
@@ -15,20 +15,16 @@ print("------------------")
 print("first message only")
 print("------------------")
 
-log = DFReader.DFReader_binary(filename)
+idx = binlog.LogIndex.load(filename)
 mtypes = {}
-while True:
-    m = log.recv_msg()
-    if m is None:
-        break
-    t = m.get_type()
-    if t in mtypes:
-        mtypes[t] += 1
-    else:
-        mtypes[t] = 1
-        print(m)
+#types in order of first appearance in the log
+for t in sorted(idx.types, key=lambda t: idx.offsets(t)[0]):
+    f = idx.fmts[t]
+    mtypes[f.name] = idx.count(t)
+    print(binlog.format_record(f, f.unpack(idx.data, idx.offsets(t)[0])))
 
 print("--------------")
 print("message counts")
 print("--------------")
 print(mtypes)
+idx.close()
@@ -0,0 +1,31 @@
+#regression tests for binlog.py - run with: python -m pytest test_binlog.py
+
+import struct
+
+import binlog
+
+
+def _record(fmt, *vals):
+    return bytes([binlog.HEAD1, binlog.HEAD2, fmt.type]) + fmt.struct.pack(*vals)
+
+
+def test_unpack_array_field_then_scaled_column():
+    #'a' (int16[32]) followed by a centi-scaled 'c' and a plain float
+    fmt = binlog.Fmt(0x90, 3 + 8 + 64 + 2 + 4, "ARR", "Qacf", "TimeUS,Arr,X,Y")
+    assert fmt.struct is not None
+    arr = list(range(-16, 16))
+    d = _record(fmt, 123456, *arr, 250, 7.5)
+    out = fmt.unpack(d, 0)
+    assert out["TimeUS"] == 123456
+    assert out["Arr"] == arr
+    assert abs(out["X"] - 2.5) < 1e-9
+    assert out["Y"] == 7.5
+    assert fmt.time_us(d, 0) == 123456
+
+
+def test_unpack_without_array_field():
+    fmt = binlog.Fmt(0x91, 3 + 8 + 4 + 4, "POS", "QLL", "TimeUS,Lat,Lng")
+    d = _record(fmt, 1, -235000000, -466000000)
+    out = fmt.unpack(d, 0)
+    assert abs(out["Lat"] + 23.5) < 1e-9 and abs(out["Lng"] + 46.6) < 1e-9
+    assert struct.calcsize(fmt.struct.format) == fmt.length - 3
@@ -1,6 +1,11 @@
 import re
 import os
+import sys
+import time
+import json
+import hashlib
 import datetime 
+from concurrent.futures import ProcessPoolExecutor
 
 DEBUG = False
 #DEBUG = True
@@ -8,13 +13,168 @@ DEBUG = False
 source_dirname = "betaflight_source" # copy from https://github.com/betaflight/unified-targets/tree/master/configs/default
 destination_path = "../../src/brd/betaflight/"
 destination_prefix = ""
+cache_filename = "betaflight_target_converter.cache.json" # input/output hashes of the last run, for incremental conversion
+index_filename = "betaflight_board_index.json" # board -> gizmos, buses, pins, queried with board_query.py
+pool_min_files = 64 # with --jobs N: below this a process pool costs more than it saves
 
 CMT = " // "
 
+#precompiled patterns
+RE_CONFIG = re.compile(r"(.config$)")
+RE_SPACES = re.compile(r"[ \t]+")
+RE_PIN = re.compile(r"0([0-9])")
+RE_MCU = re.compile(r"\bSTM32\w+")
+RE_GENERATED = re.compile(r"^Generated on: .*$", re.M)
+RE_PIN_BUS = re.compile(r"pin_(spi|i2c|ser)(\d+)_")
+
+#resource dispatch table: resource -> (define template, first instance only, extra define)
+#  {bus} is the 0-based instance, {pin} the pin name (PC1)
+RESOURCES = {
+    "SERIAL_TX" : ("pin_ser{bus}_tx {pin}", False, None),
+    "SERIAL_RX" : ("pin_ser{bus}_rx {pin}", False, None),
+    "INVERTER"  : ("pin_ser{bus}_inv {pin}", False, None),
+    "SPI_SCK"   : ("pin_spi{bus}_sclk {pin}", False, None),
+    "SPI_MISO"  : ("pin_spi{bus}_miso {pin}", False, None),
+    "SPI_MOSI"  : ("pin_spi{bus}_mosi {pin}", False, None),
+    "I2C_SCL"   : ("pin_i2c{bus}_scl {pin}", False, None),
+    "I2C_SDA"   : ("pin_i2c{bus}_sda {pin}", False, None),
+    "MOTOR"     : ("pin_out{bus} {pin}", False, None),
+    "LED"       : ("pin_led {pin}", True, None),
+    "PPM"       : ("pin_rcl_ppm {pin}", True, None),
+    "ADC_BATT"  : ("pin_bat_v {pin}", True, "bat_gizmo ADC"),
+    "ADC_CURR"  : ("pin_bat_i {pin}", True, "bat_gizmo ADC"),
+    "SDIO_CK"   : ("pin_mmc_clk {pin}", True, None),
+    "SDIO_CMD"  : ("pin_mmc_cmd {pin}", True, None),
+    "SDIO_D0"   : ("pin_mmc_dat {pin}", True, "bbx_gizmo SDMMC"),
+    "GYRO_EXTI" : ("pin_imu_int {pin}", True, None),
+    "GYRO_CS"   : ("pin_imu_cs {pin}", True, None),
+    "SDCARD_CS" : ("pin_bbx_cs {pin}", True, "bbx_gizmo SDSPI"),
+}
+
+#set dispatch table: setting -> define template, {bus} is value-1, {v} the value
+SETTINGS = {
+    "mag_i2c_device"      : "mag_i2c_bus {bus}",
+    "baro_i2c_device"     : "bar_i2c_bus {bus}",
+    #not needed --> "gyro_1_bustype" : "imu_bus_type {v}",
+    "gyro_1_spibus"       : "imu_spi_bus {bus}",
+    "gyro_1_sensor_align" : "imu_align {v}",
+    "sdcard_spi_bus"      : "bbx_spi_bus {bus}",
+}
+
+#define prefixes: #define USE_GYRO_SPI_MPU6000 -> imu_gizmo MPU6000
+DEFINE_PREFIXES = (
+    ("USE_GYRO_SPI_", "imu_gizmo "),
+    ("USE_BARO_", "bar_gizmo "),
+    ("USE_MAG_", "mag_gizmo "),
+)
+
 def main() :
-    for filename in os.listdir(source_dirname) :
-        convert(filename)
-        if DEBUG: return
+    t_start = time.perf_counter()
+    force = "--force" in sys.argv
+    jobs = 1 #a pool is slower than one process for the ~430 bundled configs (process start + imports)
+    if "--jobs" in sys.argv : jobs = int(sys.argv[sys.argv.index("--jobs") + 1])
+    tool_hash = file_hash(os.path.abspath(__file__))
+
+    #incremental: skip sources whose content, and the converter itself, did not change since the last run
+    cache = load_cache()
+    if cache.get("tool") != tool_hash : cache = {"tool": tool_hash, "files": {}}
+    todo = []
+    skipped = 0
+    for filename in sorted(os.listdir(source_dirname)) :
+        h = file_hash(source_dirname + "/" + filename)
+        c = cache["files"].get(filename)
+        if not force and not DEBUG and c and c["src"] == h and output_ok(c) :
+            skipped += 1
+        else :
+            todo.append(filename)
+        if DEBUG: break
+
+    if len(todo) >= pool_min_files and jobs > 1 and not DEBUG :
+        with ProcessPoolExecutor(max_workers=jobs) as pool :
+            results = list(pool.map(convert, todo, chunksize=8))
+    else :
+        results = [convert(filename) for filename in todo]
+
+    #timing report
+    status_cnt = {}
+    for r in results :
+        status_cnt[r["status"]] = status_cnt.get(r["status"], 0) + 1
+        if r["status"] != "short" : cache["files"][r["filename"]] = r
+    if not DEBUG :
+        save_cache(cache)
+        save_index(cache)
+    t_total = time.perf_counter() - t_start
+    print( "sources   : " + str(skipped + len(todo)) )
+    print( "cached    : " + str(skipped) + " (source unchanged, not parsed)" )
+    print( "written   : " + str(status_cnt.get("written", 0)) )
+    print( "unchanged : " + str(status_cnt.get("unchanged", 0)) + " (parsed, output identical, not rewritten)" )
+    print( "too short : " + str(status_cnt.get("short", 0)) )
+    print( "time      : {:.3f} s ({:.2f} ms/converted file)".format(t_total, 1000 * sum(r["time"] for r in results) / max(len(results), 1)) )
+    for r in sorted(results, key=lambda r: -r["time"])[:3] :
+        print( "  slowest : {:.2f} ms {}".format(1000 * r["time"], r["filename"]) )
+
+def file_hash(path) :
+    with open(path, "rb") as f :
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_cache() :
+    try:
+        with open(cache_filename, "r") as f :
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache) :
+    with open(cache_filename + ".tmp", "w") as f :
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(cache_filename + ".tmp", cache_filename)
+
+def save_index(cache) :
+    #compact board index: the records plus an inverted index attribute -> value -> board numbers
+    boards = sorted((c["board"] for c in cache["files"].values() if "board" in c), key=lambda b: b["board"])
+    inverted = {}
+    for n, b in enumerate(boards) :
+        for attr, vals in b["attrs"].items() :
+            for v in vals :
+                inverted.setdefault(attr, {}).setdefault(v.upper(), []).append(n)
+    text = json.dumps({"version": 1, "boards": boards, "inverted": inverted}, separators=(",", ":"), sort_keys=True)
+    try:
+        with open(index_filename, "r") as f :
+            if f.read() == text : return
+    except OSError:
+        pass
+    with open(index_filename + ".tmp", "w") as f :
+        f.write(text)
+    os.replace(index_filename + ".tmp", index_filename)
+
+def board_record(board, mcu, defines) :
+    #structured view of the generated madflight_board defines
+    attrs = {}
+    pins = {}
+    def add(attr, val) :
+        vals = attrs.setdefault(attr, [])
+        if val not in vals : vals.append(val)
+    for define in defines :
+        key, _, val = define.split(CMT)[0].strip().partition(" ")
+        if not key : continue
+        if key.endswith("_gizmo") : add(key[:-6], val)
+        elif key.endswith("_bus") or key == "imu_align" : add(key, val)
+        elif key.startswith("pin_") :
+            pins[key] = val
+            m = RE_PIN_BUS.match(key)
+            if m : add(m.group(1), m.group(2))
+    for k in ("spi", "i2c", "ser") :
+        if k in attrs : attrs[k].sort(key=int)
+    attrs["out"] = [str(sum(1 for k in pins if k.startswith("pin_out")))]
+    if mcu : attrs["mcu"] = [mcu]
+    return {"board": board, "attrs": attrs, "pins": pins}
+
+def output_ok(c) :
+    #the output still exists and was not edited since it was generated
+    try:
+        return file_hash(destination_path + c["out"]) == c["out_hash"]
+    except OSError:
+        return False
 
 def toInt(d) :
     try:
@@ -23,15 +183,11 @@ def toInt(d) :
         return 0
 
 def convert(filename) :
-    def toint(s) :
-        try:
-            return int(s)
-        except ValueError:
-            return 0
-    
+    t_start = time.perf_counter()
+
     #in and output files
     infile           = source_dirname + "/" + filename
-    strippedfilename = re.sub(r"(.config$)", r"", filename)
+    strippedfilename = RE_CONFIG.sub(r"", filename)
     outfilename      = destination_prefix + strippedfilename + ".h"
     outfile          = destination_path + outfilename
 
@@ -39,9 +195,10 @@ def convert(filename) :
     f = open(infile,"r")
     lines = f.readlines()
     f.close()
+    src_hash = file_hash(infile)
 
     #don't parse files that are too short
-    if len(lines)<10 : return
+    if len(lines)<10 : return {"filename": filename, "status": "short", "time": time.perf_counter() - t_start}
 
     #parse lines to topics
     defines = []
@@ -49,78 +206,38 @@ def convert(filename) :
     manufacturer_id = ""
 
     for line in lines:
-        line = line.strip();
-        line = line.replace("\t" ," ")
-        line = re.sub(" +", " ", line) #replace multiple spaces with one space 
+        line = RE_SPACES.sub(" ", line.strip()) #tabs to spaces, replace multiple spaces with one space 
         p = (line + "   ").split(" ") #add dummy spaces to fill at least p[4]
-        for i in range(4): p[i] = p[i].strip()
+        cmd = p[0]
 
-        if p[0] == "#define" : # example: #define USE_ACC_SPI_MPU6000
+        if cmd == "#define" : # example: #define USE_ACC_SPI_MPU6000
             nme = p[1]
-            val = p[2]
-            if nme.startswith("USE_GYRO_SPI_") :
-                val = nme.replace("USE_GYRO_SPI_", "") #remove prefix
-                defines.append( "imu_gizmo " + val + CMT + line )
-            elif nme.startswith("USE_BARO_") :
-                val = nme.replace("USE_BARO_", "") #remove prefix
-                defines.append( "bar_gizmo " + val + CMT + line )
-            elif nme.startswith("USE_MAG_") :
-                val = nme.replace("USE_MAG_", "") #remove prefix
-                defines.append( "mag_gizmo " + val + CMT + line )
-            #else:
-                #defines.append( "# " + line )
-
-        if p[0] == "board_name" : # example: board_name MATEKH743
+            for prefix, gizmo in DEFINE_PREFIXES :
+                if nme.startswith(prefix) :
+                    defines.append( gizmo + nme.replace(prefix, "") + CMT + line ) #remove prefix
+                    break
+
+        elif cmd == "board_name" : # example: board_name MATEKH743
             board_name = p[1]
 
-        if p[0] == "manufacturer_id" : # example: manufacturer_id MTKS
+        elif cmd == "manufacturer_id" : # example: manufacturer_id MTKS
             manufacturer_id = p[1] 
 
-        if p[0] == "resource" : # example: resource SERIAL_TX 1 A09
-            r = p[1]
+        elif cmd == "resource" : # example: resource SERIAL_TX 1 A09
             i = toInt(p[2]) # 1-based instance int
-            bus = str(i - 1) # 0-based string
-            pin = "P" + re.sub(r"0([0-9])", r"\1", p[3]) #convert pin name from C01 to PC1
-            if   r == "SERIAL_TX" : defines.append( "pin_ser" + bus + "_tx " + pin + CMT + line )
-            elif r == "SERIAL_RX" : defines.append( "pin_ser" + bus + "_rx " + pin + CMT + line )
-            elif r == "INVERTER"  : defines.append( "pin_ser" + bus + "_inv " + pin + CMT + line )
-            elif r == "SPI_SCK"   : defines.append( "pin_spi" + bus + "_sclk " + pin + CMT + line )
-            elif r == "SPI_MISO"  : defines.append( "pin_spi" + bus + "_miso " + pin + CMT + line)
-            elif r == "SPI_MOSI"  : defines.append( "pin_spi" + bus + "_mosi " + pin + CMT + line)
-            elif r == "I2C_SCL"   : defines.append( "pin_i2c" + bus + "_scl " + pin + CMT + line )
-            elif r == "I2C_SDA"   : defines.append( "pin_i2c" + bus + "_sda " + pin + CMT + line )
-            elif r == "MOTOR"     : defines.append( "pin_out" + bus + " " + pin + CMT + line )
-            elif r == "LED" and i==1 : defines.append( "pin_led " + pin + CMT + line )
-            elif r == "PPM" and i==1 : defines.append( "pin_rcl_ppm " + pin + CMT + line )
-            elif r == "ADC_BATT" and i==1 : 
-                defines.append( "pin_bat_v " + pin + CMT + line )
-                defines.append( "bat_gizmo ADC" )
-            elif r == "ADC_CURR" and i==1 : 
-                defines.append( "pin_bat_i " + pin + CMT + line )
-                defines.append( "bat_gizmo ADC" )
-            elif r == "SDIO_CK" and i==1 : defines.append( "pin_mmc_clk " + pin + CMT + line )
-            elif r == "SDIO_CMD" and i==1 : defines.append( "pin_mmc_cmd " + pin + CMT + line )
-            elif r == "SDIO_D0" and i==1 : 
-                defines.append( "pin_mmc_dat " + pin + CMT + line )
-                defines.append( "bbx_gizmo SDMMC" )
-            elif r == "GYRO_EXTI" and i==1 : defines.append( "pin_imu_int " + pin + CMT + line )
-            elif r == "GYRO_CS" and i==1 : defines.append( "pin_imu_cs " + pin + CMT + line )
-            elif r == "SDCARD_CS" and i==1 : 
-                defines.append( "pin_bbx_cs " + pin + CMT + line )
-                defines.append( "bbx_gizmo SDSPI" )
+            res = RESOURCES.get(p[1])
+            if res and (i==1 or not res[1]) :
+                pin = "P" + RE_PIN.sub(r"\1", p[3]) #convert pin name from C01 to PC1
+                defines.append( res[0].format(bus=i - 1, pin=pin) + CMT + line )
+                if res[2] : defines.append( res[2] )
             else :
                 defines.append( CMT + line )
 
-        if p[0] == "set" : #example: set mag_i2c_device = 1
-            n = p[1]
+        elif cmd == "set" : #example: set mag_i2c_device = 1
             v = p[3]
-            bus = str(toInt(v) - 1);
-            if   n == "mag_i2c_device" : defines.append( "mag_i2c_bus " + bus + CMT + line )
-            elif n == "baro_i2c_device" : defines.append( "bar_i2c_bus " + bus + CMT + line )
-            #not needed --> elif n == "gyro_1_bustype" : defines.append( "imu_bus_type " + v + CMT + line )
-            elif n == "gyro_1_spibus" : defines.append( "imu_spi_bus " + bus + CMT + line )
-            elif n == "gyro_1_sensor_align" : defines.append( "imu_align " + v + CMT + line )
-            elif n == "sdcard_spi_bus" : defines.append( "bbx_spi_bus " + bus + CMT + line )
+            tpl = SETTINGS.get(p[1])
+            if tpl :
+                defines.append( tpl.format(bus=toInt(v) - 1, v=v) + CMT + line )
             else :
                 defines.append( CMT + line )
 
@@ -130,11 +247,11 @@ def convert(filename) :
     # print( "manufacturer_id:", manufacturer_id )
 
     #output madflight target header file
-    f = open(outfile,"w")
+    out = []
 
     def fprint(txt) :
         if DEBUG : print( txt )
-        else : f.write(txt + "\n")
+        else : out.append(txt + "\n")
 
     fprint( "/*==============================================================================" )
     fprint( "Generated on: " + str(datetime.datetime.now()) )
@@ -151,7 +268,7 @@ def convert(filename) :
 
     fprint( "" )
     fprint( "#define MF_BOARD_NAME \"BETAFLIGHT-" + strippedfilename + "\"" )
-    mcu_re = re.search(r"\bSTM32\w+", lines[0] + " " + lines[1]);
+    mcu_re = RE_MCU.search(lines[0] + " " + lines[1]);
     if mcu_re : fprint( "#define MF_MCU_NAME \"" + mcu_re.group() + "\"" )
 
     fprint( "" )
@@ -171,6 +288,27 @@ def convert(filename) :
     fprint( "".join(lines) )
     fprint( "*/" )
 
-    f.close()
+    #only rewrite the header when something other than the "Generated on" line changed
+    text = "".join(out)
+    status = "written"
+    try:
+        with open(outfile, "r") as f :
+            old = f.read()
+        if RE_GENERATED.sub("", old) == RE_GENERATED.sub("", text) :
+            text = old
+            status = "unchanged"
+    except OSError:
+        pass
+    if status == "written" and not DEBUG :
+        with open(outfile, "w") as f :
+            f.write(text)
+
+    board = board_record(strippedfilename, mcu_re.group() if mcu_re else "", defines)
+    if board_name : board["attrs"]["name"] = [board_name]
+    if manufacturer_id : board["attrs"]["mfr"] = [manufacturer_id]
+
+    return {"filename": filename, "status": status, "src": src_hash, "out": outfilename, "board": board,
+            "out_hash": None if DEBUG else file_hash(outfile), "time": time.perf_counter() - t_start}
 
-main()
\ No newline at end of file
+if __name__ == "__main__" :
+    main()
\ No newline at end of file
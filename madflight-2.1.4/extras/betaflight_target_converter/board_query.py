@@ -0,0 +1,84 @@
+import sys
+import json
+import time
+import fnmatch
+
+# query the board index written by betaflight_target_converter.py
+#
+# terms are ANDed, each term is attr=value or a bare value (matches any attribute)
+# values are case insensitive; exact match first, else prefix match (ICM42688 -> ICM42688P),
+# * and ? are wildcards. bus numbers are madflight 0-based (imu_spi_bus=0 is betaflight SPI1)
+#
+# attributes: imu bar mag bbx bat (gizmos), imu_spi_bus bbx_spi_bus mag_i2c_bus bar_i2c_bus imu_align,
+#             spi i2c ser (buses with pins defined), out (number of outputs), mcu name mfr
+#
+# examples:
+#   python board_query.py imu=ICM42688 imu_spi_bus=0 bbx=SDMMC
+#   python board_query.py mcu=STM32H7* --count
+#   python board_query.py --list imu
+
+index_filename = "betaflight_board_index.json"
+
+class BoardIndex :
+    def __init__(self, filename=index_filename) :
+        with open(filename, "r") as f :
+            idx = json.load(f)
+        self.boards = idx["boards"]
+        self.inverted = idx["inverted"]  # attr -> VALUE -> [board numbers]
+        self.all = set(range(len(self.boards)))
+
+    def match(self, attr, value) :
+        #set of board numbers where attr (None = any attribute) matches value
+        value = value.upper()
+        attrs = [attr] if attr else list(self.inverted)
+        hits = set()
+        for a in attrs :
+            vals = self.inverted.get(a, {})
+            if any(c in value for c in "*?[") :
+                keys = [k for k in vals if fnmatch.fnmatchcase(k, value)]
+            elif value in vals :
+                keys = [value]
+            else :
+                keys = [k for k in vals if k.startswith(value)]
+            for k in keys :
+                hits.update(vals[k])
+        return hits
+
+    def query(self, terms) :
+        #boards matching all terms ("attr=value" or "value")
+        result = set(self.all)
+        for term in terms :
+            attr, _, value = term.rpartition("=")
+            result &= self.match(attr or None, value)
+            if not result : break
+        return [self.boards[n] for n in sorted(result)]
+
+def main() :
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if "--list" in sys.argv :
+        idx = BoardIndex()
+        attr = args[0] if args else None
+        for a in sorted(idx.inverted) if attr is None else [attr] :
+            vals = idx.inverted.get(a, {})
+            print( a + ": " + ", ".join("{} ({})".format(k, len(vals[k])) for k in sorted(vals, key=lambda k: -len(vals[k]))) )
+        return
+    if not args :
+        print( "usage: board_query.py [attr=value | value] ... [--count] [--json] | --list [attr]" )
+        return
+    t = time.perf_counter()
+    idx = BoardIndex()
+    t_load = time.perf_counter() - t
+    t = time.perf_counter()
+    boards = idx.query(args)
+    t_query = time.perf_counter() - t
+    if "--json" in sys.argv :
+        print( json.dumps(boards, indent=1) )
+    elif "--count" not in sys.argv :
+        for b in boards :
+            a = b["attrs"]
+            print( "{:<28} {:<12} imu:{:<24} bbx:{:<6} bar:{}".format(b["board"], ",".join(a.get("mcu", [])),
+                ",".join(a.get("imu", [])), ",".join(a.get("bbx", [])), ",".join(a.get("bar", []))) )
+    print( "{} of {} boards (load {:.1f} ms, query {:.3f} ms)".format(len(boards), len(idx.boards), 1000 * t_load, 1000 * t_query) )
+
+if __name__ == "__main__" :
+    main()
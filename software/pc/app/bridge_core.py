@@ -1,3 +1,4 @@
+import selectors
 import sys
 import time
 from collections import deque
@@ -11,15 +12,34 @@ except Exception as e:  # pragma: no cover
     serial = None
     list_ports = None
 
-try:
-    import pyvjoy
-except Exception as e:  # pragma: no cover
-    pyvjoy = None
+# pyvjoy (loads the vJoy DLL) and keyboard (installs OS hooks) are only needed
+# once a worker runs, so they are imported on Start instead of before the window
+# shows; until then both stay None.
+pyvjoy = None
+keyboard = None
 
-try:
-    import keyboard
-except Exception as e:  # pragma: no cover
-    keyboard = None
+import crsf
+from mixer import AXIS_NAMES, Mixer
+
+
+INPUT_MODES = ("csv", "crsf")
+
+
+def load_output_libs() -> None:
+    """Import pyvjoy/keyboard on first use; a missing one stays None (workers log it)."""
+    global pyvjoy, keyboard
+    if pyvjoy is None:
+        try:
+            import pyvjoy as _pyvjoy
+            pyvjoy = _pyvjoy
+        except Exception:  # pragma: no cover
+            pass
+    if keyboard is None:
+        try:
+            import keyboard as _keyboard
+            keyboard = _keyboard
+        except Exception:  # pragma: no cover
+            pass
 
 
 def list_serial_ports() -> Sequence[str]:
@@ -67,8 +87,18 @@ def parse_serial_payload(line: str):
 class BridgeWorker:
     """
     Background worker that reads serial data, feeds vJoy axes and emits key presses on switch edges.
+
+    What goes where is decided by a compiled Mixer (see mixer.py): pass a mixer spec
+    to customize it, otherwise Mixer.default() gives the historical mapping below
+    (P0..P7 -> axes, S1/S2 -> buttons 1/2 and sw1_key/sw2_key).
+
+    HOT_KEYS can be changed while running with reconfigure() (same names as the
+    constructor); port, baud, input mode and vJoy device need a new worker.
     """
 
+    HOT_KEYS = ("sw1_key", "sw2_key", "on_threshold", "deadzone_255", "smooth_n", "invert", "mixer")
+
+    # historical fixed mapping, kept for default_routes(); BridgeWorker goes through Mixer.default()
     AXIS_ORDER = [
         ("wAxisX", 0),
         ("wAxisY", 1),
@@ -94,6 +124,8 @@ class BridgeWorker:
         invert: Optional[Sequence[bool]] = None,
         log: Optional[Callable[[str], None]] = None,
         on_data: Optional[Callable[[Dict[str, Any]], None]] = None,
+        input_mode: str = "csv",
+        mixer: Optional[Dict[str, Any]] = None,
     ) -> None:
         self.com_port = com_port
         self.baud = baud
@@ -107,15 +139,66 @@ class BridgeWorker:
         self.invert = list(invert) if invert is not None else [False] * 8
         self.log = log or (lambda msg: None)
         self.on_data = on_data
+        if input_mode not in INPUT_MODES:
+            raise ValueError(f"input_mode inválido: {input_mode!r} (use {INPUT_MODES})")
+        self.input_mode = input_mode
+        self.mixer_spec = mixer
+        # compiled here so a bad spec fails at construction (MixerError is a ValueError)
+        self._tuning = self._build_tuning({k: getattr(self, k) for k in self.HOT_KEYS if k != "mixer"}, mixer)
+        self.mixer = self._tuning["mixer"]
 
         self._thread: Optional[Thread] = None
         self._stop = Event()
         self._running = Event()
+        self.frames = 0
+        self.bad_lines = 0
+        self.timeouts = 0
+        self.reloads = 0
+        self.mix_errors = 0
+        self.fps = 0.0
+        self.last_frame: Optional[Dict[str, Any]] = None
+        self._t_start = 0.0
 
     @property
     def is_running(self) -> bool:
         return self._running.is_set()
 
+    def reconfigure(self, **changes: Any) -> None:
+        """
+        Hot-apply HOT_KEYS without reopening the port. The new mix is compiled and
+        tabulated here, on the caller's thread, and handed over as one object that
+        the read loop swaps in between two frames. A bad value raises ValueError
+        (MixerError for the mixer) and leaves the running settings untouched.
+        """
+        unknown = sorted(set(changes) - set(self.HOT_KEYS))
+        if unknown:
+            raise ValueError(f"não ajustável com a ponte rodando: {unknown}")
+        cur = self._tuning
+        values = {k: changes.get(k, cur[k]) for k in self.HOT_KEYS if k != "mixer"}
+        tuning = self._build_tuning(values, changes.get("mixer", cur["mixer_spec"]))
+        self._tuning = tuning   # single assignment: the loop sees the old or the new settings, never a mix
+        if not self.is_running:
+            self._adopt(tuning)
+
+    def stats(self) -> Dict[str, Any]:
+        t = self._tuning
+        return {
+            "running": self.is_running,
+            "port": self.com_port,
+            "baud": self.baud,
+            "input_mode": self.input_mode,
+            "uptime_s": round(time.time() - self._t_start, 1) if self.is_running else 0.0,
+            "frames": self.frames,
+            "fps": round(self.fps, 1),
+            "bad_lines": self.bad_lines,
+            "timeouts": self.timeouts,
+            "reloads": self.reloads,
+            "mix_errors": self.mix_errors,
+            "last": self.last_frame,
+            "config": {k: t[k] for k in self.HOT_KEYS if k != "mixer"},
+            "mixer": "config" if t["mixer_spec"] else "padrão",
+        }
+
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
             return
@@ -129,6 +212,52 @@ class BridgeWorker:
             self._thread.join(timeout=2.5)
 
     # Internal
+    @staticmethod
+    def _build_tuning(values: Dict[str, Any], mixer_spec: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        try:
+            invert = [bool(v) for v in values["invert"]]
+            deadzone = int(values["deadzone_255"])
+            on_threshold = int(values["on_threshold"])
+            smooth_n = max(0, int(values["smooth_n"]))
+        except TypeError as e:   # eg. null in config.json
+            raise ValueError(f"valor inválido: {e}")
+        if len(invert) != 8:
+            raise ValueError(f"invert precisa de 8 valores, veio {len(invert)}")
+        sw1, sw2 = str(values["sw1_key"] or ""), str(values["sw2_key"] or "")
+        mixer = Mixer(mixer_spec) if mixer_spec else Mixer.default(sw1, sw2, invert)
+        mixer.bind(lambda v, inv: to_vjoy(v, deadzone_255=deadzone, invert=inv))
+        return {
+            "sw1_key": sw1,
+            "sw2_key": sw2,
+            "on_threshold": on_threshold,
+            "deadzone_255": deadzone,
+            "smooth_n": smooth_n,
+            "invert": invert,
+            "mixer_spec": mixer_spec,
+            "mixer": mixer,
+        }
+
+    def _adopt(self, tuning: Dict[str, Any]) -> None:
+        for k in self.HOT_KEYS:
+            if k != "mixer":
+                setattr(self, k, tuning[k])
+        self.mixer_spec = tuning["mixer_spec"]
+        self.mixer = tuning["mixer"]
+
+    def _handover(self, j: Any, old: Mixer, new: Mixer) -> None:
+        """outputs the new mix no longer drives go neutral; shared keys keep their state (no re-tap)"""
+        kept = {name for _, name, _ in new.axes}
+        for _, name, _ in old.axes:
+            if name not in kept:
+                setattr(j.data, name, to_vjoy(128, self.deadzone_255, False))
+        bits = 0
+        for _, bit in new.buttons:
+            bits |= bit
+        for _, bit in old.buttons:
+            if not bit & bits:
+                j.data.lButtons &= ~bit
+        new.adopt_keys(old)
+
     def _tap_key(self, key_name: str) -> None:
         if not key_name:
             return
@@ -141,6 +270,7 @@ class BridgeWorker:
             self.log(f"[WARN] Falha ao enviar tecla '{key_name}': {e}")
 
     def _run(self) -> None:
+        load_output_libs()
         if pyvjoy is None:
             self.log("[ERRO] pyvjoy não disponível. Instale o driver vJoy e a lib pyvjoy.")
             return
@@ -160,84 +290,123 @@ class BridgeWorker:
             self.log(f"[ERRO] Falha ao abrir porta {self.com_port}: {e}")
             return
 
+        tuning = self._tuning
+        self._adopt(tuning)
+        mixer = self.mixer
+        mixer.reset()
+        self.frames = self.bad_lines = self.timeouts = self.mix_errors = 0
+        self._t_start = time.time()
         self._running.set()
         self.log(
-            f"Conectado em {self.com_port} @ {self.baud}. vJoy={self.vjoy_device_id}. Sw1={self.sw1_key} Sw2={self.sw2_key}"
+            f"Conectado em {self.com_port} @ {self.baud} ({self.input_mode}). vJoy={self.vjoy_device_id}. Sw1={self.sw1_key} Sw2={self.sw2_key}"
         )
 
         smooth = [deque(maxlen=max(1, self.smooth_n)) for _ in range(8)]
         last_ok = time.time()
         last_warn = 0.0
+        last_mix_warn = 0.0
         dbg_bad_lines = 0
-        last_s1_on: Optional[int] = None
-        last_s2_on: Optional[int] = None
+        fps_t0, fps_n = last_ok, 0
+
+        def neutralize() -> None:
+            for _, name, _ in mixer.axes:
+                setattr(j.data, name, to_vjoy(128, self.deadzone_255, False))
+            for _, bit in mixer.buttons:
+                j.data.lButtons &= ~bit
+            j.update()
         last_emit = 0.0
         emit_interval = 0.03  # ~33 Hz UI updates
+        crsf_parser = crsf.CrsfParser() if self.input_mode == "crsf" else None
+
+        def neutralize_on_timeout(now: float) -> None:
+            nonlocal last_warn
+            # Neutralize axes and release buttons on timeout
+            neutralize()
+            self.timeouts += 1
+            # Log a gentle warning at most every 2s
+            if now - last_warn > 2.0:
+                self.log("[WARN] Sem dados do MEGA (timeout). Verifique conexões e porta COM.")
+                last_warn = now
 
         try:
             while not self._stop.is_set():
-                line_bytes = ser.readline()
-                now = time.time()
-                if not line_bytes:
-                    if now - last_ok > 1.0:
-                        # Neutralize axes and release buttons on timeout
-                        for name, _ in self.AXIS_ORDER:
-                            setattr(j.data, name, to_vjoy(128, self.deadzone_255, False))
-                        j.set_button(1, 0)
-                        j.set_button(2, 0)
-                        j.update()
-                        # Log a gentle warning at most every 2s
-                        if now - last_warn > 2.0:
-                            self.log("[WARN] Sem dados do MEGA (timeout). Verifique conexões e porta COM.")
-                            last_warn = now
-                    continue
+                if self._tuning is not tuning:
+                    # reconfigure(): swap the whole settings object between two frames
+                    tuning = self._tuning
+                    self._handover(j, mixer, tuning["mixer"])
+                    old_smooth_n = self.smooth_n
+                    self._adopt(tuning)
+                    mixer = self.mixer
+                    if self.smooth_n != old_smooth_n:
+                        smooth = [deque(maxlen=max(1, self.smooth_n)) for _ in range(8)]
+                    self.reloads += 1
+                    self.log(f"Configuração aplicada em execução (deadzone={self.deadzone_255}, "
+                             f"smooth={self.smooth_n}, mixer={'config' if self.mixer_spec else 'padrão'}).")
+
+                if crsf_parser is not None:
+                    # CRSF: drain whatever arrived and keep only the newest RC frame
+                    chunk = ser.read(ser.in_waiting or 1)
+                    now = time.time()
+                    channels = crsf_parser.feed_rc(chunk) if chunk else None
+                    if channels is None:
+                        if now - last_ok > 1.0:
+                            neutralize_on_timeout(now)
+                        continue
+                    parsed = crsf.channels_to_payload(channels)
+                else:
+                    line_bytes = ser.readline()
+                    now = time.time()
+                    if not line_bytes:
+                        if now - last_ok > 1.0:
+                            neutralize_on_timeout(now)
+                        continue
 
-                try:
-                    line = line_bytes.decode(errors="ignore").strip()
-                except Exception:
-                    continue
+                    try:
+                        line = line_bytes.decode(errors="ignore").strip()
+                    except Exception:
+                        continue
 
-                parsed = parse_serial_payload(line)
-                if parsed is None:
-                    if dbg_bad_lines < 3 and line:
-                        self.log(f"[INFO] Linha ignorada: '{line}'")
-                        dbg_bad_lines += 1
-                    continue
+                    parsed = parse_serial_payload(line)
+                    if parsed is None:
+                        self.bad_lines += 1
+                        if dbg_bad_lines < 3 and line:
+                            self.log(f"[INFO] Linha ignorada: '{line}'")
+                            dbg_bad_lines += 1
+                        continue
 
                 pots, s1_raw, s2_raw, has_switches = parsed
                 s1_on = 1 if s1_raw >= self.on_threshold else 0
                 s2_on = 1 if s2_raw >= self.on_threshold else 0
 
-                # Axes
-                for i, (name, src_idx) in enumerate(self.AXIS_ORDER):
-                    v = pots[src_idx]
-                    smooth[i].append(v)
-                    if self.smooth_n > 0:
-                        v = sum(smooth[i]) / len(smooth[i])
-                    setattr(
-                        j.data,
-                        name,
-                        to_vjoy(int(round(v)), deadzone_255=self.deadzone_255, invert=self.invert[i]),
-                    )
-
-                # Buttons (hold)
-                btn_s1 = 1 if s1_on else 0
-                btn_s2 = 1 if s2_on else 0
-                # Default to buttons 1 and 2 for compatibility
-                j.set_button(1, btn_s1)
-                j.set_button(2, btn_s2)
-
-                j.update()
+                # Inputs (smoothed pots), then one call of the compiled mix
+                if self.smooth_n > 0:
+                    inputs = []
+                    for i in range(8):
+                        smooth[i].append(pots[i])
+                        inputs.append(sum(smooth[i]) / len(smooth[i]))
+                else:
+                    inputs = pots
+
+                # Axes and buttons (hold); key taps on edges, only when the source sends switches.
+                # A mix that fails on this frame (eg. p0 / p1 with p1 = 0) keeps the last good output.
+                try:
+                    values = mixer.run(inputs, (s1_on, s2_on))
+                except Exception as e:
+                    values = None
+                    self.mix_errors += 1
+                    if now - last_mix_warn > 2.0:
+                        self.log(f"[WARN] Erro no mixer ({self.mix_errors} no total), mantendo a última saída: "
+                                 f"{type(e).__name__}: {e}")
+                        last_mix_warn = now
+                if values is not None:
+                    mixer.apply(j, values, self._tap_key if has_switches else None)
+                    j.update()
                 last_ok = now
-
-                # Edge-triggered key taps
-                if has_switches and (last_s1_on is None or s1_on != last_s1_on):
-                    self._tap_key(self.sw1_key)
-                    last_s1_on = s1_on
-
-                if has_switches and (last_s2_on is None or s2_on != last_s2_on):
-                    self._tap_key(self.sw2_key)
-                    last_s2_on = s2_on
+                self.frames += 1
+                self.last_frame = {"pots": pots, "s1": s1_on, "s2": s2_on}
+                if now - fps_t0 >= 1.0:
+                    self.fps = (self.frames - fps_n) / (now - fps_t0)
+                    fps_t0, fps_n = now, self.frames
 
                 # Emit live data for GUI (throttled)
                 if self.on_data is not None and (now - last_emit) >= emit_interval:
@@ -256,11 +425,7 @@ class BridgeWorker:
         finally:
             # Neutralize and cleanup
             try:
-                for name, _ in self.AXIS_ORDER:
-                    setattr(j.data, name, to_vjoy(128, self.deadzone_255, False))
-                j.set_button(1, 0)
-                j.set_button(2, 0)
-                j.update()
+                neutralize()
             except Exception:
                 pass
             try:
@@ -269,3 +434,394 @@ class BridgeWorker:
                 pass
             self._running.clear()
             self.log("Conexão finalizada.")
+
+
+# =============================================================================
+# Multi-device fan-in: several serial boxes -> one or more vJoy devices
+# =============================================================================
+SOURCES = [f"p{i}" for i in range(8)] + ["s1", "s2"]
+MERGE_MODES = ("last", "max", "min", "avg")
+
+
+class InputDevice:
+    """
+    One serial input box: owns its port, a byte buffer and the parser state.
+    poll() consumes whatever is available and returns only the newest payload.
+    """
+
+    def __init__(self, name: str, port: str, baud: int = 115200, input_mode: str = "csv",
+                 smooth_n: int = 0, on_threshold: int = 10) -> None:
+        if input_mode not in INPUT_MODES:
+            raise ValueError(f"input_mode inválido: {input_mode!r} (use {INPUT_MODES})")
+        self.name = name
+        self.port = port
+        self.baud = baud
+        self.input_mode = input_mode
+        self.smooth_n = max(0, smooth_n)
+        self.on_threshold = on_threshold
+        self.ser = None
+        self._buf = bytearray()
+        self._crsf = crsf.CrsfParser() if input_mode == "crsf" else None
+        self._smooth = [deque(maxlen=max(1, self.smooth_n)) for _ in range(8)]
+        self.values = [128.0] * 8 + [0, 0]   # p0..p7, s1, s2 (same order as SOURCES)
+        self.has_switches = False
+        self.last_ok = 0.0
+        self.stale = True
+        self.frames = 0
+        self.bad = 0
+
+    def open(self) -> None:
+        # timeout=0: reads never block, the multiplexer decides when to read
+        self.ser = serial.Serial(self.port, self.baud, timeout=0)
+        self._buf.clear()
+
+    def close(self) -> None:
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+            self.ser = None
+
+    def fileno(self) -> int:
+        return self.ser.fileno()
+
+    def poll(self, now: float) -> bool:
+        """read the pending bytes; True when a new valid frame updated self.values"""
+        data = self.ser.read(self.ser.in_waiting or 0)
+        if not data:
+            return False
+        if self._crsf is not None:
+            channels = self._crsf.feed_rc(data)
+            parsed = crsf.channels_to_payload(channels) if channels is not None else None
+        else:
+            self._buf += data
+            parsed = None
+            end = self._buf.rfind(b"\n")
+            if end >= 0:
+                # newest complete valid line wins, older ones are stale anyway
+                for line in reversed(bytes(self._buf[:end]).split(b"\n")):
+                    line = line.decode(errors="ignore").strip()
+                    if not line:
+                        continue
+                    parsed = parse_serial_payload(line)
+                    if parsed is not None:
+                        break
+                    self.bad += 1
+                del self._buf[:end + 1]
+            elif len(self._buf) > 4096:
+                self._buf.clear()   # no newline at all: garbage or wrong baud
+        if parsed is None:
+            return False
+        pots, s1_raw, s2_raw, has_switches = parsed
+        for i in range(8):
+            v = pots[i]
+            if self.smooth_n > 0:
+                self._smooth[i].append(v)
+                v = sum(self._smooth[i]) / len(self._smooth[i])
+            self.values[i] = v
+        self.values[8] = 1 if s1_raw >= self.on_threshold else 0
+        self.values[9] = 1 if s2_raw >= self.on_threshold else 0
+        self.has_switches = has_switches
+        self.frames += 1
+        self.last_ok = now
+        self.stale = False
+        return True
+
+    def neutralize(self) -> None:
+        self.values[:] = [128.0] * 8 + [0, 0]
+        self.stale = True
+
+
+def default_routes(devices: Sequence[Dict[str, Any]]) -> Sequence[Dict[str, Any]]:
+    """same mapping as BridgeWorker for every device: p0..p7 -> axes, s1/s2 -> buttons 1/2"""
+    routes = []
+    for d in devices:
+        vj = d.get("vjoy_device_id", 1)
+        for name, src_idx in BridgeWorker.AXIS_ORDER:
+            routes.append({"dev": d["name"], "src": f"p{src_idx}", "vjoy": vj, "out": name})
+        routes.append({"dev": d["name"], "src": "s1", "vjoy": vj, "out": "btn1"})
+        routes.append({"dev": d["name"], "src": "s2", "vjoy": vj, "out": "btn2"})
+    return routes
+
+
+class MultiBridgeWorker:
+    """
+    One thread serving several serial inputs (sticks, throttle quadrant, switch
+    panel...) and several vJoy devices.
+
+    devices: [{"name", "port", "baud", "input_mode", "smooth_n", "on_threshold"}]
+    routes:  [{"dev", "src": p0..p7|s1|s2, "vjoy": id, "out": wAxisX..|btnN|key:<tecla>,
+               "invert": bool, "merge": last|max|min|avg}]
+
+    Routes with the same (vjoy, out) are merged with their "merge" mode (the
+    first route decides). Inputs are read by a single selector loop (a polling
+    loop over in_waiting where serial handles cannot be selected, eg. Windows);
+    all frames that arrived in one pass are applied first and each vJoy device
+    is updated once per pass.
+
+    Only HOT_KEYS can change while running (reconfigure()); devices and routes
+    are compiled into the routing table and need a new worker.
+    """
+
+    HOT_KEYS = ("deadzone_255",)
+
+    def __init__(
+        self,
+        devices: Sequence[Dict[str, Any]],
+        routes: Optional[Sequence[Dict[str, Any]]] = None,
+        deadzone_255: int = 1,
+        timeout_s: float = 1.0,
+        log: Optional[Callable[[str], None]] = None,
+        on_data: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.devices = [
+            InputDevice(d["name"], d["port"], d.get("baud", 420000 if d.get("input_mode") == "crsf" else 115200),
+                        d.get("input_mode", "csv"), d.get("smooth_n", 0), d.get("on_threshold", 10))
+            for d in devices
+        ]
+        by_name = {d.name: i for i, d in enumerate(self.devices)}
+        if len(by_name) != len(self.devices):
+            raise ValueError("nomes de dispositivo repetidos")
+        self.deadzone_255 = deadzone_255
+        self.timeout_s = timeout_s
+        self.log = log or (lambda msg: None)
+        self.on_data = on_data
+
+        # compile the routing table: per device a flat list of (source index, output slot, invert)
+        routes = list(routes) if routes else list(default_routes(devices))
+        self.outputs = []            # slot -> (vjoy id, out name, merge mode)
+        slot_of = {}
+        self._dev_routes = [[] for _ in self.devices]
+        self._keys = []              # (device index, source index, key name)
+        for r in routes:
+            if r["dev"] not in by_name:
+                raise ValueError(f"rota para dispositivo desconhecido: {r['dev']!r}")
+            if r["src"] not in SOURCES:
+                raise ValueError(f"fonte inválida: {r['src']!r} (use {SOURCES})")
+            di = by_name[r["dev"]]
+            si = SOURCES.index(r["src"])
+            out = r["out"]
+            if out.startswith("key:"):
+                if si < 8:
+                    raise ValueError(f"key: só com fonte s1/s2 (rota {r['dev']!r} {r['src']!r} -> {out!r})")
+                self._keys.append((di, si, out[4:]))
+                continue
+            if out not in AXIS_NAMES and not (out.startswith("btn") and out[3:].isdigit()):
+                raise ValueError(f"saída inválida: {out!r}")
+            merge = r.get("merge", "last")
+            if merge not in MERGE_MODES:
+                raise ValueError(f"merge inválido: {merge!r} (use {MERGE_MODES})")
+            key = (r.get("vjoy", 1), out)
+            if key not in slot_of:
+                slot_of[key] = len(self.outputs)
+                self.outputs.append((key[0], out, merge))
+            self._dev_routes[di].append((si, slot_of[key], bool(r.get("invert", False))))
+        # contributions[slot][device index] = value (raw 0..255 or 0/1), merged per pass
+        self._contrib: list = [dict() for _ in self.outputs]
+        self._last_writer = [None] * len(self.outputs)
+        self._vjoy_slots: Dict[int, list] = {}
+        for slot, (vj, _, _) in enumerate(self.outputs):
+            self._vjoy_slots.setdefault(vj, []).append(slot)
+
+        self._thread: Optional[Thread] = None
+        self._stop = Event()
+        self._running = Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._running.is_set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="MultiBridgeWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2.5)
+
+    def reconfigure(self, **changes: Any) -> None:
+        unknown = sorted(set(changes) - set(self.HOT_KEYS))
+        if unknown:
+            raise ValueError(f"não ajustável com a ponte rodando: {unknown}")
+        if "deadzone_255" in changes:
+            self.deadzone_255 = int(changes["deadzone_255"])   # read once per _flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {d.name: {"frames": d.frames, "bad": d.bad, "stale": d.stale} for d in self.devices}
+
+    # Internal
+    def _apply(self, di: int) -> set:
+        """write the routed values of device di into the contributions, returns touched vJoy ids"""
+        values = self.devices[di].values
+        touched = set()
+        for si, slot, inv in self._dev_routes[di]:
+            v = values[si]
+            if inv:
+                v = 255 - v if si < 8 else 1 - v
+            self._contrib[slot][di] = v
+            self._last_writer[slot] = di
+            touched.add(self.outputs[slot][0])
+        return touched
+
+    def _release(self, di: int) -> set:
+        """timed-out device di stops contributing, so max/min/avg merge only the live ones"""
+        touched = set()
+        for _, slot, _ in self._dev_routes[di]:
+            c = self._contrib[slot]
+            c.pop(di, None)
+            if self._last_writer[slot] == di:
+                self._last_writer[slot] = next(iter(c), None)
+            touched.add(self.outputs[slot][0])
+        return touched
+
+    def _merged(self, slot: int):
+        c = self._contrib[slot]
+        mode = self.outputs[slot][2]
+        if not c:
+            # every contributor timed out: neutral (axis centred, button released)
+            return 0 if self.outputs[slot][1].startswith("btn") else 128
+        if mode == "last":
+            return c[self._last_writer[slot]]
+        if mode == "max":
+            return max(c.values())
+        if mode == "min":
+            return min(c.values())
+        return sum(c.values()) / len(c)
+
+    def _flush(self, joys: Dict[int, Any], vj: int) -> None:
+        j = joys[vj]
+        buttons = j.data.lButtons
+        for slot in self._vjoy_slots[vj]:
+            v = self._merged(slot)
+            out = self.outputs[slot][1]
+            if out.startswith("btn"):
+                bit = 1 << (int(out[3:]) - 1)
+                buttons = buttons | bit if v else buttons & ~bit
+            else:
+                setattr(j.data, out, to_vjoy(int(round(v)), deadzone_255=self.deadzone_255))
+        j.data.lButtons = buttons
+        j.update()
+
+    def _tap_key(self, key_name: str) -> None:
+        if keyboard is None:
+            self.log(f"[WARN] Módulo 'keyboard' ausente; ignorando tecla '{key_name}'.")
+            return
+        try:
+            keyboard.press_and_release(key_name)
+        except Exception as e:
+            self.log(f"[WARN] Falha ao enviar tecla '{key_name}': {e}")
+
+    def _run(self) -> None:
+        load_output_libs()
+        if pyvjoy is None:
+            self.log("[ERRO] pyvjoy não disponível. Instale o driver vJoy e a lib pyvjoy.")
+            return
+        if serial is None:
+            self.log("[ERRO] pyserial não disponível.")
+            return
+
+        joys: Dict[int, Any] = {}
+        try:
+            for vj in self._vjoy_slots:
+                joys[vj] = pyvjoy.VJoyDevice(vj)
+        except Exception as e:
+            self.log(f"[ERRO] Não foi possível abrir vJoy device {vj}: {e}")
+            return
+
+        opened = []
+        for d in self.devices:
+            try:
+                d.open()
+                opened.append(d)
+                self.log(f"Conectado em {d.port} @ {d.baud} ({d.input_mode}) como '{d.name}'.")
+            except Exception as e:
+                self.log(f"[ERRO] Falha ao abrir porta {d.port} ('{d.name}'): {e}")
+        if not opened:
+            return
+
+        sel = None
+        if not sys.platform.startswith("win"):
+            try:
+                sel = selectors.DefaultSelector()
+                for di, d in enumerate(self.devices):
+                    if d.ser is not None:
+                        sel.register(d.fileno(), selectors.EVENT_READ, di)
+            except Exception:
+                sel = None
+
+        self._running.set()
+        self.log(f"{len(opened)} dispositivo(s), {len(self.outputs)} saída(s) em {len(joys)} vJoy(s), "
+                 f"{'selector' if sel else 'polling'}.")
+        last_sw = [[None, None] for _ in self.devices]
+        last_warn = [0.0] * len(self.devices)
+        last_emit = 0.0
+        emit_interval = 0.03  # ~33 Hz UI updates
+        live = [di for di, d in enumerate(self.devices) if d.ser is not None]
+
+        try:
+            while not self._stop.is_set():
+                if sel is not None:
+                    ready = [key.data for key, _ in sel.select(timeout=0.05)]
+                else:
+                    ready = live
+                now = time.time()
+                dirty = set()
+                for di in ready:
+                    d = self.devices[di]
+                    if d.poll(now):
+                        dirty |= self._apply(di)
+                        if d.has_switches:
+                            for k in (0, 1):
+                                if last_sw[di][k] is None or d.values[8 + k] != last_sw[di][k]:
+                                    for kdi, ksi, key in self._keys:
+                                        if kdi == di and ksi == 8 + k:
+                                            self._tap_key(key)
+                                last_sw[di][k] = d.values[8 + k]
+                for di in live:
+                    d = self.devices[di]
+                    if not d.stale and now - d.last_ok > self.timeout_s:
+                        d.neutralize()
+                        dirty |= self._release(di)
+                        if now - last_warn[di] > 2.0:
+                            self.log(f"[WARN] Sem dados de '{d.name}' ({d.port}) (timeout).")
+                            last_warn[di] = now
+                # one vJoy update per device per pass, whatever the number of frames
+                for vj in dirty:
+                    self._flush(joys, vj)
+                if sel is None and not dirty:
+                    time.sleep(0.001)
+                if self.on_data is not None and dirty and (now - last_emit) >= emit_interval:
+                    first = self.devices[live[0]]
+                    try:
+                        self.on_data({
+                            "pots": [int(round(v)) for v in first.values[:8]],
+                            "s1": first.values[8],
+                            "s2": first.values[9],
+                            "devices": self.stats(),
+                        })
+                    except Exception:
+                        pass
+                    last_emit = now
+        except Exception as e:
+            self.log(f"[ERRO] Execução interrompida: {e}")
+        finally:
+            try:
+                for d in self.devices:
+                    d.neutralize()
+                for di in live:
+                    self._apply(di)
+                for vj in joys:
+                    self._flush(joys, vj)
+            except Exception:
+                pass
+            if sel is not None:
+                sel.close()
+            for d in self.devices:
+                d.close()
+            self._running.clear()
+            self.log("Conexão finalizada.")
@@ -0,0 +1,345 @@
+"""
+CRSF (TBS Crossfire / ELRS) codec for the PC side.
+
+Python mirror of firmware/ESP32_FC_v2/crsf_rx.h and NANO_TX_v2/crsf_tx.h:
+
+    Frame: [SYNC] [LEN] [TYPE] [PAYLOAD] [CRC8]
+      SYNC = 0xC8 (destination "Flight Controller")
+      LEN  = TYPE + PAYLOAD + CRC
+      CRC8 = poly 0xD5 over TYPE + PAYLOAD
+
+RC_CHANNELS_PACKED (0x16) carries 16 channels x 11 bits (LSB first) in 22 bytes,
+26 bytes on the wire. Running ``python crsf.py`` benchmarks the decoder against
+the 500 Hz ELRS packet rate.
+"""
+
+import time
+from typing import List, Optional, Sequence, Tuple
+
+_np = False     # numpy is imported on first batch call: the live bridge path never needs it
+
+
+def _numpy():
+    global _np, _CRC8_NP
+    if _np is False:
+        try:
+            import numpy
+            _np = numpy
+            _CRC8_NP = numpy.array(CRC8_TABLE, dtype=numpy.uint8)
+        except Exception:  # pragma: no cover
+            _np = None
+    return _np
+
+
+CRSF_SYNC_BYTE_FC = 0xC8
+CRSF_FRAMETYPE_RC_CHANNELS_PACKED = 0x16
+
+CRSF_NUM_CHANNELS = 16
+CRSF_CHANNEL_VALUE_MIN = 172    # 988 us
+CRSF_CHANNEL_VALUE_MID = 992    # 1500 us
+CRSF_CHANNEL_VALUE_MAX = 1811   # 2012 us
+
+CRSF_PAYLOAD_SIZE_RC = 22
+CRSF_FRAME_SIZE = 26            # SYNC + LEN + TYPE + 22 + CRC
+CRSF_BAUDRATE = 420000
+
+CRSF_LEN_MIN = 2
+CRSF_LEN_MAX = 62
+
+
+def _make_crc8_table(poly: int) -> Tuple[int, ...]:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return tuple(table)
+
+
+CRC8_TABLE = _make_crc8_table(0xD5)
+_CRC8_NP = None
+
+# Bit position of each 11-bit channel inside the 22-byte payload
+_CH_BYTE = [(11 * i) // 8 for i in range(CRSF_NUM_CHANNELS)]
+_CH_SHIFT = [(11 * i) % 8 for i in range(CRSF_NUM_CHANNELS)]
+
+
+def crc8(data: bytes, crc: int = 0) -> int:
+    """CRC8 poly 0xD5 (table-driven), same result as crsf_crc8() in the firmware."""
+    t = CRC8_TABLE
+    for b in data:
+        crc = t[crc ^ b]
+    return crc
+
+
+# =============================================================================
+# Channel helpers (same integer math as crsf_rx.h)
+# =============================================================================
+def _clamp_ch(ch: int) -> int:
+    if ch < CRSF_CHANNEL_VALUE_MIN:
+        return CRSF_CHANNEL_VALUE_MIN
+    if ch > CRSF_CHANNEL_VALUE_MAX:
+        return CRSF_CHANNEL_VALUE_MAX
+    return ch
+
+
+def channel_to_us(ch: int) -> int:
+    """CRSF (172..1811) -> us (988..2012)."""
+    return 988 + ((_clamp_ch(ch) - CRSF_CHANNEL_VALUE_MIN) * 1024 + 819) // 1639
+
+
+def channel_to_byte(ch: int) -> int:
+    """CRSF (172..1811) -> 0..255, the scale used by the CSV bridge."""
+    return ((_clamp_ch(ch) - CRSF_CHANNEL_VALUE_MIN) * 255 + 819) // 1639
+
+
+def byte_to_channel(val_255: int) -> int:
+    """0..255 -> CRSF (172..1811), inverse of channel_to_byte()."""
+    val_255 = max(0, min(255, val_255))
+    return CRSF_CHANNEL_VALUE_MIN + (val_255 * 1639 + 127) // 255
+
+
+def ch8_to_switches(ch: int) -> int:
+    """CH8 level (16 steps) -> bitmask: bit0=SW1, bit1=SW2, bit2=SW3, bit3=SW4."""
+    level = ((_clamp_ch(ch) - CRSF_CHANNEL_VALUE_MIN) * 15 + 819) // 1639
+    return min(level, 15)
+
+
+# =============================================================================
+# Packing / unpacking
+# =============================================================================
+def unpack_channels(payload: bytes) -> List[int]:
+    """22-byte RC payload -> 16 channel values (11 bits each)."""
+    v = int.from_bytes(payload[:CRSF_PAYLOAD_SIZE_RC], "little")
+    return [(v >> (11 * i)) & 0x7FF for i in range(CRSF_NUM_CHANNELS)]
+
+
+def pack_channels(channels: Sequence[int]) -> bytes:
+    """16 channel values -> 22-byte RC payload. Missing channels default to MID."""
+    v = 0
+    for i in range(CRSF_NUM_CHANNELS):
+        ch = channels[i] if i < len(channels) else CRSF_CHANNEL_VALUE_MID
+        v |= (int(ch) & 0x7FF) << (11 * i)
+    return v.to_bytes(CRSF_PAYLOAD_SIZE_RC, "little")
+
+
+def build_frame(frame_type: int, payload: bytes, sync: int = CRSF_SYNC_BYTE_FC) -> bytes:
+    body = bytes([frame_type]) + bytes(payload)
+    return bytes([sync, len(body) + 1]) + body + bytes([crc8(body)])
+
+
+def build_rc_frame(channels: Sequence[int], sync: int = CRSF_SYNC_BYTE_FC) -> bytes:
+    """Encode a complete 26-byte RC_CHANNELS_PACKED frame."""
+    return build_frame(CRSF_FRAMETYPE_RC_CHANNELS_PACKED, pack_channels(channels), sync)
+
+
+def unpack_channels_batch(payloads):
+    """
+    Unpack many RC payloads at once.
+
+    ``payloads`` is an (N, 22) uint8 array (or anything np.asarray accepts);
+    returns an (N, 16) uint16 array. Falls back to lists without NumPy.
+    """
+    np = _numpy()
+    if np is None:
+        return [unpack_channels(bytes(p)) for p in payloads]
+    p = np.asarray(payloads, dtype=np.uint8).reshape(-1, CRSF_PAYLOAD_SIZE_RC)
+    # One zero column of padding so every channel can read 3 bytes
+    p32 = np.zeros((p.shape[0], CRSF_PAYLOAD_SIZE_RC + 1), dtype=np.uint32)
+    p32[:, :CRSF_PAYLOAD_SIZE_RC] = p
+    idx = np.array(_CH_BYTE)
+    v = p32[:, idx] | (p32[:, idx + 1] << 8) | (p32[:, idx + 2] << 16)
+    v >>= np.array(_CH_SHIFT, dtype=np.uint32)
+    v &= 0x7FF
+    return v.astype(np.uint16)
+
+
+def pack_channels_batch(channels):
+    """(N, 16) channel array -> (N, 22) uint8 payload array."""
+    np = _numpy()
+    if np is None:
+        return [pack_channels(c) for c in channels]
+    c = np.asarray(channels, dtype=np.uint32).reshape(-1, CRSF_NUM_CHANNELS) & 0x7FF
+    out = np.zeros((c.shape[0], CRSF_PAYLOAD_SIZE_RC + 1), dtype=np.uint32)
+    for i in range(CRSF_NUM_CHANNELS):
+        k, s = _CH_BYTE[i], _CH_SHIFT[i]
+        v = c[:, i] << s
+        out[:, k] |= v & 0xFF
+        out[:, k + 1] |= (v >> 8) & 0xFF
+        out[:, k + 2] |= (v >> 16) & 0xFF
+    return out[:, :CRSF_PAYLOAD_SIZE_RC].astype(np.uint8)
+
+
+def crc8_batch(bodies):
+    """CRC8 of every row of an (N, L) uint8 array (L = TYPE + PAYLOAD)."""
+    np = _numpy()
+    if np is None:
+        return [crc8(bytes(b)) for b in bodies]
+    b = np.asarray(bodies, dtype=np.uint8)
+    crc = np.zeros(b.shape[0], dtype=np.uint8)
+    for j in range(b.shape[1]):
+        crc = _CRC8_NP[crc ^ b[:, j]]
+    return crc
+
+
+def decode_rc_frames(frames, sync: int = CRSF_SYNC_BYTE_FC):
+    """
+    Validate and decode a block of back-to-back 26-byte RC frames.
+
+    ``frames`` is an (N, 26) uint8 array (e.g. from a capture). Returns
+    ``(channels, ok)``: (N, 16) channels and a bool mask of frames whose sync,
+    length, type and CRC are all valid.
+    """
+    np = _numpy()
+    if np is None:
+        raise RuntimeError("decode_rc_frames() requires numpy")
+    f = np.asarray(frames, dtype=np.uint8).reshape(-1, CRSF_FRAME_SIZE)
+    ok = (
+        (f[:, 0] == sync)
+        & (f[:, 1] == CRSF_FRAME_SIZE - 2)
+        & (f[:, 2] == CRSF_FRAMETYPE_RC_CHANNELS_PACKED)
+        & (crc8_batch(f[:, 2:CRSF_FRAME_SIZE - 1]) == f[:, CRSF_FRAME_SIZE - 1])
+    )
+    return unpack_channels_batch(f[:, 3:3 + CRSF_PAYLOAD_SIZE_RC]), ok
+
+
+# =============================================================================
+# Stream parser
+# =============================================================================
+class CrsfParser:
+    """
+    Incremental CRSF frame parser for a serial byte stream.
+
+    Unlike the byte-by-byte state machine in crsf_rx.h, ``feed()`` takes whole
+    chunks (whatever ``Serial.read()`` returned) and uses ``bytearray.find`` to
+    jump between sync bytes, so the per-byte cost stays in C.
+    """
+
+    def __init__(self, sync: int = CRSF_SYNC_BYTE_FC) -> None:
+        self.sync = sync
+        self._sync_b = bytes([sync])
+        self._buf = bytearray()
+        self.good_frames = 0
+        self.bad_frames = 0
+        self.last_channels: Optional[List[int]] = None
+
+    def reset(self) -> None:
+        self._buf.clear()
+
+    def feed(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """Append ``data`` and return every complete, CRC-valid ``(type, payload)``."""
+        buf = self._buf
+        buf += data
+        n = len(buf)
+        i = 0
+        frames: List[Tuple[int, bytes]] = []
+        t = CRC8_TABLE
+        while n - i >= 4:
+            if buf[i] != self.sync:
+                j = buf.find(self._sync_b, i)
+                if j < 0:
+                    i = n
+                    break
+                i = j
+                continue
+            ln = buf[i + 1]
+            if ln < CRSF_LEN_MIN or ln > CRSF_LEN_MAX:
+                self.bad_frames += 1
+                i += 1
+                continue
+            end = i + 2 + ln
+            if end > n:
+                break
+            crc = 0
+            for k in range(i + 2, end - 1):
+                crc = t[crc ^ buf[k]]
+            if crc != buf[end - 1]:
+                # Resync on the next byte: a real sync may be inside this "frame"
+                self.bad_frames += 1
+                i += 1
+                continue
+            self.good_frames += 1
+            frames.append((buf[i + 2], bytes(buf[i + 3:end - 1])))
+            i = end
+        del buf[:i]
+        return frames
+
+    def feed_rc(self, data: bytes) -> Optional[List[int]]:
+        """
+        Feed bytes and return the channels of the newest RC frame in them.
+
+        Older RC frames in the same chunk are superseded and not unpacked, so a
+        slow consumer never falls behind the link rate. Returns None if no new
+        RC frame completed.
+        """
+        latest = None
+        for ftype, payload in self.feed(data):
+            if ftype == CRSF_FRAMETYPE_RC_CHANNELS_PACKED and len(payload) == CRSF_PAYLOAD_SIZE_RC:
+                latest = payload
+        if latest is None:
+            return None
+        self.last_channels = unpack_channels(latest)
+        return self.last_channels
+
+
+def channels_to_payload(channels: Sequence[int]):
+    """
+    Map CRSF channels to the ``parse_serial_payload`` tuple used by BridgeWorker.
+
+    CH1..CH8 become the 8 axes (0..255). SW1/SW2 come from the CH8 bitmask
+    packed by NANO_TX_v2 and are reported as 0/255 so ``on_threshold`` applies.
+    """
+    pots = [channel_to_byte(c) for c in channels[:8]]
+    sw = ch8_to_switches(channels[7])
+    s1_raw = 255 if sw & 0x01 else 0
+    s2_raw = 255 if sw & 0x02 else 0
+    return pots, s1_raw, s2_raw, True
+
+
+# =============================================================================
+# Benchmark
+# =============================================================================
+def _benchmark(n_frames: int = 100000, chunk: int = 64) -> None:
+    import random
+
+    rng = random.Random(1)
+    frames = [
+        build_rc_frame([rng.randint(CRSF_CHANNEL_VALUE_MIN, CRSF_CHANNEL_VALUE_MAX) for _ in range(16)])
+        for _ in range(n_frames)
+    ]
+    stream = b"".join(frames)
+    link_hz = 500
+
+    parser = CrsfParser()
+    t0 = time.perf_counter()
+    got = 0
+    for i in range(0, len(stream), chunk):
+        got += len(parser.feed(stream[i:i + chunk]))
+    dt = time.perf_counter() - t0
+    print(f"stream parse   : {got} frames in {dt:.3f} s -> {got / dt:,.0f} frames/s "
+          f"({got / dt / link_hz:.0f}x {link_hz} Hz)")
+
+    t0 = time.perf_counter()
+    for f in frames:
+        unpack_channels(f[3:25])
+    dt = time.perf_counter() - t0
+    print(f"unpack (python): {n_frames / dt:,.0f} frames/s")
+
+    np = _numpy()
+    if np is not None:
+        arr = np.frombuffer(stream, dtype=np.uint8).reshape(-1, CRSF_FRAME_SIZE)
+        t0 = time.perf_counter()
+        ch, ok = decode_rc_frames(arr)
+        dt = time.perf_counter() - t0
+        print(f"decode (numpy) : {n_frames / dt:,.0f} frames/s, {int(ok.sum())} valid")
+        t0 = time.perf_counter()
+        pack_channels_batch(ch)
+        dt = time.perf_counter() - t0
+        print(f"pack (numpy)   : {n_frames / dt:,.0f} frames/s")
+    else:
+        print("numpy ausente: benchmark vetorizado ignorado.")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -1,8 +1,15 @@
-import json
 import os
 import sys
 from typing import Dict, Any
 
+import startup  # first, so the milestones below cover the GUI import
+
+if __name__ == "__main__" and "--headless" in sys.argv:
+    # no window: the service (and the exe with --headless) never imports Tk
+    import service
+
+    sys.exit(service.main([a for a in sys.argv[1:] if a != "--headless"]))
+
 # Prefer the free community fork first, then fall back to PySimpleGUI
 try:
     import FreeSimpleGUI as sg  # type: ignore
@@ -26,7 +33,12 @@ try:
 except Exception:  # pragma: no cover
     ctypes = None  # type: ignore
 
-from bridge_core import BridgeWorker, list_serial_ports
+startup.mark("gui")
+
+from bridge_core import INPUT_MODES, BridgeWorker, MultiBridgeWorker, list_serial_ports
+from settings import APP_NAME, get_config_path, load_config, save_config
+
+startup.mark("bridge_core")
 
 
 def resource_path(name: str) -> str:
@@ -34,10 +46,6 @@ def resource_path(name: str) -> str:
     return os.path.join(base, name)
 
 
-APP_NAME = "OpenRC-AeroLink"
-CFG_FILE = "config.json"
-
-
 def _fatal_popup(msg: str) -> None:
     try:
         if sys.platform.startswith("win") and ctypes is not None:
@@ -50,44 +58,7 @@ def _fatal_popup(msg: str) -> None:
     sys.exit(1)
 
 
-def get_config_path() -> str:
-    base = os.getenv("APPDATA") or os.path.expanduser("~")
-    app_dir = os.path.join(base, APP_NAME)
-    os.makedirs(app_dir, exist_ok=True)
-    return os.path.join(app_dir, CFG_FILE)
-
-
-def load_config() -> Dict[str, Any]:
-    path = get_config_path()
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {
-        "com_port": "",
-        "baud": 115200,
-        "vjoy_device_id": 1,
-        "sw1_key": "g",
-        "sw2_key": "r",
-        "on_threshold": 10,
-        "deadzone_255": 1,
-        "smooth_n": 0,
-        "invert": [False] * 8,
-    }
-
-
-def save_config(cfg: Dict[str, Any]) -> None:
-    path = get_config_path()
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=2)
-    except Exception:
-        pass
-
-
-def run_gui() -> None:
+def run_gui(startup_exit: bool = False) -> None:
     # Use modern theme API if available; fall back for old PySimpleGUI
     try:
         if hasattr(sg, "theme"):
@@ -128,7 +99,8 @@ def run_gui() -> None:
 
     layout = [
         [sg.Text("Porta COM:"), sg.Combo(ports, key="-PORT-", default_value=cfg.get("com_port", ""), size=(20, 1), readonly=True),
-         sg.Button("Atualizar", key="-REFRESH-")],
+         sg.Button("Atualizar", key="-REFRESH-"),
+         sg.Text("Entrada:"), sg.Combo(list(INPUT_MODES), key="-MODE-", default_value=cfg.get("input_mode", "csv"), size=(6, 1), readonly=True)],
         [sg.Frame("Switches", [[
             sg.Checkbox("S1", key="-S1-LED-", disabled=True),
             sg.Checkbox("S2", key="-S2-LED-", disabled=True),
@@ -150,7 +122,7 @@ def run_gui() -> None:
         icon=resource_path("icon.ico"),
     )
 
-    worker: "BridgeWorker | None"
+    worker: "BridgeWorker | MultiBridgeWorker | None"
     try:
         # Python <3.10 compatibility fallback
         worker = None  # type: ignore
@@ -173,9 +145,27 @@ def run_gui() -> None:
         window["-START-"].update(disabled=running)
         window["-STOP-"].update(disabled=not running)
         window["-PORT-"].update(disabled=running)
+        window["-MODE-"].update(disabled=running)
         window["-SW1-"].update(disabled=running)
         window["-SW2-"].update(disabled=running)
 
+    startup.mark("janela")
+    try:
+        import pyi_splash  # type: ignore  # only bundled by the splash build variant
+        pyi_splash.close()
+    except Exception:
+        pass
+    log(f"Inicialização: {startup.summary()}")
+    if startup_exit:
+        # build_exe.ps1 -Measure: record the breakdown and quit
+        try:
+            with open(os.path.join(os.path.dirname(get_config_path()), "startup.log"), "a", encoding="utf-8") as f:
+                f.write(f"{'frozen' if getattr(sys, 'frozen', False) else 'python'}: {startup.summary()}\n")
+        except Exception:
+            pass
+        window.close()
+        return
+
     while True:
         event, values = window.read(timeout=200)
         if event in (sg.WIN_CLOSED, "-EXIT-"):
@@ -189,12 +179,37 @@ def run_gui() -> None:
         if event == "-SAVE-":
             cfg.update({
                 "com_port": values.get("-PORT-", ""),
+                "input_mode": values.get("-MODE-", "csv"),
                 "sw1_key": values.get("-SW1-", "g"),
                 "sw2_key": values.get("-SW2-", "r"),
             })
             save_config(cfg)
             log("Configurações salvas.")
 
+        if event == "-START-" and cfg.get("devices"):
+            # Multi-device mode: ports and routes come from config.json ("devices"/"routes")
+            def post_data(payload: Dict[str, Any]) -> None:
+                try:
+                    window.write_event_value("-DATA-", payload)
+                except Exception:
+                    pass
+
+            try:
+                worker = MultiBridgeWorker(
+                    devices=cfg["devices"],
+                    routes=cfg.get("routes"),
+                    deadzone_255=cfg.get("deadzone_255", 1),
+                    log=log,
+                    on_data=post_data,
+                )
+            except (KeyError, ValueError) as e:
+                log(f"[ERRO] Configuração de dispositivos inválida: {e}")
+                continue
+            set_running_state(True)
+            worker.start()
+            log("Execução iniciada (multi-dispositivo).")
+            continue
+
         if event == "-START-":
             com = values.get("-PORT-", "")
             if not com:
@@ -202,9 +217,11 @@ def run_gui() -> None:
                 continue
             sw1 = (values.get("-SW1-", "g") or "g").strip()
             sw2 = (values.get("-SW2-", "r") or "r").strip()
+            mode = values.get("-MODE-", "csv") or "csv"
 
             cfg.update({
                 "com_port": com,
+                "input_mode": mode,
                 "sw1_key": sw1,
                 "sw2_key": sw2,
             })
@@ -217,19 +234,25 @@ def run_gui() -> None:
                 except Exception:
                     pass
 
-            worker = BridgeWorker(
-                com_port=com,
-                baud=cfg.get("baud", 115200),
-                vjoy_device_id=cfg.get("vjoy_device_id", 1),
-                sw1_key=sw1,
-                sw2_key=sw2,
-                on_threshold=cfg.get("on_threshold", 10),
-                deadzone_255=cfg.get("deadzone_255", 1),
-                smooth_n=cfg.get("smooth_n", 0),
-                invert=cfg.get("invert", [False] * 8),
-                log=log,
-                on_data=post_data,
-            )
+            try:
+                worker = BridgeWorker(
+                    com_port=com,
+                    baud=cfg.get("crsf_baud", 420000) if mode == "crsf" else cfg.get("baud", 115200),
+                    vjoy_device_id=cfg.get("vjoy_device_id", 1),
+                    sw1_key=sw1,
+                    sw2_key=sw2,
+                    on_threshold=cfg.get("on_threshold", 10),
+                    deadzone_255=cfg.get("deadzone_255", 1),
+                    smooth_n=cfg.get("smooth_n", 0),
+                    invert=cfg.get("invert", [False] * 8),
+                    log=log,
+                    on_data=post_data,
+                    input_mode=mode,
+                    mixer=cfg.get("mixer"),
+                )
+            except ValueError as e:
+                log(f"[ERRO] Mixer inválido no config.json: {e}")
+                continue
             set_running_state(True)
             worker.start()
             try:
@@ -274,4 +297,7 @@ def run_gui() -> None:
 
 
 if __name__ == "__main__":
-    run_gui()
+    if "--profile-imports" in sys.argv:
+        print(startup.importtime_report())
+        sys.exit(0)
+    run_gui(startup_exit="--startup-exit" in sys.argv)
@@ -0,0 +1,300 @@
+"""
+Channel mixer: maps the parsed inputs (pots P0..P7, switches S1/S2) to outputs.
+
+Each output is an expression over the inputs, compiled once into a single
+generated Python function, so a mix with weights, curves and switch modes costs
+one function call per frame, like the old fixed AXIS_ORDER loop.
+
+Spec (dict, e.g. the "mixer" key of config.json):
+
+    {
+      "curves": {"thr": [[0, 0], [128, 40], [255, 255]]},
+      "outputs": [
+        {"out": "wAxisX", "expr": "p0"},
+        {"out": "wAxisY", "expr": "0.5 * p1 + 64", "invert": true},
+        {"out": "wAxisZ", "expr": "curve('thr', p2)"},
+        {"out": "wAxisXRot", "modes": [
+            {"when": "s1 and not s2", "expr": "mid + expo(p3 - mid, 0.4)"},
+            {"expr": "p3"}]},
+        {"out": "btn1", "expr": "s1"},
+        {"out": "key:g", "expr": "s1"}
+      ]
+    }
+
+Names in expressions: p0..p7 (0..255), s1/s2 (0/1), mid (127.5), numbers,
++ - * / // % **, comparisons, and/or/not, "a if c else b", and the functions
+min, max, abs, clamp(x, lo, hi), expo(x, k) (x in -127.5..127.5) and
+curve(name, x) (piecewise linear, precomputed into a 256-entry table).
+Outputs: vJoy axes (wAxisX..wDial, value 0..255), buttons btnN and key:<tecla>
+(truthy value; keys are tapped on every change, like the old sw1_key/sw2_key).
+"""
+
+import ast
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+AXIS_NAMES = ("wAxisX", "wAxisY", "wAxisZ", "wAxisXRot", "wAxisYRot", "wAxisZRot", "wSlider", "wDial")
+INPUT_NAMES = tuple(f"p{i}" for i in range(8)) + ("s1", "s2")
+FUNCTIONS = ("min", "max", "abs", "clamp", "expo", "curve")
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+    ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd, ast.Not,
+    ast.And, ast.Or, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+
+def _clamp(x, lo, hi):
+    return lo if x < lo else hi if x > hi else x
+
+
+def _expo(x, k):
+    # same shape as apply_expo() in the firmware, on a -127.5..127.5 stick
+    n = x / 127.5
+    return ((1.0 - k) * n + k * n * n * n) * 127.5
+
+
+def _lut(points: Sequence[Sequence[float]]) -> List[float]:
+    """256-entry table of the piecewise linear curve through points [[x, y], ...]"""
+    pts = sorted((float(x), float(y)) for x, y in points)
+    if len(pts) < 2:
+        raise ValueError("curva precisa de pelo menos 2 pontos")
+    table = []
+    k = 0
+    for x in range(256):
+        while k < len(pts) - 2 and x > pts[k + 1][0]:
+            k += 1
+        (x0, y0), (x1, y1) = pts[k], pts[k + 1]
+        if x <= x0:
+            table.append(y0)
+        elif x >= x1:
+            table.append(y1)
+        else:
+            table.append(y0 + (y1 - y0) * (x - x0) / (x1 - x0))
+    return table
+
+
+class MixerError(ValueError):
+    pass
+
+
+class Mixer:
+    """
+    Compiled mix. run(pots, switches) returns the list of output values in the
+    order of self.outputs; apply() writes them to a pyvjoy device once bind()
+    has tabulated the axis conversion (0..255 -> vJoy units).
+    """
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        if not isinstance(spec, dict):
+            raise MixerError("mixer precisa ser um objeto com 'outputs'")
+        self.spec = spec
+        try:
+            self.luts = {name: _lut(pts) for name, pts in (spec.get("curves") or {}).items()}
+        except (AttributeError, TypeError, ValueError) as e:
+            raise MixerError(f"curves inválido: {e}")
+        self.outputs: List[Dict[str, Any]] = []
+        exprs = []
+        for o in spec.get("outputs") or []:
+            if not isinstance(o, dict):
+                raise MixerError(f"saída inválida: {o!r}")
+            out = str(o.get("out", ""))
+            if not (out in AXIS_NAMES or (out.startswith("btn") and out[3:].isdigit()) or out.startswith("key:")):
+                raise MixerError(f"saída inválida: {out!r}")
+            if "modes" in o:
+                # switch-conditioned modes: first matching "when" wins, a mode without "when" is the default;
+                # with no default an axis centres (mid) and a button/key is released (0)
+                modes = o["modes"]
+                if not isinstance(modes, list) or not modes:
+                    raise MixerError(f"{out}: 'modes' precisa ser uma lista não vazia")
+                expr = None
+                for m in reversed(modes):
+                    if not isinstance(m, dict) or "expr" not in m:
+                        raise MixerError(f"{out}: todo modo precisa de 'expr': {m!r}")
+                    e = f"({m['expr']})"
+                    if "when" not in m:
+                        expr = e
+                    else:
+                        fallback = expr if expr is not None else "mid" if out in AXIS_NAMES else "0"
+                        expr = f"({e} if ({m['when']}) else {fallback})"
+            else:
+                expr = str(o.get("expr", ""))
+            exprs.append(self._check(expr, out))
+            self.outputs.append({"out": out, "invert": bool(o.get("invert", False))})
+        self._fn = self._compile(exprs)
+        # output kinds resolved once for apply()
+        self.axes = [(i, o["out"], o["invert"]) for i, o in enumerate(self.outputs) if o["out"] in AXIS_NAMES]
+        self.buttons = [(i, 1 << (int(o["out"][3:]) - 1)) for i, o in enumerate(self.outputs) if o["out"].startswith("btn")]
+        self.keys = [(i, o["out"][4:]) for i, o in enumerate(self.outputs) if o["out"].startswith("key:")]
+        self._axis_lut: List[Any] = []
+        self._last_keys: List[Optional[bool]] = []
+        self.reset()
+
+    def _check(self, expr: str, out: str) -> ast.Expression:
+        try:
+            tree = ast.parse(expr, mode="eval")
+        except SyntaxError as e:
+            raise MixerError(f"{out}: expressão inválida {expr!r}: {e.msg}")
+        # function names only as the callee, strings only as the curve name
+        callees = {id(n.func) for n in ast.walk(tree) if isinstance(n, ast.Call)}
+        curve_names = {id(n.args[0]) for n in ast.walk(tree)
+                       if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "curve" and n.args}
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise MixerError(f"{out}: construção não permitida em {expr!r}: {type(node).__name__}")
+            if isinstance(node, ast.Name) and node.id not in INPUT_NAMES + FUNCTIONS + ("mid",):
+                raise MixerError(f"{out}: nome desconhecido {node.id!r}")
+            if isinstance(node, ast.Name) and node.id in FUNCTIONS and id(node) not in callees:
+                raise MixerError(f"{out}: função {node.id!r} usada sem chamar em {expr!r}")
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                    raise MixerError(f"{out}: função não permitida em {expr!r}")
+                if node.func.id == "curve":
+                    if len(node.args) != 2 or not isinstance(node.args[0], ast.Constant) or node.args[0].value not in self.luts:
+                        raise MixerError(f"{out}: curve(nome, x) precisa de uma curva definida em 'curves'")
+            if isinstance(node, ast.Constant) and (not isinstance(node.value, (int, float, str))
+                                                   or isinstance(node.value, str) and id(node) not in curve_names):
+                raise MixerError(f"{out}: constante não permitida em {expr!r}")
+        return tree
+
+    def _compile(self, exprs: Sequence[ast.Expression]) -> Callable:
+        # curve('thr', x) -> _lut_thr[_idx(x)]; everything else is emitted as written
+        names = {name: f"_lut_{i}" for i, name in enumerate(self.luts)}
+
+        class _Curves(ast.NodeTransformer):
+            def visit_Call(self, node):
+                self.generic_visit(node)
+                if isinstance(node.func, ast.Name) and node.func.id == "curve":
+                    idx = ast.Call(func=ast.Name(id="_idx", ctx=ast.Load()), args=[node.args[1]], keywords=[])
+                    return ast.Subscript(value=ast.Name(id=names[node.args[0].value], ctx=ast.Load()),
+                                         slice=idx, ctx=ast.Load())
+                return node
+
+        lines = ["def _mix(p, s):",
+                 "    p0, p1, p2, p3, p4, p5, p6, p7 = p",
+                 "    s1, s2 = s",
+                 "    return ["]
+        for tree in exprs:
+            tree = ast.fix_missing_locations(_Curves().visit(tree))
+            lines.append(f"        {ast.unparse(tree.body)},")
+        lines.append("    ]")
+        self.source = "\n".join(lines)
+        env = {"__builtins__": {}, "min": min, "max": max, "abs": abs, "clamp": _clamp, "expo": _expo,
+               "mid": 127.5, "_idx": lambda x: 0 if x <= 0 else 255 if x >= 255 else int(x)}
+        for name, var in names.items():
+            env[var] = self.luts[name]
+        exec(compile(self.source, "<mixer>", "exec"), env)
+        return env["_mix"]
+
+    @classmethod
+    def default(cls, sw1_key: str = "g", sw2_key: str = "r", invert: Optional[Sequence[bool]] = None) -> "Mixer":
+        """the historical fixed mapping: P0..P7 -> axes, S1/S2 -> buttons 1/2 and keys"""
+        invert = list(invert) if invert is not None else [False] * 8
+        outputs = [{"out": name, "expr": f"p{i}", "invert": bool(invert[i])} for i, name in enumerate(AXIS_NAMES)]
+        outputs += [{"out": "btn1", "expr": "s1"}, {"out": "btn2", "expr": "s2"}]
+        if sw1_key:
+            outputs.append({"out": f"key:{sw1_key}", "expr": "s1"})
+        if sw2_key:
+            outputs.append({"out": f"key:{sw2_key}", "expr": "s2"})
+        return cls({"outputs": outputs})
+
+    def bind(self, to_axis: Callable[[int, bool], int]) -> None:
+        """tabulate to_axis(val_255, invert) for every axis output, apply() then just indexes"""
+        tables: Dict[bool, List[int]] = {}
+        for _, _, inv in self.axes:
+            if inv not in tables:
+                tables[inv] = [to_axis(v, inv) for v in range(256)]
+        self._axis_lut = [(i, name, tables[inv]) for i, name, inv in self.axes]
+
+    def reset(self) -> None:
+        """forget the key states, the next apply() taps every key once (like a fresh start)"""
+        self._last_keys = [None] * len(self.keys)
+
+    def adopt_keys(self, other: "Mixer") -> None:
+        """hot reload: take over the key states of the mix being replaced, keys both share are not tapped again"""
+        last = {key: other._last_keys[k] for k, (_, key) in enumerate(other.keys)}
+        self._last_keys = [last.get(key) for _, key in self.keys]
+
+    def run(self, pots: Sequence[float], switches: Sequence[int]) -> List[Any]:
+        return self._fn(pots, switches)
+
+    def apply(self, j: Any, values: Sequence[Any], tap_key: Optional[Callable[[str], None]] = None) -> None:
+        """write axes and buttons into j.data (no update()), tap keys whose value changed"""
+        data = j.data
+        for i, name, lut in self._axis_lut:
+            v = int(round(values[i]))
+            setattr(data, name, lut[0 if v < 0 else 255 if v > 255 else v])
+        if self.buttons:
+            b = data.lButtons
+            for i, bit in self.buttons:
+                b = b | bit if values[i] else b & ~bit
+            data.lButtons = b
+        if tap_key is not None:
+            for k, (i, key) in enumerate(self.keys):
+                on = bool(values[i])
+                if self._last_keys[k] is None or on != self._last_keys[k]:
+                    tap_key(key)
+                    self._last_keys[k] = on
+
+
+def _benchmark(n: int = 200000) -> None:
+    """per-frame cost of the old fixed loop vs the compiled mixers, vJoy writes included"""
+    import random
+    from types import SimpleNamespace
+
+    from bridge_core import BridgeWorker, to_vjoy
+
+    class _Joy:
+        def __init__(self):
+            self.data = SimpleNamespace(lButtons=0, **{name: 0 for name in AXIS_NAMES})
+
+        def set_button(self, n, on):
+            self.data.lButtons = self.data.lButtons | (1 << (n - 1)) if on else self.data.lButtons & ~(1 << (n - 1))
+
+    rng = random.Random(1)
+    frames = [([rng.randint(0, 255) for _ in range(8)], (rng.randint(0, 1), rng.randint(0, 1))) for _ in range(1000)]
+    invert = [False] * 8
+
+    def fixed(j, p, s):
+        # what BridgeWorker._run did per frame before the mixer
+        for i, (name, src_idx) in enumerate(BridgeWorker.AXIS_ORDER):
+            setattr(j.data, name, to_vjoy(int(round(p[src_idx])), deadzone_255=1, invert=invert[i]))
+        j.set_button(1, 1 if s[0] else 0)
+        j.set_button(2, 1 if s[1] else 0)
+
+    def compiled(m):
+        m.bind(lambda v, inv: to_vjoy(v, deadzone_255=1, invert=inv))
+
+        def step(j, p, s):
+            m.apply(j, m.run(p, s))
+        return step
+
+    complex_mix = Mixer({
+        "curves": {"thr": [[0, 0], [128, 40], [255, 255]]},
+        "outputs": [
+            {"out": "wAxisX", "modes": [{"when": "s1", "expr": "mid + expo(p0 - mid, 0.4)"}, {"expr": "p0"}]},
+            {"out": "wAxisY", "expr": "clamp(0.7 * p1 + 0.3 * p3, 0, 255)"},
+            {"out": "wAxisZ", "expr": "curve('thr', p2)"},
+            {"out": "wAxisXRot", "expr": "clamp(mid + (p0 - mid) - (p1 - mid), 0, 255)"},
+            {"out": "wAxisYRot", "expr": "clamp(mid + (p0 - mid) + (p1 - mid), 0, 255)"},
+            {"out": "wAxisZRot", "expr": "255 - p5 if s2 else p5"},
+            {"out": "wSlider", "expr": "max(p6, p7)"},
+            {"out": "wDial", "expr": "p7 * 0.5 + 64"},
+            {"out": "btn1", "expr": "s1 and not s2"},
+            {"out": "btn2", "expr": "p4 > 200"},
+        ],
+    })
+    for name, fn in (("fixed loop", fixed), ("default mixer", compiled(Mixer.default("", ""))),
+                     ("complex mixer", compiled(complex_mix))):
+        j = _Joy()
+        t0 = time.perf_counter()
+        for k in range(n):
+            p, s = frames[k % 1000]
+            fn(j, p, s)
+        dt = time.perf_counter() - t0
+        print(f"{name:<14}: {1e6 * dt / n:.2f} us/frame")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,394 @@
+"""
+Headless bridge: runs the worker from config.json with no window (no Tk, no desktop).
+
+    python service.py [--config PATH] [--control HOST:PORT | --no-control] [--log FILE]
+    OpenRC-AeroLink-Bridge.exe --headless ...          (same, from the exe)
+
+config.json is watched while running (stat polling: mtime and size, stdlib
+only). After a change settles, the file is re-read: the worker's HOT_KEYS
+(deadzone, invert, smoothing, switch keys/threshold, mixer) are applied with
+reconfigure(), swapped in between two frames without touching the port; a
+change to anything else (port, baud, input mode, vJoy device, devices/routes)
+restarts the worker. With "devices" (MultiBridgeWorker) only deadzone_255 is
+hot; the single-port keys do not apply there and a change to them is logged
+and reported as "ignored". A file that fails to parse or validate is logged
+and the running settings stay.
+
+Control socket (TCP, 127.0.0.1 only by default): one JSON object per line,
+one JSON reply per line; a bare word works as {"cmd": word}.
+
+    {"cmd": "stats"}                      worker and service counters
+    {"cmd": "reload"}                     re-read config.json now
+    {"cmd": "set", "deadzone_255": 3}     hot keys: applied and saved to config.json
+    {"cmd": "stop"}                       stop the service
+
+Client side of the same socket: ``--stats``, ``--reload``, ``--set KEY=VALUE``
+(VALUE as JSON), ``--stop``.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bridge_core import BridgeWorker, MultiBridgeWorker
+from settings import DEFAULTS, get_config_path, read_config, save_config
+
+CONTROL_ADDR = ("127.0.0.1", 47800)
+WATCH_INTERVAL_S = 0.5
+RETRY_S = 5.0   # worker that stopped on its own (port unplugged...) is restarted after this
+
+# settings that only take effect with a new worker (port reopened)
+COLD_KEYS = ("com_port", "baud", "crsf_baud", "input_mode", "vjoy_device_id", "devices", "routes")
+
+
+def build_worker(cfg: Dict[str, Any], log: Callable[[str], None]):
+    """same workers as "Iniciar" in the GUI; raises on a bad config"""
+    if cfg.get("devices"):
+        return MultiBridgeWorker(
+            devices=cfg["devices"],
+            routes=cfg.get("routes"),
+            deadzone_255=cfg.get("deadzone_255", 1),
+            log=log,
+        )
+    if not cfg.get("com_port"):
+        raise ValueError("com_port vazio no config.json")
+    mode = cfg.get("input_mode", "csv") or "csv"
+    return BridgeWorker(
+        com_port=cfg["com_port"],
+        baud=cfg.get("crsf_baud", 420000) if mode == "crsf" else cfg.get("baud", 115200),
+        vjoy_device_id=cfg.get("vjoy_device_id", 1),
+        sw1_key=cfg.get("sw1_key", "g"),
+        sw2_key=cfg.get("sw2_key", "r"),
+        on_threshold=cfg.get("on_threshold", 10),
+        deadzone_255=cfg.get("deadzone_255", 1),
+        smooth_n=cfg.get("smooth_n", 0),
+        invert=cfg.get("invert", [False] * 8),
+        log=log,
+        input_mode=mode,
+        mixer=cfg.get("mixer"),
+    )
+
+
+# expected JSON types of the hot keys, checked before anything reaches the worker
+HOT_TYPES = {
+    "sw1_key": str, "sw2_key": str,
+    "on_threshold": int, "deadzone_255": int, "smooth_n": int,
+    "invert": list, "mixer": (dict, type(None)),
+}
+
+
+def check_hot(changes: Dict[str, Any]) -> None:
+    """ValueError naming the first hot key with a wrong type (eg. "smooth_n": null)"""
+    for k, v in changes.items():
+        want = HOT_TYPES.get(k)
+        if want is None:
+            continue
+        if not isinstance(v, want) or (want is int and isinstance(v, bool)):
+            raise ValueError(f"{k}: tipo inválido {type(v).__name__} ({v!r})")
+        if k == "invert" and (len(v) != 8 or not all(isinstance(x, bool) for x in v)):
+            raise ValueError(f"invert: esperado 8 valores true/false, veio {v!r}")
+
+
+def _hot(cfg: Dict[str, Any], keys) -> Dict[str, Any]:
+    return {k: cfg.get(k, DEFAULTS.get(k)) for k in keys}
+
+
+class ConfigWatcher:
+    """Polls os.stat(path); changed() is True once a new (mtime, size) has held for one poll."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._seen = self._sig()
+        self._pending: Optional[Tuple[int, int]] = None
+
+    def _sig(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def changed(self) -> bool:
+        sig = self._sig()
+        if sig == self._seen:
+            self._pending = None
+            return False
+        if sig != self._pending:
+            # editors save in steps: wait for the file to stop changing
+            self._pending = sig
+            return False
+        self._seen, self._pending = sig, None
+        return sig is not None
+
+
+class BridgeService:
+    def __init__(self, cfg_path: str, log: Callable[[str], None]) -> None:
+        self.cfg_path = cfg_path
+        self.log = log
+        self.cfg: Dict[str, Any] = {}
+        self.worker = None
+        self.reloads = 0
+        self.restarts = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._started_at = 0.0
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._t0 = time.time()
+
+    # ------------------------------------------------------------------ config
+    def _fail(self, msg: str) -> Dict[str, Any]:
+        self.errors += 1
+        self.last_error = msg
+        self.log(f"[ERRO] {msg}")
+        return {"ok": False, "error": msg}
+
+    def reload(self) -> Dict[str, Any]:
+        try:
+            cfg = read_config(self.cfg_path)
+        except FileNotFoundError:
+            cfg = json.loads(json.dumps(DEFAULTS))
+        except Exception as e:
+            return self._fail(f"config.json ilegível, mantendo a configuração atual: {e}")
+        return self.apply(cfg)
+
+    def apply(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            old, w = self.cfg, self.worker
+            if w is None or _hot(old, COLD_KEYS) != _hot(cfg, COLD_KEYS):
+                return self._restart(cfg)
+            before, after = _hot(old, w.HOT_KEYS), _hot(cfg, w.HOT_KEYS)
+            changes = {k: v for k, v in after.items() if before[k] != v}
+            # single-port keys (invert, smooth_n, mixer...) mean nothing to a multi-device worker
+            ignored = sorted(k for k in BridgeWorker.HOT_KEYS
+                             if k not in w.HOT_KEYS and _hot(old, (k,)) != _hot(cfg, (k,)))
+            if ignored:
+                self.log(f"[WARN] Sem efeito no modo multi-dispositivo (devices), ignorado: {ignored}")
+            if changes:
+                try:
+                    check_hot(changes)
+                    w.reconfigure(**changes)
+                except Exception as e:
+                    # anything from a bad value (TypeError, KeyError in a mixer...) keeps the running settings
+                    return self._fail(f"configuração rejeitada ({', '.join(changes)}): {e}")
+                self.reloads += 1
+            self.cfg = cfg
+            return {"ok": True, "applied": sorted(changes), "ignored": ignored, "restarted": False}
+
+    def _restart(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            check_hot(_hot(cfg, BridgeWorker.HOT_KEYS))
+            worker = build_worker(cfg, self.log)
+        except Exception as e:
+            # the old worker (if any) keeps running with the old settings
+            return self._fail(f"configuração inválida: {e}")
+        if self.worker is not None:
+            self.log("Porta/dispositivos mudaram: reiniciando a ponte.")
+            self.worker.stop()
+            self.restarts += 1
+        self.cfg, self.worker = cfg, worker
+        self._started_at = time.time()
+        worker.start()
+        return {"ok": True, "applied": [], "restarted": True}
+
+    def set(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """hot keys from the control socket: applied now and written to config.json"""
+        with self._lock:
+            hot = self.worker.HOT_KEYS if self.worker is not None else BridgeWorker.HOT_KEYS
+            bad = sorted(set(changes) - set(hot))
+            if bad:
+                return {"ok": False, "error": f"não ajustável em execução: {bad} (use {list(hot)})"}
+            reply = self.apply(dict(self.cfg, **changes))
+            if reply.get("ok") and not save_config(self.cfg, self.cfg_path):
+                # running with the new values, but they are lost on the next start/reload
+                reply.update(self._fail(f"aplicado em execução, mas não foi possível salvar {self.cfg_path}"))
+            return reply
+
+    # ----------------------------------------------------------------- control
+    def stats(self) -> Dict[str, Any]:
+        w = self.worker
+        return {
+            "ok": True,
+            "config": self.cfg_path,
+            "uptime_s": round(time.time() - self._t0, 1),
+            "reloads": self.reloads,
+            "restarts": self.restarts,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "worker": (w.stats() if w is not None else None),
+        }
+
+    def command(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        cmd = msg.get("cmd")
+        if cmd == "stats":
+            return self.stats()
+        if cmd == "reload":
+            return self.reload()
+        if cmd == "set":
+            return self.set({k: v for k, v in msg.items() if k != "cmd"})
+        if cmd == "stop":
+            self._stop.set()
+            return {"ok": True}
+        return {"ok": False, "error": f"comando desconhecido: {cmd!r} (use stats, reload, set, stop)"}
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # -------------------------------------------------------------------- loop
+    def run(self, interval: float = WATCH_INTERVAL_S) -> None:
+        watcher = ConfigWatcher(self.cfg_path)
+        self.reload()
+        while not self._stop.wait(interval):
+            if watcher.changed():
+                self.log("config.json alterado.")
+                try:
+                    self.reload()
+                except Exception as e:   # never lose the loop (and the running worker) to a config
+                    self._fail(f"recarga falhou, mantendo a configuração atual: {e}")
+            with self._lock:
+                w = self.worker
+                if w is not None and not w.is_running and time.time() - self._started_at > RETRY_S:
+                    self._started_at = time.time()
+                    self.log("Ponte parada; tentando reconectar.")
+                    w.start()
+        with self._lock:
+            if self.worker is not None:
+                self.worker.stop()
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for raw in self.rfile:
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if not line:
+                continue
+            try:
+                msg = json.loads(line) if line.startswith("{") else {"cmd": line}
+                reply = self.server.service.command(msg)  # type: ignore[attr-defined]
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(reply, default=str) + "\n").encode())
+
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, addr: Tuple[str, int], service: BridgeService) -> None:
+        super().__init__(addr, _ControlHandler)
+        self.service = service
+
+
+def _parse_addr(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    return (host or CONTROL_ADDR[0], int(port))
+
+
+def request(addr: Tuple[str, int], msg: Dict[str, Any], timeout: float = 3.0) -> Dict[str, Any]:
+    with socket.create_connection(addr, timeout=timeout) as s:
+        s.sendall((json.dumps(msg) + "\n").encode())
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    return json.loads(buf.decode("utf-8"))
+
+
+def _make_log(path: Optional[str]) -> Callable[[str], None]:
+    # the windowed exe has no stdout: default to service.log next to config.json
+    if path is None and sys.stdout is None:
+        path = os.path.join(os.path.dirname(get_config_path()), "service.log")
+    lock = threading.Lock()
+
+    def log(msg: str) -> None:
+        line = f"[{time.strftime('%H:%M:%S')}] {msg}"
+        with lock:
+            try:
+                if path:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+                else:
+                    print(line, flush=True)
+            except Exception:
+                pass
+    return log
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="service.py", description="OpenRC-AeroLink bridge sem janela")
+    ap.add_argument("--config", help="config.json (padrão: %%APPDATA%%/OpenRC-AeroLink/config.json)")
+    ap.add_argument("--control", default=f"{CONTROL_ADDR[0]}:{CONTROL_ADDR[1]}", help="HOST:PORTA do socket de controle")
+    ap.add_argument("--no-control", action="store_true", help="sem socket de controle")
+    ap.add_argument("--log", help="arquivo de log (padrão: console)")
+    client = ap.add_mutually_exclusive_group()
+    client.add_argument("--stats", action="store_true", help="mostra as estatísticas do serviço rodando")
+    client.add_argument("--reload", action="store_true", help="pede para reler o config.json")
+    client.add_argument("--set", nargs="+", metavar="KEY=VALUE", help="ajusta e salva, ex.: deadzone_255=3")
+    client.add_argument("--stop", action="store_true", help="para o serviço rodando")
+    args = ap.parse_args(argv)
+    addr = _parse_addr(args.control)
+
+    if args.stats or args.reload or args.set or args.stop:
+        msg: Dict[str, Any] = {"cmd": "stats" if args.stats else "reload" if args.reload else "stop"}
+        if args.set:
+            msg = {"cmd": "set"}
+            for kv in args.set:
+                k, _, v = kv.partition("=")
+                try:
+                    msg[k] = json.loads(v)
+                except ValueError:
+                    msg[k] = v
+        try:
+            reply = request(addr, msg)
+        except OSError as e:
+            print(f"Serviço não encontrado em {addr[0]}:{addr[1]}: {e}", file=sys.stderr)
+            return 2
+        print(json.dumps(reply, indent=2, ensure_ascii=False, default=str))
+        return 0 if reply.get("ok") else 1
+
+    log = _make_log(args.log)
+    cfg_path = os.path.abspath(args.config) if args.config else get_config_path()
+    service = BridgeService(cfg_path, log)
+
+    server = None
+    if not args.no_control:
+        if addr[0] not in ("127.0.0.1", "localhost", "::1"):
+            log(f"[AVISO] Socket de controle fora do localhost ({addr[0]}): sem autenticação.")
+        try:
+            server = ControlServer(addr, service)
+        except OSError as e:
+            log(f"[ERRO] Socket de controle {addr[0]}:{addr[1]} indisponível: {e}")
+            return 1
+        threading.Thread(target=server.serve_forever, name="ControlServer", daemon=True).start()
+
+    try:
+        signal.signal(signal.SIGTERM, lambda *_: service.stop())
+    except (ValueError, AttributeError):  # pragma: no cover
+        pass
+    log(f"Serviço iniciado: {cfg_path}" + (f", controle em {addr[0]}:{addr[1]}" if server else ""))
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with service._lock:
+            if service.worker is not None:
+                service.worker.stop()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        log("Serviço encerrado.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+config.json of the PC bridge, shared by the GUI (main.py) and the headless
+service (service.py). Kept free of GUI imports so the service starts without Tk.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+APP_NAME = "OpenRC-AeroLink"
+CFG_FILE = "config.json"
+
+DEFAULTS: Dict[str, Any] = {
+    "com_port": "",
+    "baud": 115200,
+    "input_mode": "csv",
+    "crsf_baud": 420000,
+    "vjoy_device_id": 1,
+    "sw1_key": "g",
+    "sw2_key": "r",
+    "on_threshold": 10,
+    "deadzone_255": 1,
+    "smooth_n": 0,
+    "invert": [False] * 8,
+}
+
+
+def get_config_path() -> str:
+    base = os.getenv("APPDATA") or os.path.expanduser("~")
+    app_dir = os.path.join(base, APP_NAME)
+    os.makedirs(app_dir, exist_ok=True)
+    return os.path.join(app_dir, CFG_FILE)
+
+
+def read_config(path: str) -> Dict[str, Any]:
+    """Parse config.json; raises (OSError/ValueError) instead of falling back to defaults."""
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    if not isinstance(cfg, dict):
+        raise ValueError("config.json deve ser um objeto JSON")
+    return cfg
+
+
+def load_config() -> Dict[str, Any]:
+    path = get_config_path()
+    if os.path.exists(path):
+        try:
+            return read_config(path)
+        except Exception:
+            pass
+    return json.loads(json.dumps(DEFAULTS))
+
+
+def save_config(cfg: Dict[str, Any], path: Optional[str] = None) -> bool:
+    """Write + rename, so a running service never reads a half-written file. False if it failed."""
+    path = path or get_config_path()
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=2)
+        os.replace(tmp, path)
+    except Exception:
+        return False
+    return True
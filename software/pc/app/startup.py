@@ -0,0 +1,110 @@
+"""
+Startup timing for the PC bridge.
+
+``mark(name)`` records a milestone; ``summary()`` formats them as milliseconds
+since the process was created (Windows and Linux; elsewhere, since this
+module was imported). main.py marks the GUI import, bridge_core import and the first
+shown window, logs the summary and, with ``--startup-exit``, appends it to
+``startup.log`` next to config.json and quits (used by ``build_exe.ps1 -Measure``).
+
+``importtime_report()`` runs ``python -X importtime -c "import main"`` and lists
+the slowest imports by cumulative and self time: ``python startup.py`` or
+``main.py --profile-imports``. It needs a real interpreter, so it does not run
+from the frozen exe.
+"""
+
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+_T_IMPORT = time.perf_counter()
+_MARKS: List[Tuple[str, float]] = []
+
+
+def process_age_s() -> Optional[float]:
+    """Seconds since this process was created, or None when the OS doesn't say."""
+    try:
+        if sys.platform.startswith("win"):
+            import ctypes
+            from ctypes import wintypes
+
+            ft = [wintypes.FILETIME() for _ in range(4)]
+            k32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+            if not k32.GetProcessTimes(k32.GetCurrentProcess(), *[ctypes.byref(f) for f in ft]):
+                return None
+            now = wintypes.FILETIME()
+            k32.GetSystemTimeAsFileTime(ctypes.byref(now))
+            as_int = lambda f: (f.dwHighDateTime << 32) | f.dwLowDateTime
+            return (as_int(now) - as_int(ft[0])) / 1e7
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/stat") as f:
+                start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+            with open("/proc/uptime") as f:
+                uptime = float(f.read().split()[0])
+            return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        pass
+    return None
+
+
+# perf_counter value at process creation (falls back to the import of this module)
+_age = process_age_s()
+_T0 = time.perf_counter() - _age if _age is not None else _T_IMPORT
+
+
+def mark(name: str) -> None:
+    _MARKS.append((name, time.perf_counter()))
+
+
+def summary() -> str:
+    parts = []
+    prev = _T0
+    for name, t in _MARKS:
+        parts.append(f"{name} +{(t - prev) * 1000:.0f}")
+        prev = t
+    total = (_MARKS[-1][1] - _T0) * 1000 if _MARKS else 0.0
+    origin = "processo" if _age is not None else "import"
+    return f"{total:.0f} ms desde o {origin} ({', '.join(parts)} ms)"
+
+
+def parse_importtime(text: str) -> List[Tuple[str, int, int]]:
+    """``-X importtime`` stderr -> [(module, self_us, cumulative_us)]."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(self_us), int(cum_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def importtime_report(target: str = "main", top: int = 15) -> str:
+    import subprocess
+
+    if getattr(sys, "frozen", False):
+        return "Perfil de imports indisponível no executável; rode com o Python: python startup.py"
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=here, capture_output=True, text=True,
+    )
+    rows = parse_importtime(proc.stderr)
+    if not rows:
+        return f"Nenhum dado de importtime (saída: {proc.stderr.strip()[-300:]})"
+    total = sum(r[1] for r in rows)
+    out = [f"import {target}: {total / 1000:.0f} ms em {len(rows)} módulos", "",
+           f"{'cumulativo':>11} {'próprio':>9}  módulo"]
+    for name, self_us, cum_us in sorted(rows, key=lambda r: -r[2])[:top]:
+        out.append(f"{cum_us / 1000:9.1f}ms {self_us / 1000:7.1f}ms  {name}")
+    out += ["", "maior tempo próprio:"]
+    for name, self_us, _ in sorted(rows, key=lambda r: -r[1])[:top]:
+        out.append(f"{self_us / 1000:9.1f}ms  {name}")
+    return "\n".join(out)
+
+
+if __name__ == "__main__":
+    print(importtime_report(sys.argv[1] if len(sys.argv) > 1 else "main"))
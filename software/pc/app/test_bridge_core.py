@@ -0,0 +1,52 @@
+"""Regression tests for bridge_core.py - run with: python -m pytest test_bridge_core.py"""
+
+from bridge_core import MultiBridgeWorker
+
+
+def _worker(merge):
+    devices = [{"name": "a", "port": "A"}, {"name": "b", "port": "B"}]
+    routes = [
+        {"dev": "a", "src": "p0", "out": "wAxisX", "merge": merge},
+        {"dev": "b", "src": "p0", "out": "wAxisX", "merge": merge},
+        {"dev": "a", "src": "s1", "out": "btn1", "merge": "max"},
+        {"dev": "b", "src": "s1", "out": "btn1", "merge": "max"},
+    ]
+    return MultiBridgeWorker(devices, routes)
+
+
+def _feed(w, di, axis, button):
+    w.devices[di].values[0] = axis
+    w.devices[di].values[8] = button
+    w._apply(di)
+
+
+def _timeout(w, di):
+    w.devices[di].neutralize()
+    w._release(di)
+
+
+def test_all_contributors_dead_then_one_returns():
+    for merge in ("last", "max", "min", "avg"):
+        w = _worker(merge)
+        _feed(w, 0, 200.0, 1)
+        _feed(w, 1, 50.0, 0)
+        _timeout(w, 0)                      # A dies: only B is merged
+        assert w._merged(0) == 50.0
+        assert w._merged(1) == 0
+        _timeout(w, 1)                      # B dies: nothing left, neutral
+        assert w._merged(0) == 128
+        assert w._merged(1) == 0
+        assert w._contrib == [{}, {}]
+        _feed(w, 0, 30.0, 1)                # A returns: its value alone, no leftover neutral entry
+        assert w._merged(0) == 30.0, merge
+        assert w._merged(1) == 1
+
+
+def test_last_mode_falls_back_to_live_contributor():
+    w = _worker("last")
+    _feed(w, 0, 10.0, 0)
+    _feed(w, 1, 240.0, 0)
+    _timeout(w, 1)
+    assert w._merged(0) == 10.0
+    _timeout(w, 0)
+    assert w._merged(0) == 128
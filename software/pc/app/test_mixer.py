@@ -0,0 +1,22 @@
+"""Regression tests for mixer.py - run with: python -m pytest test_mixer.py"""
+
+import pytest
+
+from mixer import Mixer, MixerError
+
+CURVES = {"c": [[0, 0], [255, 255]]}
+
+
+def _mixer(expr):
+    return Mixer({"curves": CURVES, "outputs": [{"out": "wAxisX", "expr": expr}]})
+
+
+@pytest.mark.parametrize("expr", ["min", "min + p0", "abs", "'abc'", "p0 + 'x'", "curve('c', 'c')"])
+def test_rejects_bare_functions_and_strings(expr):
+    with pytest.raises(MixerError):
+        _mixer(expr)
+
+
+def test_accepts_calls_and_curve_names():
+    m = _mixer("min(curve('c', p0), max(p1, 3))")
+    assert m.run([10] * 8, [0, 0]) == [10]
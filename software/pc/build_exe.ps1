@@ -1,6 +1,12 @@
 param(
     [string]$Name = "OpenRC-AeroLink-Bridge",
-    [switch]$UseGlobal
+    [switch]$UseGlobal,
+    # onedir: no per-launch unpacking to %TEMP% (fastest start); dist\$Name\$Name.exe
+    [switch]$OneDir,
+    # PNG shown by the bootloader while the onefile EXE unpacks (closed by main.py)
+    [string]$Splash = "",
+    # Launch the built EXE N times with --startup-exit and report cold-start times
+    [int]$Measure = 0
 )
 
 $ErrorActionPreference = 'Stop'
@@ -36,13 +42,20 @@ if ($UseGlobal) {
 # Install from PyPI (uses FreeSimpleGUI, tkinter comes with Python runtime)
 & $py -m pip install --no-cache-dir --upgrade -r "$(Join-Path $PSScriptRoot requirements.txt)"
 
-Write-Host "Building single-file EXE (clean)..." -ForegroundColor Cyan
-& $py -m PyInstaller --clean --noconfirm --onefile --noconsole `
+$variant = @('--onefile')
+if ($OneDir) { $variant = @('--onedir') }
+if ($Splash) { $variant += @('--splash', (Resolve-Path $Splash).Path) }
+
+Write-Host "Building EXE ($($variant -join ' '), clean)..." -ForegroundColor Cyan
+& $py -m PyInstaller --clean --noconfirm @variant --noconsole `
   --name "$Name" `
   --distpath "$(Join-Path $PSScriptRoot dist)" `
   --workpath "$(Join-Path $PSScriptRoot build)" `
   --specpath "$PSScriptRoot" `
   --hidden-import serial.tools.list_ports `
+  --hidden-import pyvjoy `
+  --hidden-import keyboard `
+  --exclude-module numpy `
   --collect-all FreeSimpleGUI `
   --hidden-import tkinter `
   --hidden-import _tkinter `
@@ -56,6 +69,25 @@ Write-Host "Cleaning intermediate build artifacts..." -ForegroundColor DarkGray
 try { Remove-Item -Recurse -Force "$(Join-Path $PSScriptRoot build)" -ErrorAction SilentlyContinue } catch {}
 try { Remove-Item -Force    "$(Join-Path $PSScriptRoot $Name.spec)" -ErrorAction SilentlyContinue } catch {}
 
+$exe = Join-Path $PSScriptRoot "dist\$Name.exe"
+if ($OneDir) { $exe = Join-Path $PSScriptRoot "dist\$Name\$Name.exe" }
+
+if ($Measure -gt 0) {
+  # Wall time from launch until the window is up (--startup-exit closes it right away).
+  # The first run is the cold one (files not yet in the OS cache).
+  $log = Join-Path $env:APPDATA "OpenRC-AeroLink\startup.log"
+  Remove-Item -Force $log -ErrorAction SilentlyContinue
+  $times = @()
+  for ($i = 1; $i -le $Measure; $i++) {
+    $t = Measure-Command { Start-Process -FilePath $exe -ArgumentList '--startup-exit' -Wait }
+    $times += [math]::Round($t.TotalMilliseconds)
+    Write-Host ("  run {0}: {1} ms" -f $i, $times[-1])
+  }
+  $sorted = $times | Sort-Object
+  Write-Host ("Startup: first {0} ms, median {1} ms over {2} runs" -f $times[0], $sorted[[int][math]::Floor($sorted.Count / 2)], $Measure) -ForegroundColor Green
+  if (Test-Path $log) { Write-Host "In-app breakdown ($log):"; Get-Content $log | ForEach-Object { Write-Host "  $_" } }
+}
+
 Pop-Location
 
-Write-Host "Done. EXE at: software\\pc\\dist\\$Name.exe" -ForegroundColor Green
+Write-Host "Done. EXE at: $exe" -ForegroundColor Green